@@ -30,7 +30,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.environ.get("SECRET_KEY")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DEBUG", "False").lower() in ("1", "true", "yes")
 
 ALLOWED_HOSTS = json.loads(os.environ.get("ALLOWED_HOSTS", "[]"))
 
@@ -44,6 +44,7 @@ DJANGO_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 ]
 
 THIRD_PARTY_APPS = [
@@ -60,7 +61,9 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 
 MIDDLEWARE = [
+    "ecommerce.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -107,10 +110,74 @@ DATABASES = {
         "NAME": POSTGRES_DB,
         "PORT": POSTGRES_PORT,
         "HOST": POSTGRES_HOST,
+        # Conexões persistentes: cada thread do servidor reaproveita a conexão por até
+        # CONN_MAX_AGE segundos, em vez de abrir uma nova a cada request (0 = uma por
+        # request). No ASGI cada request roda em outra thread, então use 0 lá.
+        "CONN_MAX_AGE": int(os.environ.get("CONN_MAX_AGE") or 60),
+        # Testa a conexão reaproveitada antes do primeiro uso em cada request
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local-memory por padrão (dev/testes). Em produção, aponte para Redis ou memcached:
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   CACHE_LOCATION=redis://redis:6379/0
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND")
+        or "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+CATALOG_CACHE_ALIAS = "default"
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("CATALOG_CACHE_TIMEOUT") or 300)
+
+
+# Observabilidade
+# PerformanceMiddleware: Server-Timing, log JSON por request e /metrics (Prometheus).
+# Com METRICS_TOKEN definido, /metrics exige "Authorization: Bearer <token>".
+
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN") or None
+
+# Detector de N+1 e queries lentas (ecommerce/query_profiler.py). Uma fração dos
+# requests agrupa o SQL por fingerprint; os sinalizados ficam num buffer no cache,
+# lido pelos admins em /api/v1/query-profiles/.
+QUERY_PROFILER_SAMPLE_RATE = float(os.environ.get("QUERY_PROFILER_SAMPLE_RATE") or 0.01)
+QUERY_PROFILER_REPEAT_THRESHOLD = int(os.environ.get("QUERY_PROFILER_REPEAT_THRESHOLD") or 5)
+QUERY_PROFILER_SLOW_QUERY_MS = int(os.environ.get("QUERY_PROFILER_SLOW_QUERY_MS") or 200)
+QUERY_PROFILER_BUFFER_SIZE = int(os.environ.get("QUERY_PROFILER_BUFFER_SIZE") or 50)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+        "jobs": {"format": "%(asctime)s %(levelname)s %(threadName)s %(message)s"},
+    },
+    "handlers": {
+        "performance": {"class": "logging.StreamHandler", "formatter": "message"},
+        "jobs": {"class": "logging.StreamHandler", "formatter": "jobs"},
+    },
+    "loggers": {
+        "ecommerce.performance": {
+            "handlers": ["performance"],
+            "level": os.environ.get("PERFORMANCE_LOG_LEVEL") or "INFO",
+            "propagate": False,
+        },
+        "ecommerce.jobs": {
+            "handlers": ["jobs"],
+            "level": os.environ.get("JOBS_LOG_LEVEL") or "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -147,6 +214,15 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Arquivos do admin e da API navegável: o collectstatic (no build da imagem)
+# junta tudo em STATIC_ROOT e o WhiteNoise serve pelo próprio gunicorn/uvicorn,
+# com nomes versionados (cache longo) e versões comprimidas
+STATIC_ROOT = BASE_DIR / "staticfiles"
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -158,9 +234,19 @@ PASSWORD_HASHERS = [
 ]
 
 
+# Paginação por keyset (cursor). O cliente pode pedir ?page_size= até MAX_PAGE_SIZE
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE") or 20)
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE") or 100)
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    "DEFAULT_PAGINATION_CLASS": "ecommerce.pagination.KeysetPagination",
+    "DEFAULT_RENDERER_CLASSES": [
+        "ecommerce.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "PAGE_SIZE": PAGE_SIZE,
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
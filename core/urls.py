@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
+from ecommerce.metrics import metrics_view
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
@@ -9,6 +10,7 @@ from drf_spectacular.views import (
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include('ecommerce.urls')),
+    path('metrics', metrics_view, name='metrics'),  # Prometheus
 
     # Swagger
     path(
@@ -1,4 +1,6 @@
 from django.contrib import admin
+from .services.cart_service import CartService
+from .services.outbox_service import OutboxService
 from .models import (
     Product,
     Category,
@@ -10,16 +12,137 @@ from .models import (
     Shipping,
     Payment,
     Address,
+    DailySales,
+    DailyProductSales,
+    DailyCategorySales,
+    ProductRanking,
+    OutboxJob,
 )
 
 admin.site.site_header = "E-Commerce Admin"
-admin.site.register(Product)
 admin.site.register(Category)
-admin.site.register(Order)
-admin.site.register(OrderProduct)
-admin.site.register(Review)
-admin.site.register(Cart)
-admin.site.register(CartProduct)
-admin.site.register(Shipping)
-admin.site.register(Payment)
-admin.site.register(Address)
+
+
+# As listagens e os formulários do admin rodam um número fixo de queries:
+# list_select_related cobre os FKs usados no __str__ e raw_id_fields evita
+# que o formulário carregue tabelas inteiras em um <select>.
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ["name", "price", "stock", "updated_at"]
+    raw_id_fields = ["categories"]
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "user", "total", "created_at"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+
+
+@admin.register(OrderProduct)
+class OrderProductAdmin(admin.ModelAdmin):
+    # Sem list_display nem list_select_related: o __str__ só usa o id. Se ele
+    # passar a mostrar o pedido ou o produto, adicione-os a list_select_related
+    raw_id_fields = ["order", "product"]
+
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    list_select_related = ["user", "product"]
+    raw_id_fields = ["user", "product"]
+
+
+@admin.register(Cart)
+class CartAdmin(admin.ModelAdmin):
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+
+
+@admin.register(CartProduct)
+class CartProductAdmin(admin.ModelAdmin):
+    # Sem list_display nem list_select_related: o __str__ só usa o id. Se ele
+    # passar a mostrar o carrinho ou o produto, adicione-os a list_select_related
+    raw_id_fields = ["cart", "product"]
+
+    def delete_queryset(self, request, queryset):
+        # O signal ignora deletes em lote: invalida cada carrinho uma vez
+        cart_ids = set(queryset.values_list("cart_id", flat=True))
+        super().delete_queryset(request, queryset)
+        CartService.invalidate(cart_ids)
+
+
+@admin.register(Shipping)
+class ShippingAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "status", "address"]
+    list_select_related = ["address"]
+    raw_id_fields = ["order", "address"]
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    raw_id_fields = ["order"]
+
+
+@admin.register(Address)
+class AddressAdmin(admin.ModelAdmin):
+    raw_id_fields = ["user"]
+
+
+# Agregados do analytics: recalculados pelo refresh_analytics, só leitura aqui
+
+
+class RollupAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailySales)
+class DailySalesAdmin(RollupAdmin):
+    list_display = ["day", "status", "orders", "revenue"]
+    list_filter = ["status"]
+    date_hierarchy = "day"
+
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(RollupAdmin):
+    list_display = ["day", "product", "units", "revenue"]
+    list_select_related = ["product"]
+    date_hierarchy = "day"
+
+
+@admin.register(DailyCategorySales)
+class DailyCategorySalesAdmin(RollupAdmin):
+    list_display = ["day", "category", "units", "revenue"]
+    list_select_related = ["category"]
+    date_hierarchy = "day"
+
+
+@admin.register(ProductRanking)
+class ProductRankingAdmin(RollupAdmin):
+    # Recalculado pelo refresh_rankings
+    list_display = ["kind", "category", "position", "product", "score"]
+    list_filter = ["kind"]
+    list_select_related = ["category", "product"]
+    ordering = ["kind", "category", "position"]
+
+
+@admin.register(OutboxJob)
+class OutboxJobAdmin(admin.ModelAdmin):
+    # Jobs pendentes e os que esgotaram as tentativas (failed_at); os concluídos são apagados
+    list_display = ["id", "name", "attempts", "max_attempts", "run_after", "failed_at", "created_at"]
+    list_filter = ["name", ("failed_at", admin.EmptyFieldListFilter)]
+    readonly_fields = ["name", "payload", "attempts", "max_attempts", "last_error", "failed_at", "created_at"]
+    actions = ["retry"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Retry selected failed jobs")
+    def retry(self, request, queryset):
+        retried = OutboxService.retry(queryset)
+        self.message_user(request, f"{retried} job(s) queued again.")
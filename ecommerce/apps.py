@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class EcommerceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ecommerce'
+
+    def ready(self):
+        from . import jobs, signals  # noqa: F401
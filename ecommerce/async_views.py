@@ -0,0 +1,133 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django_filters.utils import translate_validation
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .fast_serializers import ValuesSerializer
+from .filters import CategoryFilter, ProductFilter
+from .models import Category, Product, Shipping
+from .permissions import IsAdminOrReadOnly
+from .renderers import ORJSONRenderer
+from .serializers import CategorySerializer, ProductSerializer, ShippingSerializer
+from .views import CategoryViewSet, ProductViewSet
+
+
+# Views async (ASGI) para as leituras de maior volume: catálogo e rastreio.
+# Mesma autenticação, permissões, filtros, paginação e formato de resposta das
+# views DRF equivalentes, mas as queries rodam pelo async ORM, sem ocupar uma
+# thread do servidor enquanto esperam o banco. Só GET; ?expand= não é suportado.
+
+
+def async_api_view(permission_class):
+    def decorator(handler):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+            drf_request = Request(request, authenticators=authenticators)
+            try:
+                if request.method != "GET":
+                    raise exceptions.MethodNotAllowed(request.method)
+
+                # JWTAuthentication busca o usuário no banco (sync)
+                user = await sync_to_async(lambda: drf_request.user)()
+                if not permission_class().has_permission(drf_request, None):
+                    if user is None or not user.is_authenticated:
+                        raise exceptions.NotAuthenticated()
+                    raise exceptions.PermissionDenied()
+
+                data = await handler(drf_request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return _error_response(drf_request, exc)
+
+            return HttpResponse(
+                ORJSONRenderer().render(data), content_type="application/json"
+            )
+
+        return view
+
+    return decorator
+
+
+@async_api_view(IsAdminOrReadOnly)
+async def product_list(request):
+    return await _list(
+        request, Product.objects.all(), ProductFilter, ProductSerializer, ProductViewSet
+    )
+
+
+@async_api_view(IsAdminOrReadOnly)
+async def product_detail(request, pk):
+    return await _detail(request, Product.objects.filter(pk=pk), ProductSerializer)
+
+
+@async_api_view(IsAdminOrReadOnly)
+async def category_list(request):
+    return await _list(
+        request, Category.objects.all(), CategoryFilter, CategorySerializer, CategoryViewSet
+    )
+
+
+@async_api_view(IsAuthenticated)
+async def shipping_tracking(request, tracking_number):
+    queryset = Shipping.objects.filter(tracking_number__iexact=tracking_number)
+    if not request.user.is_staff:
+        # Cliente só rastreia os próprios pedidos
+        queryset = queryset.filter(order__user=request.user)
+    return await _detail(request, queryset, ShippingSerializer)
+
+
+async def _list(request, queryset, filterset_class, serializer_class, view):
+    fast = _get_values_serializer(request, serializer_class)
+
+    filterset = filterset_class(request.query_params, queryset=queryset, request=request)
+    # A validação dos filtros pode consultar o banco (ex.: ids de categoria)
+    if not await sync_to_async(filterset.is_valid)():
+        raise translate_validation(filterset.errors)
+
+    paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+    ordering = [
+        field.lstrip("-") for field in paginator.get_ordering(request, queryset, view)
+    ]
+    rows = fast.values(filterset.qs, extra=ordering)
+
+    page = await paginator.apaginate_queryset(rows, request, view=view)
+    if page is None:
+        return await fast.ato_representation([row async for row in rows])
+    return paginator.get_paginated_response(await fast.ato_representation(page)).data
+
+
+async def _detail(request, queryset, serializer_class):
+    fast = _get_values_serializer(request, serializer_class)
+    row = await fast.values(queryset).afirst()
+    if row is None:
+        raise exceptions.NotFound()
+    return (await fast.ato_representation([row]))[0]
+
+
+def _get_values_serializer(request, serializer_class):
+    fields, expand = serializer_class.requested_fields(request)
+    if expand:
+        raise exceptions.ValidationError({"expand": ["Not supported on this endpoint."]})
+    return ValuesSerializer.for_serializer(serializer_class, tuple(sorted(fields)))
+
+
+def _error_response(request, exc):
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {"detail": exc.detail}
+
+    response = HttpResponse(
+        ORJSONRenderer().render(data),
+        content_type="application/json",
+        status=exc.status_code,
+    )
+    unauthenticated = (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+    if isinstance(exc, unauthenticated) and request.authenticators:
+        response["WWW-Authenticate"] = request.authenticators[0].authenticate_header(request)
+    return response
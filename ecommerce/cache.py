@@ -0,0 +1,137 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class CatalogCache:
+    """
+    Cache das respostas de leitura do catálogo (produtos e categorias).
+
+    - Detalhe: uma versão por objeto, incrementada quando o objeto muda.
+    - Listagem: uma versão por namespace, incrementada quando qualquer objeto muda,
+      já que não dá pra saber quais filtros/páginas ele afeta (exceto nas baixas de
+      estoque, que só invalidam o detalhe; ver StockService).
+    - Geração: incrementada por invalidate_all (cargas em massa), descarta tudo.
+
+    As chaves incluem os query params normalizados (filtros, cursor, page_size)
+    e o host, porque os links de paginação são absolutos. As invalidações rodam
+    depois do commit, para nenhum leitor repopular o cache com dados antigos.
+    O backend vem de CACHES[CATALOG_CACHE_ALIAS] (locmem, Redis ou memcached).
+    """
+
+    PREFIX = "catalog"
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias or settings.CATALOG_CACHE_ALIAS
+        self.timeout = timeout if timeout is not None else settings.CATALOG_CACHE_TIMEOUT
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, namespace, key):
+        value = self.cache.get(key)
+        self._incr(f"{self.PREFIX}:{namespace}:{'hits' if value is not None else 'misses'}")
+        return value
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def list_key(self, namespace, request):
+        version = self._versions(self._version_key(namespace))
+        return f"{self.PREFIX}:{namespace}:list:v{version}:{self._digest(request)}"
+
+    def detail_key(self, namespace, pk, request):
+        generation, version = self._versions(
+            self._version_key(namespace, generation=True), self._version_key(namespace, pk)
+        )
+        return f"{self.PREFIX}:{namespace}:detail:{pk}:g{generation}:v{version}:{self._digest(request)}"
+
+    def invalidate(self, namespace, pks=(), lists=True):
+        """
+        Invalida o detalhe dos objetos informados e, com lists=True, todas as
+        listagens do namespace.
+        """
+        pks = list(pks)
+        keys = [self._version_key(namespace, pk) for pk in pks]
+        if lists:
+            keys.append(self._version_key(namespace))
+
+        def run():
+            for key in keys:
+                self._incr(key, initial=self._new_version())
+
+        transaction.on_commit(run)
+
+    def invalidate_all(self, namespace):
+        """
+        Invalida todas as listagens e todos os detalhes do namespace.
+        """
+
+        def run():
+            self._incr(self._version_key(namespace), initial=self._new_version())
+            self._incr(self._version_key(namespace, generation=True), initial=self._new_version())
+
+        transaction.on_commit(run)
+
+    def stats(self):
+        stats = {}
+        for namespace in ("products", "categories"):
+            counters = self.cache.get_many(
+                [f"{self.PREFIX}:{namespace}:hits", f"{self.PREFIX}:{namespace}:misses"]
+            )
+            hits = counters.get(f"{self.PREFIX}:{namespace}:hits", 0)
+            misses = counters.get(f"{self.PREFIX}:{namespace}:misses", 0)
+            stats[namespace] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            }
+        return stats
+
+    def _version_key(self, namespace, pk=None, generation=False):
+        if generation:
+            return f"{self.PREFIX}:{namespace}:generation"
+        if pk is None:
+            return f"{self.PREFIX}:{namespace}:version"
+        return f"{self.PREFIX}:{namespace}:version:{pk}"
+
+    def _versions(self, *keys):
+        # Uma ida ao cache para todas as versões; as ausentes são criadas
+        found = self.cache.get_many(keys)
+        versions = [
+            found[key] if key in found else self.cache.get_or_set(key, self._new_version, None)
+            for key in keys
+        ]
+        return versions[0] if len(versions) == 1 else versions
+
+    def _incr(self, key, initial=1):
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            # Chave ainda não existe (ou foi descartada pelo backend)
+            if not self.cache.add(key, initial, None):
+                self.cache.incr(key)
+
+    @staticmethod
+    def _new_version():
+        # Versões começam no relógio, para nunca reaproveitar uma versão antiga
+        # caso o backend descarte a chave de versão
+        return time.time_ns() // 1000
+
+    @staticmethod
+    def _digest(request):
+        params = sorted(
+            (key, value)
+            for key in request.query_params
+            for value in request.query_params.getlist(key)
+        )
+        raw = f"{request.get_host()}?{urlencode(params)}"
+        return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,131 @@
+from functools import lru_cache
+
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+from .metrics import track_serialization
+
+
+# Campos cujo to_representation devolve o próprio valor vindo do banco
+RAW_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.FloatField,
+)
+
+
+class ValuesSerializer:
+    """
+    Caminho rápido, só leitura, para listagens grandes: lê tuplas com
+    .values_list() em vez de instanciar models, e monta os dicts direto, sem
+    passar pelo to_representation campo a campo do DRF. A saída é a mesma do
+    ModelSerializer de origem:
+
+    - FKs saem do <campo>_id, como o PrimaryKeyRelatedField já faz;
+    - M2M vêm de uma única query na tabela intermediária (como um prefetch);
+    - Decimal/datetime usam o to_representation do próprio campo do DRF.
+    """
+
+    def __init__(self, serializer_class, fields=()):
+        model = serializer_class.Meta.model
+        self.columns = []
+        self.converters = []
+        self.many_to_many = []
+
+        # `fields`: subconjunto pedido em ?fields= (vazio = todos)
+        serializer = serializer_class(fields=dict.fromkeys(fields, {}), expand={})
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, ManyRelatedField):
+                m2m = model._meta.get_field(field.source)
+                self.many_to_many.append(
+                    (
+                        name,
+                        m2m.remote_field.through,
+                        m2m.m2m_field_name() + "_id",
+                        m2m.m2m_reverse_field_name() + "_id",
+                    )
+                )
+                continue
+
+            if isinstance(field, PrimaryKeyRelatedField):
+                column, converter = model._meta.get_field(field.source).attname, None
+            elif isinstance(field, RAW_FIELDS):
+                column, converter = field.source, None
+            else:
+                column, converter = field.source, field.to_representation
+
+            if "." in column or column == "*":
+                raise TypeError(
+                    f"{serializer_class.__name__}.{name} cannot be read with .values_list()"
+                )
+            self.columns.append((name, column))
+            self.converters.append(converter)
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def for_serializer(cls, serializer_class, fields=()):
+        return cls(serializer_class, fields)
+
+    def values(self, queryset, extra=()):
+        """
+        Queryset de dicts com as colunas do serializer (e as `extra`, como os
+        campos de ordenação que a paginação precisa ler).
+        """
+        columns = [column for _, column in self.columns]
+        columns += [name for name in extra if name not in columns]
+        if "pk" not in columns and "id" not in columns:
+            columns.append("pk")
+        return queryset.prefetch_related(None).values(*columns)
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        many_to_many = {
+            name: self._group(queryset)
+            for name, queryset in self._many_to_many_querysets(rows)
+        }
+        return self._build(rows, many_to_many)
+
+    async def ato_representation(self, rows):
+        """
+        Versão async de to_representation (M2M lidos com o async ORM).
+        `rows` já avaliadas, ex.: a página devolvida por apaginate_queryset.
+        """
+        many_to_many = {}
+        for name, queryset in self._many_to_many_querysets(rows):
+            many_to_many[name] = self._group([pair async for pair in queryset])
+        return self._build(rows, many_to_many)
+
+    def _build(self, rows, many_to_many):
+        with track_serialization():
+            return self._build_items(rows, many_to_many)
+
+    def _build_items(self, rows, many_to_many):
+        data = []
+        for row in rows:
+            item = {}
+            for (name, column), converter in zip(self.columns, self.converters):
+                value = row[column]
+                if converter is not None and value is not None:
+                    value = converter(value)
+                item[name] = value
+            for name, related in many_to_many.items():
+                item[name] = related.get(row.get("id", row.get("pk")), [])
+            data.append(item)
+        return data
+
+    def _many_to_many_querysets(self, rows):
+        pks = [row.get("id", row.get("pk")) for row in rows]
+        for name, through, source, target in self.many_to_many:
+            queryset = through.objects.filter(**{f"{source}__in": pks})
+            yield name, queryset.order_by("pk").values_list(source, target)
+
+    @staticmethod
+    def _group(pairs):
+        related = {}
+        for pk, value in pairs:
+            related.setdefault(pk, []).append(value)
+        return related
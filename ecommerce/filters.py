@@ -1,4 +1,4 @@
-from django_filters import FilterSet, CharFilter, BooleanFilter, NumberFilter
+from django_filters import FilterSet, CharFilter, BooleanFilter, NumberFilter, IsoDateTimeFilter
 from django.contrib.auth.models import User
 from .models import (
     Product,
@@ -24,13 +24,20 @@ class UserFilter(FilterSet):
 
 
 class ProductFilter(FilterSet):
-    category = NumberFilter(field_name="category")
+    category = NumberFilter(field_name="categories")
     name = CharFilter(field_name="name", lookup_expr="icontains")
-    in_stock = BooleanFilter(field_name="in_stock")
+    in_stock = BooleanFilter(method="filter_in_stock")
+    min_rating = NumberFilter(field_name="rating_avg", lookup_expr="gte")
 
     class Meta:
         model = Product
-        fields = ["category", "name", "in_stock"]
+        fields = ["category", "name", "in_stock", "min_rating"]
+
+    def filter_in_stock(self, queryset, name, value):
+        # in_stock é uma property, então filtra direto pelo estoque
+        if value:
+            return queryset.filter(stock__gt=0)
+        return queryset.filter(stock=0)
 
 
 class CategoryFilter(FilterSet):
@@ -44,11 +51,14 @@ class CategoryFilter(FilterSet):
 class OrderFilter(FilterSet):
     user = NumberFilter(field_name="user")
     status = CharFilter(field_name="status", lookup_expr="iexact")
-    payment_status = CharFilter(field_name="payment_status", lookup_expr="iexact")
+    payment_status = CharFilter(field_name="payment__status", lookup_expr="iexact")
+    # Intervalo semiaberto [created_after, created_before); aceita data ou data e hora ISO 8601
+    created_after = IsoDateTimeFilter(field_name="created_at", lookup_expr="gte")
+    created_before = IsoDateTimeFilter(field_name="created_at", lookup_expr="lt")
 
     class Meta:
         model = Order
-        fields = ["user", "status", "payment_status"]
+        fields = ["user", "status", "payment_status", "created_after", "created_before"]
 
 
 class OrderProductFilter(FilterSet):
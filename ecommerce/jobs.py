@@ -0,0 +1,14 @@
+"""
+Jobs executados pelo worker (comando run_jobs), enfileirados com
+OutboxService.enqueue(nome, **payload). Importado no ready() do app, para
+que o registro esteja completo tanto no request quanto no worker.
+"""
+
+from .services.outbox_service import OutboxService
+from .services.rating_service import RatingService
+
+
+@OutboxService.register("ratings.apply")
+def apply_rating(product_id, added=None, removed=None):
+    # Fora do request, a criação de reviews não disputa o lock da linha do produto
+    RatingService.apply(product_id, added=added, removed=removed)
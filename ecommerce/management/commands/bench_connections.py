@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o custo de abrir uma conexão com o banco a cada request "
+        "(CONN_MAX_AGE=0) contra reaproveitar uma conexão persistente: "
+        "latência de conexão + SELECT 1 e o teto de requests/s só disso."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=200, help="Execuções de cada modo (padrão: 200)."
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        if iterations <= 0:
+            raise CommandError("--iterations must be greater than 0.")
+
+        def new_connection():
+            connection.close()
+            self._select_one()
+
+        def persistent():
+            self._select_one()
+
+        self.stdout.write(f"{'mode':<12}{'avg ms':>10}{'p95 ms':>10}{'max req/s':>12}")
+        results = {}
+        for label, run in (("new", new_connection), ("persistent", persistent)):
+            run()
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+            results[label] = statistics.mean(timings)
+            p95 = statistics.quantiles(timings, n=20)[18] if iterations > 1 else timings[0]
+            self.stdout.write(
+                f"{label:<12}{results[label] * 1000:>10.2f}{p95 * 1000:>10.2f}"
+                f"{1 / results[label]:>12.0f}"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Connection setup: {(results['new'] - results['persistent']) * 1000:.2f} ms "
+                "per request saved by persistent connections."
+            )
+        )
+
+    @staticmethod
+    def _select_one():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
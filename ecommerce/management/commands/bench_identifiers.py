@@ -0,0 +1,75 @@
+import random
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ecommerce.models import Shipping
+from ecommerce.services.identifier_service import IdentifierService
+from ecommerce.services.shipping_service import ShippingService
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a geração de números de rastreio: o gerador em memória "
+        "(IdentifierService) contra o sorteio com uma consulta exists() por tentativa, "
+        "e confere que os IDs gerados em várias threads não se repetem."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=2000, help="IDs gerados em cada modo (padrão: 2000)."
+        )
+        parser.add_argument(
+            "--threads", type=int, default=8, help="Threads no teste de unicidade (padrão: 8)."
+        )
+
+    def handle(self, *args, **options):
+        iterations, threads = options["iterations"], options["threads"]
+        if iterations <= 0 or threads <= 0:
+            raise CommandError("--iterations and --threads must be greater than 0.")
+
+        self.stdout.write(f"{'mode':<12}{'ids/s':>12}{'queries':>10}")
+        for label, generate in (
+            ("probe", self._probe_tracking_number),
+            ("generator", ShippingService.generate_tracking_number),
+        ):
+            self._queries = 0
+            with connection.execute_wrapper(self._count_queries):
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    generate()
+                elapsed = time.perf_counter() - start
+            self.stdout.write(f"{label:<12}{iterations / elapsed:>12.0f}{self._queries:>10}")
+
+        with ThreadPoolExecutor(threads) as executor:
+            batches = executor.map(
+                lambda _: [IdentifierService.next_number() for _ in range(iterations)],
+                range(threads),
+            )
+            numbers = [number for batch in batches for number in batch]
+
+        duplicates = len(numbers) - len(set(numbers))
+        invalid = sum(not IdentifierService.is_valid(number) for number in numbers)
+        message = (
+            f"{len(numbers)} IDs in {threads} threads: "
+            f"{duplicates} duplicates, {invalid} invalid check digits."
+        )
+        if duplicates or invalid:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def _count_queries(self, execute, sql, params, many, context):
+        self._queries += 1
+        return execute(sql, params, many, context)
+
+    @staticmethod
+    def _probe_tracking_number():
+        # Implementação anterior: sorteia e consulta o banco até achar um livre
+        while True:
+            num = "".join(random.choices(string.digits, k=9))
+            tracking_number = f"{ShippingService.PREFIX}{num}{ShippingService.SUFFIX}"
+            if not Shipping.objects.filter(tracking_number=tracking_number).exists():
+                return tracking_number
@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from ecommerce.fast_serializers import ValuesSerializer
+from ecommerce.renderers import ORJSONRenderer
+from ecommerce.views import OrderProductViewSet, ProductViewSet, ReviewViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o ModelSerializer + JSONRenderer com o caminho rápido "
+        "(ValuesSerializer + ORJSONRenderer) nas listagens de produtos, itens "
+        "de pedido e avaliações: linhas por segundo e CPU por página."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=1000, help="Linhas por página (padrão: 1000)."
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Execuções de cada caminho (padrão: 5)."
+        )
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        if rows <= 0 or repeat <= 0:
+            raise CommandError("--rows and --repeat must be greater than 0.")
+
+        self.stdout.write(
+            f"{'endpoint':<16}{'path':<8}{'rows/s':>12}{'cpu ms/page':>14}{'bytes':>12}"
+        )
+        for viewset in (ProductViewSet, OrderProductViewSet, ReviewViewSet):
+            ordering = getattr(viewset, "ordering", None) or ("-id",)
+            queryset = viewset.queryset.order_by(*ordering)[:rows]
+            serializer_class = viewset.serializer_class
+            fast = ValuesSerializer.for_serializer(serializer_class)
+
+            def default():
+                data = serializer_class(queryset.all(), many=True).data
+                return JSONRenderer().render(data)
+
+            def values():
+                data = fast.to_representation(fast.values(queryset.all()))
+                return ORJSONRenderer().render(data)
+
+            count = queryset.count()
+            if not count:
+                self.stdout.write(
+                    self.style.WARNING(f"{viewset.queryset.model._meta.db_table}: sem linhas")
+                )
+                continue
+
+            results = {}
+            for label, render in (("default", default), ("values", values)):
+                results[label] = self._measure(render, repeat)
+                wall, cpu, size = results[label]
+                self.stdout.write(
+                    f"{viewset.queryset.model._meta.db_table:<16}{label:<8}"
+                    f"{count / wall:>12.0f}{cpu * 1000:>14.1f}{size:>12}"
+                )
+
+            speedup = results["default"][1] / results["values"][1] if results["values"][1] else 0
+            self.stdout.write(self.style.SUCCESS(f"{'':<16}{'cpu':<8}{speedup:>11.1f}x"))
+
+    @staticmethod
+    def _measure(render, repeat):
+        # Melhor de N execuções (tempo de parede e CPU do processo), incluindo as queries
+        render()
+        best_wall = best_cpu = float("inf")
+        for _ in range(repeat):
+            wall, cpu = time.perf_counter(), time.process_time()
+            size = len(render())
+            best_wall = min(best_wall, time.perf_counter() - wall)
+            best_cpu = min(best_cpu, time.process_time() - cpu)
+        return best_wall, best_cpu, size
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from ecommerce.models import Order, Review
+from ecommerce.views import (
+    ProductViewSet,
+    OrderViewSet,
+    ReviewViewSet,
+    ShippingViewSet,
+    PaymentViewSet,
+    AddressViewSet,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mostra o plano (EXPLAIN) das queries de listagem geradas pelos filtros "
+        "mais usados da API, indicando se usam índice ou seq scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--analyze", action="store_true", help="Executa as queries (EXPLAIN ANALYZE)."
+        )
+        parser.add_argument(
+            "--no-seqscan",
+            action="store_true",
+            help=(
+                "Desliga seq scan na sessão. Em tabelas pequenas o Postgres prefere seq scan "
+                "mesmo com índice; isso mostra se o índice é elegível para a query."
+            ),
+        )
+        parser.add_argument("--verbose-plan", action="store_true", help="Imprime o plano completo.")
+
+    def handle(self, *args, **options):
+        user_id = Order.objects.values_list("user_id", flat=True).first() or 1
+        product_id = Review.objects.values_list("product_id", flat=True).first() or 1
+
+        cases = [
+            (ProductViewSet, {"name": "camisa"}),
+            (OrderViewSet, {"user": user_id, "status": "p"}),
+            (OrderViewSet, {"status": "p"}),
+            (ReviewViewSet, {"product": product_id, "min_rating": 4}),
+            (ShippingViewSet, {"status": "pending"}),
+            (ShippingViewSet, {"tracking_number": "ec123456789br"}),
+            (PaymentViewSet, {"status": "completed"}),
+            (AddressViewSet, {"city": "forta"}),
+        ]
+
+        explain_options = {"analyze": True} if options["analyze"] else {}
+
+        with transaction.atomic():
+            if options["no_seqscan"]:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for viewset, params in cases:
+                queryset = viewset.filterset_class(params, queryset=viewset.queryset.all()).qs
+                queryset = queryset.order_by(*(getattr(viewset, "ordering", None) or ("-id",)))
+                plan = queryset[: settings.PAGE_SIZE + 1].explain(**explain_options)
+
+                label = "%s?%s" % (
+                    viewset.queryset.model._meta.db_table,
+                    "&".join(f"{key}={value}" for key, value in params.items()),
+                )
+                if "Seq Scan" in plan:
+                    self.stdout.write(self.style.WARNING(f"SEQ SCAN    {label}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"INDEX SCAN  {label}"))
+
+                if options["verbose_plan"]:
+                    self.stdout.write(plan + "\n")
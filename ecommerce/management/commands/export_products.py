@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce.services.catalog_transfer_service import CatalogTransferService
+
+
+class Command(BaseCommand):
+    help = "Exporta o catálogo inteiro em CSV ou JSONL, no formato aceito pelo import_products."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=CatalogTransferService.FORMATS, default="csv", help="Padrão: csv."
+        )
+        parser.add_argument("--output", help="Arquivo de saída (padrão: stdout).")
+
+    def handle(self, *args, **options):
+        rows = CatalogTransferService.export_products(options["format"])
+        if not options["output"]:
+            for row in rows:
+                self.stdout.write(row, ending="")
+            return
+
+        try:
+            with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                output.writelines(rows)
+        except OSError as exc:
+            raise CommandError(str(exc))
@@ -0,0 +1,53 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce.services.catalog_transfer_service import CatalogTransferService
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa produtos de um arquivo CSV ou JSONL em lotes (upsert pelo nome, "
+        "categorias pelo nome). Linhas inválidas são puladas e listadas no final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo .csv ou .jsonl.")
+        parser.add_argument(
+            "--format",
+            choices=CatalogTransferService.FORMATS,
+            help="Formato do arquivo (padrão: pela extensão).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CatalogTransferService.CHUNK_SIZE,
+            help=f"Linhas por lote (padrão: {CatalogTransferService.CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        fmt = options["format"] or path.suffix.lstrip(".").lower()
+        if fmt not in CatalogTransferService.FORMATS:
+            raise CommandError("Could not infer the format; use --format csv or --format jsonl.")
+        if options["chunk_size"] <= 0:
+            raise CommandError("--chunk-size must be greater than 0.")
+
+        start = time.perf_counter()
+        try:
+            with path.open(encoding="utf-8-sig", newline="") as lines:
+                report = CatalogTransferService.import_products(lines, fmt, options["chunk_size"])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - start
+
+        for error in report["errors"]:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{report['imported']} product(s) imported, {report['failed']} row(s) failed, "
+                f"{report['processed']} processed in {elapsed:.1f}s "
+                f"({report['processed'] / elapsed if elapsed else 0:.0f} rows/s)."
+            )
+        )
@@ -0,0 +1,99 @@
+import asyncio
+import ssl
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga simples para comparar servidores/rotas (ex.: WSGI x ASGI): "
+        "dispara N requisições GET com C conexões simultâneas e mostra vazão "
+        "(req/s) e latência (p50/p95/p99) de cada URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", help="URLs completas a testar, uma por vez.")
+        parser.add_argument(
+            "--requests", type=int, default=2000, help="Requisições por URL (padrão: 2000)."
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=100, help="Conexões simultâneas (padrão: 100)."
+        )
+        parser.add_argument("--token", help="Access token JWT (enviado como Bearer).")
+
+    def handle(self, *args, **options):
+        if options["requests"] <= 0 or options["concurrency"] <= 0:
+            raise CommandError("--requests and --concurrency must be greater than 0.")
+
+        self.stdout.write(
+            f"{'url':<60}{'ok':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        )
+        for url in options["urls"]:
+            ok, errors, elapsed, latencies = asyncio.run(
+                self._run(url, options["requests"], options["concurrency"], options["token"])
+            )
+            percentiles = (
+                statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+            )
+            self.stdout.write(
+                f"{url[:59]:<60}{ok:>7}{errors:>8}{ok / elapsed:>9.0f}"
+                f"{percentiles[49] * 1000:>9.1f}{percentiles[94] * 1000:>9.1f}"
+                f"{percentiles[98] * 1000:>9.1f}"
+            )
+
+    async def _run(self, url, total, concurrency, token):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise CommandError(f"Invalid URL: {url}")
+
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        request = (
+            f"GET {path or '/'} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "Accept: application/json\r\n"
+            "Connection: close\r\n"
+            + (f"Authorization: Bearer {token}\r\n" if token else "")
+            + "\r\n"
+        ).encode("ascii")
+        context = ssl.create_default_context() if parts.scheme == "https" else None
+
+        remaining = total
+        ok, errors, latencies = 0, 0, []
+
+        async def worker():
+            nonlocal remaining, ok, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    status = await self._get(parts.hostname, port, context, request)
+                except OSError:
+                    status = None
+                if status is not None and 200 <= status < 300:
+                    ok += 1
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+        return ok, errors, time.perf_counter() - start, latencies
+
+    @staticmethod
+    async def _get(host, port, context, request):
+        # Uma conexão por requisição (Connection: close), lendo a resposta até o fim
+        reader, writer = await asyncio.open_connection(host, port, ssl=context)
+        try:
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+            return int(status_line.split()[1])
+        except (IndexError, ValueError):
+            return None
+        finally:
+            writer.close()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce.services.rating_service import RatingService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula rating_avg, rating_count e o histograma de notas de todos os produtos "
+        "a partir das reviews (necessário após cargas em massa, que não disparam signals)."
+    )
+
+    def handle(self, *args, **options):
+        updated = RatingService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{updated} product(s) updated."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce.services.orderproduct_service import OrderProductService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o total de todos os pedidos a partir dos itens "
+        "(necessário após cargas em massa ou edições pelo admin, que não passam "
+        "pelos deltas do OrderProductService)."
+    )
+
+    def handle(self, *args, **options):
+        updated = OrderProductService.reconcile_totals()
+        self.stdout.write(self.style.SUCCESS(f"{updated} order(s) updated."))
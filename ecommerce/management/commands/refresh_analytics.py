@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce.services.analytics_service import AnalyticsService
+
+
+class Command(BaseCommand):
+    help = (
+        "Atualiza os agregados diários de vendas (analytics_daily_*) a partir dos pedidos "
+        "alterados desde o último refresh. Rodar periodicamente (ex.: cron a cada 5 minutos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recalcula todos os dias (necessário depois de apagar pedidos).",
+        )
+
+    def handle(self, *args, **options):
+        days = AnalyticsService.refresh(full=options["full"])
+        self.stdout.write(self.style.SUCCESS(f"{days} day(s) refreshed."))
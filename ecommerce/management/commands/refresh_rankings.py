@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce.services.analytics_service import AnalyticsService
+from ecommerce.services.ranking_service import RankingService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula os rankings de mais vendidos e melhor avaliados (product_rankings), "
+        "gerais e por categoria. Atualiza antes os agregados diários de vendas, de onde "
+        "saem os mais vendidos. Rodar periodicamente (ex.: cron a cada hora)."
+    )
+
+    def handle(self, *args, **options):
+        AnalyticsService.refresh()
+        counts = RankingService.refresh()
+        summary = ", ".join(f"{kind}: {count}" for kind, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Rankings refreshed ({summary})."))
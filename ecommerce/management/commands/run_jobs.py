@@ -0,0 +1,80 @@
+import logging
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from ecommerce.services.outbox_service import OutboxService
+
+
+logger = logging.getLogger("ecommerce.jobs")
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker da outbox (outbox_jobs): executa os jobs enfileirados pelos requests, "
+        "com retentativas e backoff. Cada thread pega um job por vez com SELECT ... FOR "
+        "UPDATE SKIP LOCKED, então é seguro rodar várias threads e vários processos. "
+        "SIGTERM/SIGINT terminam o job em andamento e encerram."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=1, help="Threads executando jobs (padrão: 1)."
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Segundos de espera quando a fila está vazia (padrão: 1).",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Executa os jobs vencidos e sai, em vez de continuar esperando novos.",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] <= 0 or options["interval"] <= 0:
+            raise CommandError("--concurrency and --interval must be greater than 0.")
+
+        self._stop = threading.Event()
+        self._processed = 0
+        self._lock = threading.Lock()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: self._stop.set())
+
+        threads = [
+            threading.Thread(target=self._work, args=(options["interval"], options["once"]))
+            for _ in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.stdout.write(self.style.SUCCESS(f"{self._processed} job(s) processed."))
+
+    def _work(self, interval, once):
+        # Cada thread tem a sua conexão com o banco
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                try:
+                    ran = OutboxService.run_next()
+                except Exception:
+                    # Ex.: banco fora do ar; tenta de novo depois do intervalo
+                    logger.exception("Outbox worker error")
+                    ran = False
+                    connection.close()
+
+                if ran:
+                    with self._lock:
+                        self._processed += 1
+                elif once:
+                    return
+                else:
+                    self._stop.wait(interval)
+        finally:
+            connection.close()
@@ -0,0 +1,172 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+from .query_profiler import QueryProfile, query_profiler
+
+
+# Métricas por rota (nome da URL ou, sem nome, o padrão do path, ex.:
+# "api/v1/products/<int:pk>/"), no formato texto do Prometheus em /metrics.
+# Com vários workers (gunicorn), PROMETHEUS_MULTIPROC_DIR faz o prometheus_client
+# agregar os valores de todos os processos.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+REQUESTS = Counter(
+    "ecommerce_http_requests_total",
+    "Requests by route, method and status.",
+    ["route", "method", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "ecommerce_http_request_duration_seconds",
+    "Request wall time.",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_DURATION = Histogram(
+    "ecommerce_http_db_duration_seconds",
+    "Time spent in SQL per request.",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "ecommerce_http_db_queries",
+    "SQL queries per request.",
+    ["route", "method"],
+    buckets=QUERY_BUCKETS,
+)
+DB_ROWS = Counter(
+    "ecommerce_http_db_rows_total",
+    "Rows returned by SELECTs.",
+    ["route", "method"],
+)
+SERIALIZATION_DURATION = Histogram(
+    "ecommerce_http_serialization_duration_seconds",
+    "Time spent serializing and rendering the response.",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class RequestMetrics:
+    """
+    Tempos e contadores de um request, preenchidos por record_query() e
+    track_serialization(). Compartilhado com as threads do sync_to_async,
+    já que o ContextVar é copiado com o contexto.
+
+    Com profile=True (request amostrado), o SQL também é agrupado por fingerprint
+    para o detector de N+1 (query_profiler.py).
+    """
+
+    __slots__ = (
+        "db_time",
+        "queries",
+        "rows",
+        "serialization_time",
+        "profile",
+        "slow_queries",
+        "_serializing",
+    )
+
+    def __init__(self, profile=False):
+        self.db_time = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.serialization_time = 0.0
+        self.profile = QueryProfile() if profile else None
+        self.slow_queries = []
+        self._serializing = False
+
+    def record(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.db_time += duration
+            self.queries += 1
+            if self.profile is not None:
+                self.profile.add(sql, duration)
+            if query_profiler.is_slow(duration):
+                self.slow_queries.append(query_profiler.slow_query(sql, duration))
+            rowcount = getattr(context["cursor"], "rowcount", -1)
+            if rowcount > 0 and sql.lstrip()[:6].upper() == "SELECT":
+                self.rows += rowcount
+
+    def observe(self, route, method, status, duration):
+        labels = {"route": route, "method": method}
+        REQUESTS.labels(status=str(status), **labels).inc()
+        REQUEST_DURATION.labels(**labels).observe(duration)
+        DB_DURATION.labels(**labels).observe(self.db_time)
+        DB_QUERIES.labels(**labels).observe(self.queries)
+        DB_ROWS.labels(**labels).inc(self.rows)
+        SERIALIZATION_DURATION.labels(**labels).observe(self.serialization_time)
+
+
+current_request_metrics = ContextVar("current_request_metrics", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    execute_wrapper instalado em todas as conexões (signals.py). As conexões
+    são por thread, e as views async rodam as queries em outras threads, então
+    o request atual vem do ContextVar e não de um wrapper por request.
+    """
+    metrics = current_request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.record(execute, sql, params, many, context)
+
+
+@contextmanager
+def track_serialization():
+    """
+    Soma o tempo do bloco ao tempo de serialização do request atual.
+    Chamadas aninhadas (ex.: serializer expandido dentro de outro) contam uma vez.
+    """
+    metrics = current_request_metrics.get()
+    if metrics is None or metrics._serializing:
+        yield
+        return
+
+    metrics._serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialization_time += time.perf_counter() - start
+        metrics._serializing = False
+
+
+def metrics_view(request):
+    """
+    /metrics no formato texto do Prometheus. Com METRICS_TOKEN definido,
+    exige ``Authorization: Bearer <token>``.
+    """
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponseForbidden()
+
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
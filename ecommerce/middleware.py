@@ -0,0 +1,96 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import RequestMetrics, current_request_metrics
+from .query_profiler import query_profiler
+
+logger = logging.getLogger("ecommerce.performance")
+
+
+class PerformanceMiddleware:
+    """
+    Mede cada request: tempo total, tempo e número de queries (record_query,
+    execute_wrapper das conexões), linhas lidas e tempo de serialização. O resultado
+    vai para o header Server-Timing, para um log JSON por request
+    (logger "ecommerce.performance") e para as métricas do Prometheus em /metrics.
+    Requests com N+1 ou queries lentas vão também para o query_profiler.
+
+    Deve ser o primeiro da lista de MIDDLEWARE, para cobrir os demais.
+    Funciona em WSGI e ASGI (views sync e async).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        metrics = RequestMetrics(profile=query_profiler.should_sample())
+        start = time.perf_counter()
+        token = current_request_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request_metrics.reset(token)
+        return self._finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics(profile=query_profiler.should_sample())
+        start = time.perf_counter()
+        token = current_request_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request_metrics.reset(token)
+        return self._finish(request, response, metrics, start)
+
+    def _finish(self, request, response, metrics, start):
+        duration = time.perf_counter() - start
+        route = self._get_route(request)
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f"total;dur={duration * 1000:.1f}",
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+                f"serialize;dur={metrics.serialization_time * 1000:.1f}",
+            ]
+        )
+
+        metrics.observe(route, request.method, response.status_code, duration)
+        query_profiler.report(request, route, response.status_code, duration, metrics)
+        logger.info(
+            json.dumps(
+                {
+                    "event": "request",
+                    "method": request.method,
+                    "path": request.path,
+                    "route": route,
+                    "status": response.status_code,
+                    "duration_ms": round(duration * 1000, 2),
+                    "db_ms": round(metrics.db_time * 1000, 2),
+                    "queries": metrics.queries,
+                    "rows": metrics.rows,
+                    "serialization_ms": round(metrics.serialization_time * 1000, 2),
+                }
+            )
+        )
+        return response
+
+    @staticmethod
+    def _get_route(request):
+        # Nome da URL ou, se não tiver, o padrão (ex.: "api/v1/products/<int:pk>/"),
+        # nunca o path em si, para não explodir a cardinalidade das métricas
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unmatched"
+        return match.url_name or match.route
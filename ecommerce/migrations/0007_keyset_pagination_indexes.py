@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0006_address_alter_shipping_address'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderproduct',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['created_at', 'id'], name='addresses_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['created_at', 'id'], name='cart_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='orders_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'id'], name='products_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at', 'id'], name='reviews_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipping',
+            index=models.Index(fields=['created_at', 'id'], name='shipping_created_at_id_idx'),
+        ),
+    ]
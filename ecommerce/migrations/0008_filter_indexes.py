@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:07
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY não bloqueia escrita em tabelas grandes, mas não roda em transação
+    atomic = False
+
+    dependencies = [
+        ('ecommerce', '0007_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='address',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('city'), name='gin_trgm_ops'), name='addresses_city_trgm_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='address',
+            index=models.Index(django.db.models.functions.text.Upper('state'), name='addresses_state_upper_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(models.F('user'), django.db.models.functions.text.Upper('status'), models.F('created_at'), name='orders_user_status_created_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(django.db.models.functions.text.Upper('status'), name='orders_status_upper_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(django.db.models.functions.text.Upper('status'), name='payment_status_upper_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='products_name_trgm_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='review',
+            index=models.Index(fields=['product', 'rating'], name='reviews_product_rating_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='shipping',
+            index=models.Index(django.db.models.functions.text.Upper('status'), name='shipping_status_upper_idx'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='shipping',
+            index=models.Index(django.db.models.functions.text.Upper('tracking_number'), name='shipping_tracking_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:08
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# O vetor é calculado por trigger para cobrir também bulk_create, update() e o upsert do import
+SEARCH_VECTOR_TRIGGER = """
+CREATE FUNCTION products_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('portuguese', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER products_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON products
+    FOR EACH ROW EXECUTE FUNCTION products_search_vector_update();
+
+UPDATE products SET name = name;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER IF EXISTS products_search_vector_trigger ON products;
+DROP FUNCTION IF EXISTS products_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0008_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGER, DROP_SEARCH_VECTOR_TRIGGER),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='products_search_vector_idx'),
+        ),
+    ]
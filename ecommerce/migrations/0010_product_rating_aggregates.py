@@ -0,0 +1,79 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+BACKFILL_RATINGS = """
+UPDATE products AS p SET
+    rating_1 = agg.rating_1,
+    rating_2 = agg.rating_2,
+    rating_3 = agg.rating_3,
+    rating_4 = agg.rating_4,
+    rating_5 = agg.rating_5,
+    rating_count = agg.rating_count,
+    rating_avg = agg.rating_avg
+FROM (
+    SELECT
+        product_id,
+        COUNT(*) FILTER (WHERE rating = 1) AS rating_1,
+        COUNT(*) FILTER (WHERE rating = 2) AS rating_2,
+        COUNT(*) FILTER (WHERE rating = 3) AS rating_3,
+        COUNT(*) FILTER (WHERE rating = 4) AS rating_4,
+        COUNT(*) FILTER (WHERE rating = 5) AS rating_5,
+        COUNT(*) AS rating_count,
+        ROUND(AVG(rating), 2) AS rating_avg
+    FROM reviews
+    GROUP BY product_id
+) AS agg
+WHERE p.id = agg.product_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0009_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['rating_avg', 'rating_count'], name='products_rating_idx'),
+        ),
+        migrations.RunSQL(BACKFILL_RATINGS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0011_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('best_sellers', 'Best sellers'), ('top_rated', 'Top rated')], max_length=20)),
+                ('position', models.PositiveIntegerField()),
+                ('score', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='ecommerce.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='ecommerce.product')),
+            ],
+            options={
+                'verbose_name': 'Product ranking',
+                'verbose_name_plural': 'Product rankings',
+                'db_table': 'product_rankings',
+                'indexes': [models.Index(fields=['kind', 'category', 'position', 'id'], name='rankings_kind_cat_pos_idx')],
+            },
+        ),
+    ]
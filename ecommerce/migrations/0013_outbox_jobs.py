@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:46
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0012_product_rankings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=5)),
+                ('run_after', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('failed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox job',
+                'verbose_name_plural': 'Outbox jobs',
+                'db_table': 'outbox_jobs',
+                'indexes': [models.Index(condition=models.Q(('failed_at__isnull', True)), fields=['run_after', 'id'], name='outbox_due_idx')],
+            },
+        ),
+    ]
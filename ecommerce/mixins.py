@@ -0,0 +1,263 @@
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.utils.cache import parse_etags, quote_etag
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .cache import catalog_cache
+from .fast_serializers import ValuesSerializer
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """
+    Pré-condições de um GET (If-None-Match, If-Modified-Since). O ETag usa
+    comparação fraca e tem precedência; last_modified é um timestamp em segundos.
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        etags = [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+        return "*" in etags or (etag is not None and etag.removeprefix("W/") in etags)
+
+    if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since") or "")
+    return (
+        if_modified_since is not None
+        and last_modified is not None
+        and last_modified <= if_modified_since
+    )
+
+
+def is_expanded(request):
+    """
+    ?expand= embute linhas de outras tabelas (categorias, usuário...), cujas
+    edições não mudam o updated_at da linha principal nem invalidam o cache
+    dela. Essas respostas não têm ETag nem passam pelo cache.
+    """
+    return bool(request.query_params.get("expand"))
+
+
+def not_modified_response(etag, last_modified=None):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    if etag is not None:
+        response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag e Last-Modified para list/retrieve, calculados com uma query leve
+    (só id e updated_at das linhas que a resposta teria). Se o cliente já tem
+    a versão atual, responde 304 sem carregar nem serializar os objetos.
+
+    Na listagem a impressão digital é da página pedida (filtros + cursor +
+    page_size) com os ids das linhas, o que cobre edições, inserções e remoções
+    dentro dela. Por isso a listagem só tem ETag fraco, sem Last-Modified: o
+    maior updated_at da página não muda quando uma linha sai dela.
+
+    No detalhe o ETag é forte e não depende da rota, então o mesmo valor serve
+    de If-Match / If-Unmodified-Since em PUT, PATCH e DELETE: se a linha mudou
+    desde que o cliente a leu, a escrita é recusada com 412.
+    Só serve para models com updated_at. Respostas com ?expand= não têm
+    validadores (ver is_expanded).
+    """
+
+    def list(self, request, *args, **kwargs):
+        if is_expanded(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        if self.paginator is not None:
+            queryset = self.paginator.get_page_queryset(queryset, request, view=self)
+
+        rows = queryset.values_list("pk", "updated_at")
+        fingerprint = "|".join(
+            [request.get_host(), request.get_full_path()]
+            + [f"{pk}:{updated_at.isoformat()}" for pk, updated_at in rows]
+        )
+        etag = "W/" + quote_etag(hashlib.md5(fingerprint.encode("utf-8")).hexdigest())
+
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        if is_expanded(request):
+            return super().retrieve(request, *args, **kwargs)
+
+        row = self._detail_rows(kwargs).first()
+        if row is None:
+            return super().retrieve(request, *args, **kwargs)  # 404
+
+        etag, last_modified = self._detail_validators(request, *row)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        # partial_update também passa por aqui
+        return self._precondition_response(super().update, request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self._precondition_response(super().destroy, request, *args, **kwargs)
+
+    def _precondition_response(self, handler, request, *args, **kwargs):
+        if_match = request.headers.get("If-Match")
+        if_unmodified_since = parse_http_date_safe(request.headers.get("If-Unmodified-Since") or "")
+        if if_match is None and if_unmodified_since is None:
+            return handler(request, *args, **kwargs)
+
+        # A linha fica travada entre a checagem e a escrita: duas escritas com
+        # o mesmo If-Match não passam ambas
+        with transaction.atomic():
+            row = self._detail_rows(kwargs).select_for_update().first()
+            if row is None:
+                return handler(request, *args, **kwargs)  # 404
+
+            etag, last_modified = self._detail_validators(request, *row)
+            if if_match is not None:
+                etags = parse_etags(if_match)
+                failed = "*" not in etags and etag not in etags
+            else:
+                failed = last_modified > if_unmodified_since
+            if failed:
+                return Response(
+                    {"detail": "The resource was modified since it was last read."},
+                    status=status.HTTP_412_PRECONDITION_FAILED,
+                )
+            return handler(request, *args, **kwargs)
+
+    def _detail_rows(self, kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return (
+            self.filter_queryset(self.get_queryset())
+            .prefetch_related(None)
+            .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+            .values_list("pk", "updated_at")
+        )
+
+    def _detail_validators(self, request, pk, updated_at):
+        # Sem o path: GET e escritas do mesmo objeto têm o mesmo ETag. A query
+        # string entra porque ?fields= / ?expand= mudam a representação
+        fingerprint = "|".join(
+            [
+                request.get_host(),
+                self.get_queryset().model._meta.label,
+                request.META.get("QUERY_STRING", ""),
+                f"{pk}:{updated_at.isoformat()}",
+            ]
+        )
+        etag = quote_etag(hashlib.md5(fingerprint.encode("utf-8")).hexdigest())
+        return etag, int(updated_at.timestamp())
+
+
+class CachedReadMixin:
+    """
+    Serve list/retrieve a partir do CatalogCache. As permissões já foram
+    checadas quando o handler roda, e o conteúdo não depende do usuário.
+
+    Guarda também o ETag e o Last-Modified da resposta (os do
+    ConditionalGetMixin, quando ele vem depois na MRO), então um GET
+    condicional com o cache quente responde 304 sem nenhuma query.
+    Respostas com ?expand= não são cacheadas (ver is_expanded).
+    """
+
+    cache_namespace = None
+    cached_headers = ("ETag", "Last-Modified")
+
+    def list(self, request, *args, **kwargs):
+        key = catalog_cache.list_key(self.cache_namespace, request)
+        return self._cached_response(key, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        key = catalog_cache.detail_key(self.cache_namespace, kwargs.get("pk"), request)
+        return self._cached_response(key, super().retrieve, request, *args, **kwargs)
+
+    def _cached_response(self, key, handler, request, *args, **kwargs):
+        if is_expanded(request):
+            return handler(request, *args, **kwargs)
+
+        cached = catalog_cache.get(self.cache_namespace, key)
+        if cached is not None:
+            data, headers = cached
+            etag = headers.get("ETag")
+            last_modified = parse_http_date_safe(headers.get("Last-Modified") or "")
+            if (etag or last_modified) and is_not_modified(request, etag, last_modified):
+                return not_modified_response(etag, last_modified)
+            return Response(data, headers=headers)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            headers = {name: response[name] for name in self.cached_headers if response.has_header(name)}
+            catalog_cache.set(key, (response.data, headers))
+        return response
+
+
+class SparseFieldsetMixin:
+    """
+    Aplica ?fields= / ?expand= (DynamicFieldsModelSerializer) na query das
+    leituras: só as colunas e relações que a resposta vai ler.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return queryset
+
+        serializer = self.get_serializer()
+        if not hasattr(serializer, "optimize_queryset"):
+            return queryset
+
+        # A paginação lê as colunas de ordenação de cada linha da página
+        ordering = []
+        for field in getattr(self, "ordering", None) or ():
+            try:
+                queryset.model._meta.get_field(field.lstrip("-"))
+            except FieldDoesNotExist:
+                continue  # anotação (ex.: rank da busca)
+            ordering.append(field.lstrip("-"))
+        return serializer.optimize_queryset(queryset, extra=ordering)
+
+
+class FastListMixin:
+    """
+    list() pelo ValuesSerializer: mesma saída do serializer da view, sem
+    instanciar models nem passar pelo to_representation de cada campo.
+    Respeita ?fields=; com ?expand= (objetos aninhados) usa o list() padrão.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        fields, expand = serializer_class.requested_fields(request)
+        if expand:
+            return super().list(request, *args, **kwargs)
+
+        fast = ValuesSerializer.for_serializer(serializer_class, tuple(sorted(fields)))
+        queryset = self.filter_queryset(self.get_queryset())
+
+        ordering = []
+        if self.paginator is not None:
+            # A paginação precisa ler as colunas de ordenação em cada linha
+            ordering = [
+                field.lstrip("-")
+                for field in self.paginator.get_ordering(request, queryset, self)
+            ]
+        rows = fast.values(queryset, extra=ordering)
+
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(fast.to_representation(rows))
+        return self.get_paginated_response(fast.to_representation(page))
@@ -2,6 +2,7 @@ from django.db import models
 from django.db.models import (
     CharField,
     PositiveSmallIntegerField,
+    DateField,
     DateTimeField,
     BooleanField,
     TextField,
@@ -11,9 +12,14 @@ from django.db.models import (
     OneToOneField,
     ManyToManyField,
     FloatField,
+    JSONField,
     Sum,
     F,
+    Q,
 )
+from django.db.models.functions import Now, Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -26,6 +32,17 @@ class Product(models.Model):
     stock = PositiveIntegerField(default=0)
     created_at = DateTimeField(auto_now_add=True)
     updated_at = DateTimeField(auto_now=True)
+    # Mantido por trigger no banco (nome com peso A, descrição com peso B, em português),
+    # para valer também em bulk_create/update, que não disparam signals
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Agregados das reviews, atualizados de forma incremental (ver services/rating_service.py)
+    rating_avg = DecimalField(max_digits=3, decimal_places=2, default=0)
+    rating_count = PositiveIntegerField(default=0)
+    rating_1 = PositiveIntegerField(default=0)
+    rating_2 = PositiveIntegerField(default=0)
+    rating_3 = PositiveIntegerField(default=0)
+    rating_4 = PositiveIntegerField(default=0)
+    rating_5 = PositiveIntegerField(default=0)
 
     @property
     def in_stock(self):
@@ -35,6 +52,13 @@ class Product(models.Model):
 
     class Meta:
         db_table = "products"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="products_created_at_id_idx"),
+            # icontains vira UPPER(name) LIKE UPPER('%q%'), que só usa índice de trigrama
+            GinIndex(OpClass(Upper("name"), name="gin_trgm_ops"), name="products_name_trgm_idx"),
+            GinIndex(fields=["search_vector"], name="products_search_vector_idx"),
+            models.Index(fields=["rating_avg", "rating_count"], name="products_rating_idx"),
+        ]
         verbose_name = "Product"
         verbose_name_plural = "Products"
 
@@ -70,6 +94,14 @@ class Order(models.Model):
 
     class Meta:
         db_table = "orders"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="orders_created_at_id_idx"),
+            # iexact vira UPPER(status) = UPPER('x')
+            models.Index(F("user"), Upper("status"), F("created_at"), name="orders_user_status_created_idx"),
+            models.Index(Upper("status"), name="orders_status_upper_idx"),
+            # Varredura incremental do refresh_analytics (updated_at > marca d'água)
+            models.Index(fields=["updated_at"], name="orders_updated_at_idx"),
+        ]
         verbose_name = "Order"
         verbose_name_plural = "Orders"
 
@@ -111,6 +143,10 @@ class Review(models.Model):
     class Meta:
         unique_together = ["user", "product"]
         db_table = "reviews"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="reviews_created_at_id_idx"),
+            models.Index(fields=["product", "rating"], name="reviews_product_rating_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name}"
@@ -123,6 +159,9 @@ class Cart(models.Model):
 
     class Meta:
         db_table = "cart"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="cart_created_at_id_idx"),
+        ]
         verbose_name = "Cart"
         verbose_name_plural = "Carts"
 
@@ -167,6 +206,11 @@ class Address(models.Model):
 
     class Meta:
         db_table = "addresses"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="addresses_created_at_id_idx"),
+            GinIndex(OpClass(Upper("city"), name="gin_trgm_ops"), name="addresses_city_trgm_idx"),
+            models.Index(Upper("state"), name="addresses_state_upper_idx"),
+        ]
         verbose_name = "Address"
         verbose_name_plural = "Addresses"
 
@@ -201,11 +245,16 @@ class Shipping(models.Model):
 
     class Meta:
         db_table = "shipping"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="shipping_created_at_id_idx"),
+            models.Index(Upper("status"), name="shipping_status_upper_idx"),
+            models.Index(Upper("tracking_number"), name="shipping_tracking_upper_idx"),
+        ]
         verbose_name = "Shipping"
         verbose_name_plural = "Shippings"
 
     def __str__(self):
-        return f"Shipping for Order {self.order.id} - {self.tracking_number or 'No Tracking'}"
+        return f"Shipping for Order {self.order_id} - {self.tracking_number or 'No Tracking'}"
 
 
 class Payment(models.Model):
@@ -228,8 +277,140 @@ class Payment(models.Model):
 
     class Meta:
         db_table = "payment"
+        indexes = [
+            models.Index(Upper("status"), name="payment_status_upper_idx"),
+        ]
         verbose_name = "Payment"
         verbose_name_plural = "Payments"
 
     def __str__(self):
         return self.payment_method
+
+
+# Analytics: agregados diários de vendas, recalculados por
+# services/analytics_service.py (comando refresh_analytics). O dia é o da
+# criação do pedido, no fuso do TIME_ZONE.
+
+
+class DailySales(models.Model):
+    day = DateField()
+    status = CharField(max_length=1, choices=Order.STATUS_CHOICES)
+    orders = PositiveIntegerField(default=0)
+    revenue = DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "analytics_daily_sales"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "status"], name="analytics_daily_sales_day_status_uniq"),
+        ]
+        verbose_name = "Daily sales"
+        verbose_name_plural = "Daily sales"
+
+    def __str__(self):
+        return f"{self.day} - {self.get_status_display()}"
+
+
+class DailyProductSales(models.Model):
+    day = DateField()
+    product = ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    units = PositiveIntegerField(default=0)
+    revenue = DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "analytics_daily_product_sales"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "product"], name="analytics_daily_product_uniq"),
+        ]
+        verbose_name = "Daily product sales"
+        verbose_name_plural = "Daily product sales"
+
+    def __str__(self):
+        return f"{self.day} - Product {self.product_id}"
+
+
+class DailyCategorySales(models.Model):
+    day = DateField()
+    category = ForeignKey(Category, on_delete=models.CASCADE, related_name="+")
+    units = PositiveIntegerField(default=0)
+    revenue = DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "analytics_daily_category_sales"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "category"], name="analytics_daily_category_uniq"),
+        ]
+        verbose_name = "Daily category sales"
+        verbose_name_plural = "Daily category sales"
+
+    def __str__(self):
+        return f"{self.day} - Category {self.category_id}"
+
+
+class AnalyticsWatermark(models.Model):
+    # Até onde (Order.updated_at) os agregados já foram recalculados
+    name = CharField(max_length=50, unique=True)
+    value = DateTimeField(blank=True, null=True)
+    refreshed_at = DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "analytics_watermark"
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class ProductRanking(models.Model):
+    # Listas ranqueadas da vitrine, recalculadas por services/ranking_service.py
+    # (comando refresh_rankings). category nula = ranking geral.
+    BEST_SELLERS = "best_sellers"
+    TOP_RATED = "top_rated"
+    KIND_CHOICES = [
+        (BEST_SELLERS, "Best sellers"),
+        (TOP_RATED, "Top rated"),
+    ]
+
+    kind = CharField(max_length=20, choices=KIND_CHOICES)
+    category = ForeignKey(Category, on_delete=models.CASCADE, blank=True, null=True, related_name="+")
+    position = PositiveIntegerField()
+    product = ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    score = DecimalField(max_digits=14, decimal_places=4)
+
+    class Meta:
+        db_table = "product_rankings"
+        indexes = [
+            models.Index(fields=["kind", "category", "position", "id"], name="rankings_kind_cat_pos_idx"),
+        ]
+        verbose_name = "Product ranking"
+        verbose_name_plural = "Product rankings"
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.position} - Product {self.product_id}"
+
+
+class OutboxJob(models.Model):
+    # Efeitos colaterais enfileirados na mesma transação de quem os gerou e
+    # executados pelo worker (comando run_jobs). Jobs concluídos são apagados;
+    # failed_at marca os que esgotaram as tentativas.
+    name = CharField(max_length=100)
+    payload = JSONField(default=dict, blank=True)
+    attempts = PositiveSmallIntegerField(default=0)
+    max_attempts = PositiveSmallIntegerField(default=5)
+    # Relógio do banco, o mesmo com que o worker compara (run_after <= NOW())
+    run_after = DateTimeField(db_default=Now())
+    last_error = TextField(blank=True, default="")
+    failed_at = DateTimeField(blank=True, null=True)
+    created_at = DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "outbox_jobs"
+        indexes = [
+            # Fila: só os jobs pendentes, na ordem em que o worker os pega
+            models.Index(
+                fields=["run_after", "id"], condition=Q(failed_at__isnull=True), name="outbox_due_idx"
+            ),
+        ]
+        verbose_name = "Outbox job"
+        verbose_name_plural = "Outbox jobs"
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
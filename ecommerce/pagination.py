@@ -0,0 +1,199 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginação por keyset com cursor opaco.
+
+    O cursor guarda os valores das colunas de ordenação da última (ou primeira)
+    linha da página, e a próxima página é obtida com um filtro do tipo
+    ``(created_at, id) < (x, y)``, sem OFFSET, e com um limite na primeira
+    coluna (``created_at <= x``) que o Postgres usa como faixa do índice.
+    Assim o custo de cada página é o mesmo, independente da posição na tabela.
+
+    A ordenação vem de ``view.ordering`` e precisa terminar em um campo único
+    (``id``) para que a posição seja sempre determinística.
+    """
+
+    ordering = ("-id",)
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "MAX_PAGE_SIZE", 100)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Versão async de paginate_queryset, para as views ASGI (async ORM).
+        """
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page([item async for item in queryset])
+
+    def _set_page(self, results):
+        reverse = self.cursor is not None and self.cursor["r"]
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = self.cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        return self.page
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Devolve, sem avaliar, o queryset da página pedida (com uma linha a mais,
+        para saber se existe próxima página).
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request, queryset)
+        return self.apply_cursor(queryset)[: self.page_size + 1]
+
+    def apply_cursor(self, queryset):
+        """
+        Ordena o queryset e aplica o filtro de keyset do cursor atual.
+        """
+        reverse = self.cursor is not None and self.cursor["r"]
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is None:
+            return queryset
+        return queryset.filter(self._keyset_filter(ordering, self.cursor["p"]))
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, "ordering", None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        assert ordering[-1].lstrip("-") in ("id", "pk"), (
+            "KeysetPagination requires the ordering to end with a unique "
+            "field ('id' or 'pk'), got %r." % (ordering,)
+        )
+        return tuple(ordering)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            position, reverse = cursor["p"], bool(cursor.get("r", 0))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        # Um cursor adulterado não pode chegar ao filtro com valores inválidos
+        try:
+            position = [
+                _ordering_field(queryset, field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (FieldDoesNotExist, ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in position):
+            raise NotFound(self.invalid_cursor_message)
+
+        return {"p": position, "r": reverse}
+
+    def encode_cursor(self, cursor):
+        tokens = {"p": [_to_json(value) for value in cursor["p"]]}
+        if cursor["r"]:
+            tokens["r"] = 1
+
+        encoded = urlsafe_b64encode(
+            json.dumps(tokens, separators=(",", ":")).encode("ascii")
+        ).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            # Página reversa vazia: continua a partir da posição do cursor atual
+            position = self.cursor["p"]
+        return self.encode_cursor({"p": position, "r": False})
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor({"p": position, "r": True})
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if isinstance(instance, dict):
+                position.append(instance[name])
+            else:
+                position.append(getattr(instance, name))
+        return position
+
+    @staticmethod
+    def _keyset_filter(ordering, position):
+        # (a, b, c) > (x, y, z)  ==  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        keyset = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            keyset |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+
+        # O OR sozinho não limita a primeira coluna, e o Postgres percorreria o
+        # índice desde o início da ordenação; a >= x vira a faixa do index scan
+        first, value = ordering[0], position[0]
+        bound = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{first.lstrip('-')}__{bound}": value}) & keyset
+
+
+def _ordering_field(queryset, name):
+    # Colunas anotadas (ex.: rank da busca) não são campos do model
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field
+    if name == "pk":
+        return queryset.model._meta.pk
+    return queryset.model._meta.get_field(name)
+
+
+def _reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith("-") else f"-{field}" for field in ordering
+    )
+
+
+def _to_json(value):
+    # Mantém a precisão total (microssegundos/decimais), ao contrário do DjangoJSONEncoder
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
@@ -0,0 +1,204 @@
+import json
+import logging
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger("ecommerce.performance")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\1)*", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+# Módulos da instrumentação, que aparecem na pilha de toda query
+_INTERNAL_MODULES = {"ecommerce.metrics", "ecommerce.middleware", __name__}
+
+
+def fingerprint(sql):
+    """
+    Forma normalizada da query: literais, números e parâmetros viram "?" e listas
+    (IN (...) e VALUES) de qualquer tamanho ficam iguais, para agrupar as queries
+    que só mudam de valor.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _VALUES_LIST.sub(r"VALUES \1, ...", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def caller_frame():
+    """
+    Primeiro frame do código do projeto (fora de Django, bibliotecas e deste
+    módulo) na pilha atual, como "ecommerce/models.py:173 in save".
+    """
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(base_dir)
+            and "site-packages" not in filename
+            and frame.f_globals.get("__name__") not in _INTERNAL_MODULES
+        ):
+            path = Path(filename).relative_to(base_dir)
+            return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class QueryProfile:
+    """
+    SQL de um request amostrado, agrupado por fingerprint. O frame de cada grupo
+    é o da segunda execução, que é onde a query se repete (o loop do N+1).
+    """
+
+    __slots__ = ("groups",)
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, sql, duration):
+        key = fingerprint(sql)
+        group = self.groups.get(key)
+        if group is None:
+            self.groups[key] = [1, duration, None]
+            return
+        group[0] += 1
+        group[1] += duration
+        if group[0] == 2:
+            group[2] = caller_frame()
+
+    def repeated(self, threshold):
+        return sorted(
+            (
+                {
+                    "fingerprint": key,
+                    "count": count,
+                    "db_ms": round(duration * 1000, 2),
+                    "frame": frame,
+                }
+                for key, (count, duration, frame) in self.groups.items()
+                if count >= threshold
+            ),
+            key=lambda group: group["count"],
+            reverse=True,
+        )
+
+
+class QueryProfiler:
+    """
+    Detector de N+1 e de queries lentas.
+
+    - Queries lentas (>= QUERY_PROFILER_SLOW_QUERY_MS) são registradas em todos
+      os requests; só elas pagam a inspeção da pilha.
+    - Uma fração dos requests (QUERY_PROFILER_SAMPLE_RATE) agrupa todo o SQL por
+      fingerprint; grupos com QUERY_PROFILER_REPEAT_THRESHOLD execuções ou mais
+      são sinalizados como N+1.
+
+    Os requests sinalizados vão para o log ("ecommerce.performance") e para um
+    buffer circular no cache (QUERY_PROFILER_BUFFER_SIZE entradas, compartilhado
+    entre os workers quando o cache é Redis/memcached), lido pelos admins em
+    /api/v1/query-profiles/, do pior para o melhor.
+
+    Cada entrada tem a sua chave ("slot"); o próximo slot vem de um contador
+    com cache.incr, que é atômico, então workers concorrentes não sobrescrevem
+    as entradas uns dos outros.
+    """
+
+    KEY = "query_profiler:requests"
+    COUNTER_KEY = f"{KEY}:next"
+    TIMEOUT = 60 * 60 * 24
+
+    @property
+    def cache(self):
+        return caches[settings.CATALOG_CACHE_ALIAS]
+
+    @staticmethod
+    def should_sample():
+        return random.random() < settings.QUERY_PROFILER_SAMPLE_RATE
+
+    @staticmethod
+    def is_slow(duration):
+        return duration * 1000 >= settings.QUERY_PROFILER_SLOW_QUERY_MS
+
+    @staticmethod
+    def slow_query(sql, duration):
+        return {
+            "fingerprint": fingerprint(sql),
+            "duration_ms": round(duration * 1000, 2),
+            "frame": caller_frame(),
+        }
+
+    def report(self, request, route, status, duration, metrics):
+        repeated = (
+            metrics.profile.repeated(settings.QUERY_PROFILER_REPEAT_THRESHOLD)
+            if metrics.profile is not None
+            else []
+        )
+        if not repeated and not metrics.slow_queries:
+            return
+
+        entry = {
+            "timestamp": time.time(),
+            "method": request.method,
+            "path": request.path,
+            "route": route,
+            "status": status,
+            "duration_ms": round(duration * 1000, 2),
+            "db_ms": round(metrics.db_time * 1000, 2),
+            "queries": metrics.queries,
+            "repeated_queries": repeated,
+            "slow_queries": metrics.slow_queries,
+        }
+        for group in repeated:
+            logger.warning(json.dumps({"event": "n_plus_one", "route": route, **group}))
+        for query in metrics.slow_queries:
+            logger.warning(json.dumps({"event": "slow_query", "route": route, **query}))
+
+        self.cache.set(self._slot_key(self._next_slot()), entry, self.TIMEOUT)
+
+    def worst(self):
+        """
+        Requests sinalizados no buffer, do pior (mais queries repetidas, depois mais
+        tempo de banco) para o melhor.
+        """
+        return sorted(
+            self.cache.get_many(self._slot_keys()).values(),
+            key=lambda entry: (
+                sum(group["count"] for group in entry["repeated_queries"]),
+                entry["db_ms"],
+            ),
+            reverse=True,
+        )
+
+    def clear(self):
+        self.cache.delete_many([*self._slot_keys(), self.COUNTER_KEY])
+
+    def _next_slot(self):
+        self.cache.add(self.COUNTER_KEY, 0, None)
+        try:
+            position = self.cache.incr(self.COUNTER_KEY)
+        except ValueError:
+            # Contador expulso do cache entre o add e o incr
+            self.cache.set(self.COUNTER_KEY, 1, None)
+            position = 1
+        return (position - 1) % settings.QUERY_PROFILER_BUFFER_SIZE
+
+    def _slot_key(self, slot):
+        return f"{self.KEY}:{slot}"
+
+    def _slot_keys(self):
+        return [self._slot_key(slot) for slot in range(settings.QUERY_PROFILER_BUFFER_SIZE)]
+
+
+query_profiler = QueryProfiler()
@@ -1,5 +1,13 @@
+import datetime
+
 from django.contrib.auth.models import User
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import track_serialization
 from .models import (
     Product,
     Category,
@@ -11,70 +19,285 @@ from .models import (
     Shipping,
     Payment,
     Address,
+    ProductRanking,
 )
 
 
-class UserSerializer(serializers.ModelSerializer):
+def _parse_paths(value):
+    # "id,product.name" -> {"id": {}, "product": {"name": {}}}
+    tree = {}
+    for path in (value or "").split(","):
+        node = tree
+        for part in filter(None, (part.strip() for part in path.split("."))):
+            node = node.setdefault(part, {})
+    return tree
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer com sparse fieldsets e expansão de relações, nas leituras:
+
+    - ``?fields=id,name,price`` devolve só esses campos;
+    - ``?expand=product`` troca o id do FK/M2M pelo objeto serializado
+      (``Meta.expandable``: campo -> classe do serializer). Relações
+      expandidas sempre aparecem na resposta, e ``?fields=product.name``
+      limita os campos do objeto expandido.
+
+    ``optimize_queryset`` monta a query correspondente: ``.only()`` com as
+    colunas pedidas, ``select_related`` para FKs expandidos e
+    ``prefetch_related`` só para os M2M que aparecem na resposta.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            fields, expand = self.requested_fields(self.context.get("request"))
+        self._requested_fields = fields or {}
+        self._requested_expand = expand or {}
+
+    @staticmethod
+    def requested_fields(request):
+        # Escritas sempre usam todos os campos, para não pular validação
+        if request is None or request.method not in SAFE_METHODS:
+            return {}, {}
+        return (
+            _parse_paths(request.query_params.get("fields")),
+            _parse_paths(request.query_params.get("expand")),
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        model = self.Meta.model
+        expandable = getattr(self.Meta, "expandable", {})
+
+        unknown = [name for name in self._requested_expand if name not in expandable]
+        if unknown:
+            raise serializers.ValidationError(
+                {"expand": [f"Cannot expand: {', '.join(unknown)}."]}
+            )
+        for name, expand in self._requested_expand.items():
+            model_field = model._meta.get_field(name)
+            fields[name] = expandable[name](
+                many=model_field.many_to_many,
+                read_only=True,
+                fields=self._requested_fields.get(name, {}),
+                expand=expand,
+            )
+
+        if self._requested_fields:
+            unknown = [name for name in self._requested_fields if name not in fields]
+            if unknown:
+                raise serializers.ValidationError(
+                    {"fields": [f"Unknown field(s): {', '.join(unknown)}."]}
+                )
+            fields = {
+                name: field
+                for name, field in fields.items()
+                if name in self._requested_fields or name in self._requested_expand
+            }
+        return fields
+
+    def to_representation(self, instance):
+        with track_serialization():
+            return super().to_representation(instance)
+
+    def optimize_queryset(self, queryset, extra=()):
+        """
+        Restringe o queryset às colunas e relações que a resposta vai ler.
+        `extra` são colunas adicionais (ex.: as de ordenação da paginação).
+        """
+        only, select_related, prefetch_related = self._get_query_plan()
+        return (
+            queryset.select_related(*select_related)
+            .prefetch_related(None)
+            .prefetch_related(*prefetch_related)
+            .only(*only, *extra)
+        )
+
+    def _get_query_plan(self, prefix=""):
+        model = self.Meta.model
+        only, select_related, prefetch_related = [prefix + model._meta.pk.name], [], []
+
+        for field in self.fields.values():
+            if field.write_only:
+                continue
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue  # campo calculado, não vem de uma coluna
+
+            path = prefix + field.source
+            if isinstance(field, serializers.ListSerializer):
+                related = model_field.related_model.objects.all()
+                prefetch_related.append(
+                    Prefetch(path, queryset=field.child.optimize_queryset(related))
+                )
+            elif isinstance(field, serializers.BaseSerializer):
+                # FK expandido: JOIN, com as colunas do objeto aninhado
+                nested = field._get_query_plan(path + "__")
+                only += [path] + nested[0]
+                select_related += [path] + nested[1]
+                prefetch_related += nested[2]
+            elif model_field.many_to_many:
+                related = model_field.related_model.objects.only("pk")
+                prefetch_related.append(Prefetch(path, queryset=related))
+            elif model_field.concrete:
+                only.append(path)
+
+        return only, select_related, prefetch_related
+
+
+class UserSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = User
         fields = "__all__"
+        extra_kwargs = {"password": {"write_only": True}}
 
+    def create(self, validated_data):
+        password = validated_data.pop("password")
+        user = super().create(validated_data)
+        user.set_password(password)
+        user.save(update_fields=["password"])
+        return user
 
-class ProductSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Product
-        fields = "__all__"
+    def update(self, instance, validated_data):
+        password = validated_data.pop("password", None)
+        user = super().update(instance, validated_data)
+        if password is not None:
+            user.set_password(password)
+            user.save(update_fields=["password"])
+        return user
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Category
         fields = "__all__"
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class ProductSerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = Product
+        exclude = ["search_vector"]
+        expandable = {"categories": CategorySerializer}
+        read_only_fields = [
+            "rating_avg",
+            "rating_count",
+            "rating_1",
+            "rating_2",
+            "rating_3",
+            "rating_4",
+            "rating_5",
+        ]
+
+    def update(self, instance, validated_data):
+        # Grava só as colunas enviadas: o PUT não sobrescreve o estoque nem os
+        # agregados de reviews, que mudam por F() enquanto o request roda
+        many_to_many = {
+            name: validated_data.pop(name)
+            for name in list(validated_data)
+            if instance._meta.get_field(name).many_to_many
+        }
+        for name, value in validated_data.items():
+            setattr(instance, name, value)
+        instance.save(update_fields=[*validated_data, "updated_at"])
+
+        for name, value in many_to_many.items():
+            getattr(instance, name).set(value)
+        return instance
+
+
+class ProductRankingSerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = ProductRanking
+        fields = ["id", "position", "score", "product", "category"]
+        expandable = {"product": ProductSerializer}
+
+
+class OrderSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Order
         fields = "__all__"
+        expandable = {"user": UserSerializer}
 
 
-class OrderProductSerializer(serializers.ModelSerializer):
+class OrderProductSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = OrderProduct
         fields = "__all__"
+        expandable = {"order": OrderSerializer, "product": ProductSerializer}
+
+
+class OrderProductItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class OrderProductBulkSerializer(serializers.Serializer):
+    order = serializers.IntegerField(min_value=1)
+    items = OrderProductItemSerializer(many=True, allow_empty=False, max_length=500)
+
 
+class CheckoutSerializer(serializers.Serializer):
+    payment_method = serializers.ChoiceField(choices=Payment.PAYMENT_CHOICES)
+    address = serializers.IntegerField(min_value=1, required=False)
 
-class ReviewSerializer(serializers.ModelSerializer):
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    # Intervalo de dias inclusivo; por padrão, os últimos 30 dias
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+    def validate(self, attrs):
+        attrs.setdefault("end", timezone.localdate())
+        attrs.setdefault("start", attrs["end"] - datetime.timedelta(days=29))
+        if attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError({"start": "Must be on or before 'end'."})
+        if (attrs["end"] - attrs["start"]).days > 366:
+            raise serializers.ValidationError({"start": "The range can span at most 366 days."})
+        return attrs
+
+
+class ReviewSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Review
         fields = "__all__"
+        expandable = {"product": ProductSerializer, "user": UserSerializer}
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Cart
         fields = "__all__"
+        expandable = {"user": UserSerializer}
 
 
-class CartProductSerializer(serializers.ModelSerializer):
+class CartProductSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = CartProduct
         fields = "__all__"
+        expandable = {"cart": CartSerializer, "product": ProductSerializer}
 
 
-class ShippingSerializer(serializers.ModelSerializer):
+class AddressSerializer(DynamicFieldsModelSerializer):
     class Meta:
-        model = Shipping
+        model = Address
         fields = "__all__"
+        expandable = {"user": UserSerializer}
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class ShippingSerializer(DynamicFieldsModelSerializer):
     class Meta:
-        model = Payment
+        model = Shipping
         fields = "__all__"
+        expandable = {"order": OrderSerializer, "address": AddressSerializer}
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class PaymentSerializer(DynamicFieldsModelSerializer):
     class Meta:
-        model = Address
+        model = Payment
         fields = "__all__"
+        expandable = {"order": OrderSerializer}
+
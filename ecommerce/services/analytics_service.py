@@ -0,0 +1,161 @@
+import datetime
+from contextlib import nullcontext
+
+from ecommerce.models import (
+    AnalyticsWatermark,
+    DailyCategorySales,
+    DailyProductSales,
+    DailySales,
+    Order,
+    OrderProduct,
+)
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+class AnalyticsService:
+    """
+    Agregados diários de vendas (analytics_daily_*), para os dashboards não
+    varrerem orders e order_product a cada consulta:
+
+    - DailySales: pedidos e receita (Order.total) por dia e status;
+    - DailyProductSales / DailyCategorySales: unidades e receita (OrderProduct.price)
+      por dia e produto/categoria, sem os pedidos cancelados. Um produto em duas
+      categorias conta nas duas.
+
+    O refresh é incremental: os pedidos com updated_at depois da marca d'água
+    dizem quais dias mudaram, e esses dias são recalculados inteiros (apaga e
+    insere de novo), então reprocessar um dia nunca duplica valores.
+    """
+
+    WATERMARK = 'sales'
+    # Reprocessa também os pedidos um pouco anteriores à marca, para não perder
+    # transações que gravaram updated_at antes da marca mas só fizeram commit depois
+    OVERLAP = datetime.timedelta(minutes=10)
+    DAYS_PER_BATCH = 31
+    EXCLUDED_STATUSES = ('C',)
+
+    @staticmethod
+    def refresh(full: bool = False) -> int:
+        """
+        Recalcula os dias afetados desde o último refresh (ou todos, com full=True,
+        necessário depois de apagar pedidos, que não deixam rastro em updated_at).
+        Retorna o número de dias recalculados.
+        """
+        watermark, _ = AnalyticsWatermark.objects.get_or_create(name=AnalyticsService.WATERMARK)
+
+        orders = Order.objects.all()
+        if not full and watermark.value is not None:
+            orders = orders.filter(updated_at__gt=watermark.value - AnalyticsService.OVERLAP)
+
+        mark = orders.aggregate(mark=Max('updated_at'))['mark']
+        days = sorted(
+            orders.annotate(day=TruncDate('created_at'))
+            .order_by()
+            .values_list('day', flat=True)
+            .distinct()
+        )
+
+        # O full apaga tudo e reconstrói em uma transação só: quem lê os
+        # agregados vê os dados antigos até o commit, nunca tabelas vazias ou
+        # pela metade. No incremental, cada lote de dias é trocado atomicamente
+        with transaction.atomic() if full else nullcontext():
+            if full:
+                for model in (DailySales, DailyProductSales, DailyCategorySales):
+                    model.objects.all().delete()
+
+            for start in range(0, len(days), AnalyticsService.DAYS_PER_BATCH):
+                AnalyticsService._rebuild_days(days[start:start + AnalyticsService.DAYS_PER_BATCH])
+
+        if mark is not None:
+            watermark.value = max(mark, watermark.value) if watermark.value else mark
+        watermark.save()
+        return len(days)
+
+    @staticmethod
+    @transaction.atomic
+    def _rebuild_days(days: list[datetime.date]) -> None:
+        # Limites em created_at para o índice (created_at, id) filtrar antes do TruncDate
+        tz = timezone.get_current_timezone()
+        created_range = (
+            datetime.datetime.combine(days[0], datetime.time.min, tzinfo=tz),
+            datetime.datetime.combine(days[-1] + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz),
+        )
+
+        orders = (
+            Order.objects.filter(created_at__gte=created_range[0], created_at__lt=created_range[1])
+            .annotate(day=TruncDate('created_at'))
+            .filter(day__in=days)
+            .order_by()
+        )
+        lines = (
+            OrderProduct.objects.filter(
+                order__created_at__gte=created_range[0], order__created_at__lt=created_range[1]
+            )
+            .exclude(order__status__in=AnalyticsService.EXCLUDED_STATUSES)
+            .annotate(day=TruncDate('order__created_at'))
+            .filter(day__in=days)
+            .order_by()
+        )
+
+        for model in (DailySales, DailyProductSales, DailyCategorySales):
+            model.objects.filter(day__in=days).delete()
+
+        DailySales.objects.bulk_create(
+            DailySales(**row)
+            for row in orders.values('day', 'status').annotate(
+                orders=Count('id'), revenue=Sum('total')
+            )
+        )
+        DailyProductSales.objects.bulk_create(
+            DailyProductSales(**row)
+            for row in lines.values('day', 'product_id').annotate(
+                units=Sum('quantity'), revenue=Sum('price')
+            )
+        )
+        DailyCategorySales.objects.bulk_create(
+            DailyCategorySales(**row)
+            for row in lines.filter(product__categories__isnull=False)
+            .values('day', category_id=F('product__categories'))
+            .annotate(units=Sum('quantity'), revenue=Sum('price'))
+        )
+
+    @staticmethod
+    def daily_sales(start: datetime.date, end: datetime.date, status: str | None = None) -> list[dict]:
+        rows = DailySales.objects.filter(day__gte=start, day__lte=end)
+        if status:
+            rows = rows.filter(status=status)
+        return [
+            {**row, 'revenue': str(row['revenue'])}
+            for row in rows.order_by('day', 'status').values('day', 'status', 'orders', 'revenue')
+        ]
+
+    @staticmethod
+    def top_products(start: datetime.date, end: datetime.date, limit: int) -> list[dict]:
+        rows = (
+            DailyProductSales.objects.filter(day__gte=start, day__lte=end)
+            .values('product_id', name=F('product__name'))
+            .annotate(units=Sum('units'), revenue=Sum('revenue'))
+            .order_by('-revenue', 'product_id')[:limit]
+        )
+        return [{**row, 'revenue': str(row['revenue'])} for row in rows]
+
+    @staticmethod
+    def top_categories(start: datetime.date, end: datetime.date, limit: int) -> list[dict]:
+        rows = (
+            DailyCategorySales.objects.filter(day__gte=start, day__lte=end)
+            .values('category_id', name=F('category__name'))
+            .annotate(units=Sum('units'), revenue=Sum('revenue'))
+            .order_by('-revenue', 'category_id')[:limit]
+        )
+        return [{**row, 'revenue': str(row['revenue'])} for row in rows]
+
+    @staticmethod
+    def last_refresh() -> datetime.datetime | None:
+        return (
+            AnalyticsWatermark.objects.filter(name=AnalyticsService.WATERMARK)
+            .values_list('refreshed_at', flat=True)
+            .first()
+        )
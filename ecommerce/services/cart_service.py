@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+from ecommerce.models import Cart, CartProduct
+from ecommerce.cache import catalog_cache
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Window
+from django.http import Http404
+
+
+class CartService:
+    """
+    Visão do carrinho pronta para exibir: itens com nome e preço do produto,
+    total de cada linha e total do carrinho, em uma única query.
+    O resultado fica no cache do catálogo por carrinho (um por usuário) e é
+    invalidado pelos signals de CartProduct e Product. O estoque fica de fora:
+    ele muda a cada checkout, e invalidar todos os carrinhos com o produto a
+    cada reserva custaria mais do que o cache economiza.
+    """
+
+    CACHE_NAMESPACE = 'carts'
+    CENT = Decimal('0.01')
+    LINE_TOTAL = ExpressionWrapper(
+        F('quantity') * F('product__price'), output_field=DecimalField(max_digits=14, decimal_places=2)
+    )
+
+    @staticmethod
+    def summary(cart_id: int, request) -> dict:
+        key = catalog_cache.detail_key(CartService.CACHE_NAMESPACE, cart_id, request)
+        summary = catalog_cache.get(CartService.CACHE_NAMESPACE, key)
+        if summary is None:
+            summary = CartService.build_summary(cart_id)
+            catalog_cache.set(key, summary)
+        return summary
+
+    @staticmethod
+    def build_summary(cart_id: int) -> dict:
+        # Os totais do carrinho vêm em cada linha, por funções de janela sobre
+        # o resultado inteiro (sem PARTITION BY): nada é somado em Python
+        items = list(
+            CartProduct.objects.filter(cart_id=cart_id)
+            .annotate(line_total=CartService.LINE_TOTAL)
+            .annotate(
+                cart_total=Window(Sum(CartService.LINE_TOTAL)),
+                cart_quantity=Window(Sum('quantity')),
+            )
+            .order_by('id')
+            .values(
+                'id',
+                'quantity',
+                'line_total',
+                'cart_total',
+                'cart_quantity',
+                'product_id',
+                user_id=F('cart__user_id'),
+                name=F('product__name'),
+                price=F('product__price'),
+            )
+        )
+
+        if not items:
+            # Carrinho vazio (ou inexistente): a query dos itens não diz qual
+            user_id = Cart.objects.filter(pk=cart_id).values_list('user_id', flat=True).first()
+            if user_id is None:
+                raise Http404('No Cart matches the given query.')
+            return CartService.empty_summary(user_id, cart_id)
+
+        return {
+            'id': cart_id,
+            'user': items[0]['user_id'],
+            'items': [
+                {
+                    'id': item['id'],
+                    'product': {
+                        'id': item['product_id'],
+                        'name': item['name'],
+                        'price': str(item['price']),
+                    },
+                    'quantity': item['quantity'],
+                    'line_total': str(item['line_total'].quantize(CartService.CENT)),
+                }
+                for item in items
+            ],
+            'total_quantity': items[0]['cart_quantity'],
+            'total': str(items[0]['cart_total'].quantize(CartService.CENT)),
+        }
+
+    @staticmethod
+    def empty_summary(user_id: int, cart_id: int | None = None) -> dict:
+        return {
+            'id': cart_id,
+            'user': user_id,
+            'items': [],
+            'total_quantity': 0,
+            'total': '0.00',
+        }
+
+    @staticmethod
+    def invalidate(cart_ids) -> None:
+        catalog_cache.invalidate(CartService.CACHE_NAMESPACE, cart_ids)
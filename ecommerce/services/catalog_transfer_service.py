@@ -0,0 +1,208 @@
+import csv
+from itertools import islice
+
+import orjson
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+
+from ecommerce.cache import catalog_cache
+from ecommerce.renderers import Echo
+from ecommerce.models import Category, Product
+from ecommerce.services.cart_service import CartService
+from ecommerce.services.ranking_service import RankingService
+
+
+class CatalogTransferService:
+    """
+    Importação e exportação de produtos em CSV ou JSONL (um objeto JSON por linha),
+    em streaming e em lotes, com memória limitada ao tamanho do lote.
+
+    Colunas/chaves: name, description, price, stock e categories (no CSV, nomes
+    separados por "|"; no JSONL, uma lista). O nome identifica o produto: os que
+    já existem são atualizados. Sem a coluna/chave categories, as categorias do
+    produto não mudam; com ela, são substituídas.
+    """
+
+    FORMATS = ('csv', 'jsonl')
+    FIELDS = ('name', 'description', 'price', 'stock')
+    CATEGORY_SEPARATOR = '|'
+    CHUNK_SIZE = 5000
+    MAX_REPORTED_ERRORS = 100
+
+    @staticmethod
+    def import_products(lines, fmt: str, chunk_size: int = CHUNK_SIZE) -> dict:
+        """
+        Importa as linhas (iterável de str, ex.: arquivo aberto em modo texto).
+        Cada lote é um bulk_create com upsert pelo nome e um INSERT em massa das
+        linhas de products_categories, na sua própria transação. Linhas inválidas
+        são puladas e reportadas, sem interromper a importação.
+        """
+        category_ids = dict(Category.objects.values_list('name', 'id'))
+        rows = CatalogTransferService._read(lines, fmt)
+        report = {'processed': 0, 'imported': 0, 'failed': 0, 'errors': []}
+
+        while chunk := list(islice(rows, chunk_size)):
+            products = {}
+            for line, row in chunk:
+                report['processed'] += 1
+                try:
+                    if isinstance(row, Exception):
+                        raise row
+                    product, categories = CatalogTransferService._clean(row, category_ids)
+                except ValueError as exc:
+                    report['failed'] += 1
+                    if len(report['errors']) < CatalogTransferService.MAX_REPORTED_ERRORS:
+                        report['errors'].append({'line': line, 'error': str(exc)})
+                    continue
+                # Nome repetido no mesmo lote: vale a última linha (o upsert não
+                # aceita atualizar a mesma linha duas vezes no mesmo comando)
+                products[product.name] = (product, categories)
+
+            if products:
+                CatalogTransferService._save(list(products.values()))
+                report['imported'] += len(products)
+
+        if report['imported']:
+            # bulk_create não dispara os signals de Product
+            catalog_cache.invalidate_all('products')
+            for namespace in RankingService.NAMESPACES.values():
+                catalog_cache.invalidate(namespace)
+            catalog_cache.invalidate_all(CartService.CACHE_NAMESPACE)
+        return report
+
+    @staticmethod
+    def export_products(fmt: str, chunk_size: int = CHUNK_SIZE):
+        """
+        Gera o catálogo inteiro, linha a linha, no mesmo formato aceito pela
+        importação. Lê em lotes por id (keyset), com duas queries por lote.
+        """
+        if fmt not in CatalogTransferService.FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}.")
+
+        writer = csv.writer(Echo())
+        if fmt == 'csv':
+            yield writer.writerow((*CatalogTransferService.FIELDS, 'categories'))
+
+        through = Product.categories.through
+        last_id = 0
+        while True:
+            products = list(
+                Product.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', *CatalogTransferService.FIELDS)[:chunk_size]
+            )
+            if not products:
+                return
+            last_id = products[-1][0]
+
+            categories = {}
+            for product_id, category in (
+                through.objects.filter(product_id__in=[product[0] for product in products])
+                .order_by('category__name')
+                .values_list('product_id', 'category__name')
+            ):
+                categories.setdefault(product_id, []).append(category)
+
+            for pk, name, description, price, stock in products:
+                if fmt == 'csv':
+                    yield writer.writerow((
+                        name,
+                        description,
+                        price,
+                        stock,
+                        CatalogTransferService.CATEGORY_SEPARATOR.join(categories.get(pk, ())),
+                    ))
+                else:
+                    yield orjson.dumps({
+                        'name': name,
+                        'description': description,
+                        'price': str(price),
+                        'stock': stock,
+                        'categories': categories.get(pk, []),
+                    }).decode() + '\n'
+
+    @staticmethod
+    def _read(lines, fmt: str):
+        """
+        (número da linha, dict) para cada registro; registros ilegíveis viram
+        (número da linha, ValueError) para serem reportados como inválidos.
+        """
+        if fmt == 'csv':
+            reader = csv.DictReader(lines)
+            for row in reader:
+                if None in row:
+                    yield reader.line_num, ValueError('Too many columns.')
+                else:
+                    yield reader.line_num, row
+        elif fmt == 'jsonl':
+            for number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    yield number, ValueError('Invalid JSON.')
+                    continue
+                yield number, row if isinstance(row, dict) else ValueError('Expected a JSON object.')
+        else:
+            raise ValueError(f"Unsupported format: {fmt}.")
+
+    @staticmethod
+    def _clean(row: dict, category_ids: dict[str, int]) -> tuple[Product, set[int] | None]:
+        # Valida com os próprios campos do model (to_python + validators), sem
+        # montar um serializer por linha
+        values = {}
+        for name in CatalogTransferService.FIELDS:
+            field = Product._meta.get_field(name)
+            value = row.get(name)
+            if isinstance(value, str):
+                value = value.strip()
+            if value in (None, '') and field.has_default():
+                value = field.get_default()
+            try:
+                values[name] = field.clean(value, None)
+            except DjangoValidationError as exc:
+                raise ValueError(f"{name}: {' '.join(exc.messages)}")
+
+        categories = row.get('categories')
+        if categories is None:
+            return Product(**values), None
+
+        if isinstance(categories, str):
+            categories = [
+                category.strip()
+                for category in categories.split(CatalogTransferService.CATEGORY_SEPARATOR)
+                if category.strip()
+            ]
+        elif not isinstance(categories, list) or not all(isinstance(c, str) for c in categories):
+            raise ValueError('categories: Expected a list of category names.')
+
+        unknown = [category for category in categories if category not in category_ids]
+        if unknown:
+            raise ValueError(f"categories: Unknown categories: {', '.join(unknown)}.")
+        return Product(**values), {category_ids[category] for category in categories}
+
+    @staticmethod
+    @transaction.atomic
+    def _save(products: list[tuple[Product, set[int] | None]]) -> None:
+        # Um INSERT ... ON CONFLICT (name) DO UPDATE para o lote; o pk vem no RETURNING
+        Product.objects.bulk_create(
+            [product for product, _ in products],
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=[*CatalogTransferService.FIELDS[1:], 'updated_at'],
+        )
+
+        replaced = [(product.pk, categories) for product, categories in products if categories is not None]
+        if not replaced:
+            return
+        through = Product.categories.through
+        through.objects.filter(product_id__in=[pk for pk, _ in replaced]).delete()
+        through.objects.bulk_create(
+            [
+                through(product_id=pk, category_id=category_id)
+                for pk, categories in replaced
+                for category_id in categories
+            ],
+            batch_size=CatalogTransferService.CHUNK_SIZE,
+        )
@@ -0,0 +1,87 @@
+from ecommerce.models import Cart, Order, OrderProduct, Payment, Shipping, Address
+from ecommerce.services.cart_service import CartService
+from ecommerce.services.stock_service import StockService
+from ecommerce.services.payment_service import PaymentService
+from ecommerce.services.shipping_service import ShippingService
+from ecommerce.services.identifier_service import IdentifierService
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import ValidationError
+from django.db import transaction
+
+
+class CheckoutService:
+
+    @staticmethod
+    def checkout(user, payment_method: str, address_id: int | None = None) -> Order:
+        """
+        Transforma o carrinho do usuário em um pedido em uma única transação.
+        O número de queries é constante, não importa quantos itens o carrinho tenha.
+        Se o ID da transação ou o rastreio colidirem, a transação inteira é refeita.
+        """
+        return IdentifierService.retry_on_collision(
+            lambda: CheckoutService._checkout(user, payment_method, address_id),
+            'transaction_id',
+            'tracking_number',
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def _checkout(user, payment_method: str, address_id: int | None) -> Order:
+        # Trava o carrinho para que dois checkouts simultâneos não gerem dois pedidos
+        cart = get_object_or_404(Cart.objects.select_for_update(), user=user)
+        items = list(cart.items.values_list('product_id', 'quantity'))
+        if not items:
+            raise ValidationError("Cart is empty.")
+
+        address = CheckoutService._get_address(user, address_id)
+
+        quantities = {}
+        for product_id, quantity in items:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        # Busca, valida e reserva o estoque de todos os produtos de uma vez
+        products = StockService.reserve_many(quantities)
+
+        lines = [
+            OrderProduct(
+                product=products[product_id],
+                quantity=quantity,
+                price=products[product_id].price * quantity,
+            )
+            for product_id, quantity in items
+        ]
+
+        order = Order.objects.create(user=user, total=sum(line.price for line in lines))
+        for line in lines:
+            line.order = order
+        OrderProduct.objects.bulk_create(lines)
+
+        Payment.objects.create(
+            order=order,
+            payment_method=payment_method,
+            status='Pending',
+            transaction_id=PaymentService.generate_transaction_id(),
+        )
+        Shipping.objects.create(
+            order=order,
+            address=address,
+            tracking_number=ShippingService.generate_tracking_number(),
+        )
+
+        # Limpa o carrinho (o signal ignora deletes em lote: uma invalidação só)
+        cart.items.all().delete()
+        CartService.invalidate([cart.pk])
+
+        return order
+
+    @staticmethod
+    def _get_address(user, address_id: int | None) -> Address:
+        addresses = Address.objects.filter(user=user)
+        if address_id is not None:
+            address = addresses.filter(pk=address_id).first()
+        else:
+            address = addresses.filter(is_default=True).first()
+
+        if address is None:
+            raise ValidationError("A valid shipping address is required.")
+        return address
@@ -0,0 +1,120 @@
+import os
+import random
+import secrets
+import threading
+import time
+from django.db import IntegrityError, connection
+
+
+class SnowflakeGenerator:
+    """
+    IDs de 63 bits no estilo snowflake, sem consultar o banco:
+
+        | 41 bits: ms desde EPOCH | 10 bits: nó | 12 bits: contador |
+
+    Cada processo gera até 4096 IDs por ms e depois espera o próximo ms; se o
+    relógio voltar, continua do último ms usado. O nó é sorteado por processo, de
+    novo depois de cada fork (os workers do gunicorn sobem com preload e herdariam
+    o nó do master), e o contador começa num valor aleatório a cada ms, para que
+    dois processos com o mesmo nó dificilmente gerem o mesmo ID.
+    """
+
+    EPOCH = 1735689600000  # 2025-01-01T00:00:00Z, em ms
+    NODE_BITS = 10
+    SEQUENCE_BITS = 12
+    MAX_NODE = (1 << NODE_BITS) - 1
+    MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+    def __init__(self):
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.node = secrets.randbelow(self.MAX_NODE + 1)
+        self._last_ms = -1
+        self._sequence = self._first_sequence = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            now = max(self._now(), self._last_ms)
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & self.MAX_SEQUENCE
+                if self._sequence == self._first_sequence:
+                    # Contador esgotado neste ms
+                    while now <= self._last_ms:
+                        now = self._now()
+            if now != self._last_ms:
+                self._sequence = self._first_sequence = random.getrandbits(self.SEQUENCE_BITS)
+            self._last_ms = now
+            return (
+                (now - self.EPOCH) << (self.NODE_BITS + self.SEQUENCE_BITS)
+                | self.node << self.SEQUENCE_BITS
+                | self._sequence
+            )
+
+    @staticmethod
+    def _now() -> int:
+        return time.time_ns() // 1_000_000
+
+
+class IdentifierService:
+    """
+    Identificadores únicos (rastreio, transação) gerados em memória, com dígito
+    verificador. A unicidade garantida é a da constraint UNIQUE no banco: se dois
+    processos sortearem o mesmo nó e gerarem o mesmo contador no mesmo ms, o
+    INSERT falha e retry_on_collision gera outro ID.
+    """
+
+    MAX_ATTEMPTS = 3
+
+    @staticmethod
+    def next_number() -> str:
+        """
+        Próximo ID em 19 dígitos decimais + dígito verificador (Luhn).
+        """
+        digits = f'{generator.next_id():019d}'
+        return digits + IdentifierService.check_digit(digits)
+
+    @staticmethod
+    def check_digit(digits: str) -> str:
+        # Luhn: detecta qualquer dígito trocado e a maioria das transposições
+        total = 0
+        for position, digit in enumerate(reversed(digits)):
+            value = int(digit)
+            if position % 2 == 0:
+                value *= 2
+                if value > 9:
+                    value -= 9
+            total += value
+        return str((10 - total % 10) % 10)
+
+    @staticmethod
+    def is_valid(number: str) -> bool:
+        return (
+            len(number) > 1
+            and number.isdigit()
+            and IdentifierService.check_digit(number[:-1]) == number[-1]
+        )
+
+    @staticmethod
+    def retry_on_collision(create, *fields: str):
+        """
+        Chama create() e repete se o INSERT falhar na constraint UNIQUE de um dos `fields`.
+        create() deve gerar um ID novo a cada chamada e abrir a própria transação,
+        se precisar de uma: dentro de um atomic() de fora, o Postgres invalida a
+        transação no erro e não dá para repetir, então o erro é propagado.
+        """
+        for attempt in range(1, IdentifierService.MAX_ATTEMPTS + 1):
+            try:
+                return create()
+            except IntegrityError as exc:
+                if (
+                    not any(field in str(exc) for field in fields)
+                    or attempt == IdentifierService.MAX_ATTEMPTS
+                    or connection.in_atomic_block
+                ):
+                    raise
+
+
+generator = SnowflakeGenerator()
@@ -1,67 +1,125 @@
 from ecommerce.models import OrderProduct, Product, Order
+from ecommerce.services.stock_service import StockService
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from rest_framework.exceptions import ValidationError
-from django.db.models import F, Sum, DecimalField
-from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+from django.db import connection, transaction
+
+
+# OrderProduct.price já é o preço da linha (preço unitário * quantidade)
+RECONCILE_SQL = """
+UPDATE orders AS o SET
+    total = agg.total,
+    updated_at = NOW()
+FROM (
+    SELECT
+        orders.id AS order_id,
+        COALESCE(SUM(order_product.price), 0) AS total
+    FROM orders
+    LEFT JOIN order_product ON order_product.order_id = orders.id
+    GROUP BY orders.id
+) AS agg
+WHERE o.id = agg.order_id
+  AND o.total IS DISTINCT FROM agg.total
+"""
+
 
 class OrderProductService:
 
     @staticmethod
+    @transaction.atomic
     def create_order_product(data):
-        product = get_object_or_404(Product, pk=data['product'])
-        order = get_object_or_404(Order, pk=data['order'])
+        product = get_object_or_404(Product.objects.only('price'), pk=data['product'])
         quantity = data['quantity']
 
         if quantity <= 0:
             raise ValidationError("'quantity' must be greater than 0.")
 
-        if product.stock < quantity:
-            raise ValidationError(f"Not enough stock. Available: {product.stock}")
-
         # Atualiza estoque
-        product.stock -= quantity
-        product.save()
+        StockService.reserve(product.pk, quantity)
 
         price = product.price * quantity
+        OrderProductService.apply_total_delta(data['order'], price)
 
         # Cria o pedido
         order_product = OrderProduct.objects.create(
-            order=order,
+            order_id=data['order'],
             product=product,
             quantity=quantity,
             price=price
         )
 
         return order_product
-    
+
+
+    @staticmethod
+    @transaction.atomic
+    def create_order_products(order_id: int, items: list[dict]) -> list[OrderProduct]:
+        quantities = {}
+        for item in items:
+            quantities[item['product']] = quantities.get(item['product'], 0) + item['quantity']
+
+        # Uma query para travar os produtos e um UPDATE para o estoque de todos
+        products = StockService.reserve_many(quantities)
+
+        order_products = [
+            OrderProduct(
+                order_id=order_id,
+                product=products[item['product']],
+                quantity=item['quantity'],
+                price=products[item['product']].price * item['quantity'],
+            )
+            for item in items
+        ]
+        OrderProductService.apply_total_delta(
+            order_id, sum(order_product.price for order_product in order_products)
+        )
+
+        return OrderProduct.objects.bulk_create(order_products)
+
 
     @staticmethod
     @transaction.atomic
     def remove_order_product(order_product_id: int) -> None:
+        # Trava a linha: dois DELETEs simultâneos do mesmo item não devolvem o
+        # estoque nem descontam o total duas vezes (o segundo não a encontra mais)
         try:
-            order_product = OrderProduct.objects.get(pk=order_product_id)
+            order_product = OrderProduct.objects.select_for_update().get(pk=order_product_id)
         except OrderProduct.DoesNotExist:
             raise ValueError("OrderProduct not found")
-        
-        product = order_product.product
-        order = order_product.order
 
         # Restore stock
-        product.stock += order_product.quantity
-        product.save(update_fields=['stock'])
+        StockService.release(order_product.product_id, order_product.quantity)
 
         # Remove OrderProduct
         order_product.delete()
 
         # Update order total
-        OrderProductService.update_order_total(order)
+        OrderProductService.apply_total_delta(order_product.order_id, -order_product.price)
 
 
     @staticmethod
-    def update_order_total(order: Order) -> None:
-        total = order.items.aggregate(
-            total=Sum(F('price') * F('quantity'), output_field=DecimalField()) 
-        )['total'] or 0
-        order.total = total
-        order.save(update_fields=['total'])
+    def apply_total_delta(order_id: int, delta) -> None:
+        """
+        Soma `delta` ao total do pedido com uma expressão F, sem reler os itens.
+        O UPDATE também trava a linha do pedido até o fim da transação, então
+        alterações concorrentes nos itens não perdem o total. Sempre depois do
+        estoque, para travar produtos e pedido na mesma ordem em todos os fluxos.
+        """
+        updated = Order.objects.filter(pk=order_id).update(
+            total=F('total') + delta, updated_at=Now()
+        )
+        if not updated:
+            raise Http404("No Order matches the given query.")
 
+    @staticmethod
+    def reconcile_totals() -> int:
+        """
+        Recalcula o total de todos os pedidos a partir dos itens em um único
+        UPDATE ... FROM agrupado. Só reescreve os pedidos que estavam divergentes.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(RECONCILE_SQL)
+            return cursor.rowcount
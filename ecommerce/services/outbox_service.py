@@ -0,0 +1,117 @@
+import datetime
+import logging
+import random
+import traceback
+
+from ecommerce.models import OutboxJob
+from django.db import transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+
+
+logger = logging.getLogger('ecommerce.jobs')
+
+
+class OutboxService:
+    """
+    Outbox transacional: o request só grava uma linha em outbox_jobs, na mesma
+    transação dos dados que geraram o efeito colateral (se ela fizer rollback,
+    o job some junto), e o worker (comando run_jobs) executa os jobs depois do
+    commit, sem broker externo.
+
+    Cada job roda na mesma transação que o trava (SELECT ... FOR UPDATE SKIP
+    LOCKED) e o apaga, então vários workers não pegam o mesmo job, um worker
+    que morre no meio devolve o job à fila, e o que o job grava no banco é
+    aplicado exatamente uma vez. Efeitos fora do banco (ex.: e-mail) são
+    "pelo menos uma vez" e devem tolerar repetição.
+
+    Um job que falha volta para a fila com backoff exponencial até esgotar
+    max_attempts; aí fica com failed_at preenchido, para inspeção no admin.
+    """
+
+    JOBS = {}
+    MAX_ATTEMPTS = 5
+    BACKOFF_BASE = datetime.timedelta(seconds=5)
+    BACKOFF_MAX = datetime.timedelta(hours=1)
+    MAX_ERROR_LENGTH = 5000
+
+    @staticmethod
+    def register(name: str, max_attempts: int = MAX_ATTEMPTS):
+        """
+        Decorator que registra uma função como job. Ela recebe o payload como
+        argumentos nomeados, então o payload precisa ser serializável em JSON.
+        """
+        def decorator(function):
+            OutboxService.JOBS[name] = (function, max_attempts)
+            return function
+        return decorator
+
+    @staticmethod
+    def enqueue(name: str, delay: datetime.timedelta | None = None, **payload) -> OutboxJob:
+        if name not in OutboxService.JOBS:
+            raise ValueError(f"Unknown job: {name}.")
+        _, max_attempts = OutboxService.JOBS[name]
+        job = OutboxJob(name=name, payload=payload, max_attempts=max_attempts)
+        if delay:
+            job.run_after = Now() + delay
+        job.save()
+        return job
+
+    @staticmethod
+    @transaction.atomic
+    def run_next() -> bool:
+        """
+        Executa o próximo job vencido. Retorna False se não havia nenhum livre.
+        """
+        job = (
+            OutboxJob.objects.select_for_update(skip_locked=True)
+            .filter(failed_at__isnull=True, run_after__lte=Now())
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return False
+
+        try:
+            function, _ = OutboxService.JOBS[job.name]
+        except KeyError:
+            OutboxService._fail(job, f"Unknown job: {job.name}.")
+            return True
+
+        try:
+            # Savepoint: o que o job gravou é desfeito se ele falhar, e a
+            # transação continua válida para registrar a falha
+            with transaction.atomic():
+                function(**job.payload)
+        except Exception:
+            OutboxService._fail(job, traceback.format_exc())
+        else:
+            job.delete()
+        return True
+
+    @staticmethod
+    def backoff(attempts: int) -> datetime.timedelta:
+        # Exponencial com jitter, para jobs que falharam juntos não voltarem juntos
+        delay = min(OutboxService.BACKOFF_BASE * 2 ** (attempts - 1), OutboxService.BACKOFF_MAX)
+        return delay * random.uniform(0.5, 1)
+
+    @staticmethod
+    def _fail(job: OutboxJob, error: str) -> None:
+        job.attempts += 1
+        job.last_error = error[-OutboxService.MAX_ERROR_LENGTH:]
+        if job.attempts >= job.max_attempts:
+            job.failed_at = timezone.now()
+            logger.error("Job %s #%s failed permanently after %s attempts:\n%s", job.name, job.pk, job.attempts, error)
+        else:
+            job.run_after = Now() + OutboxService.backoff(job.attempts)
+            logger.warning("Job %s #%s failed (attempt %s/%s):\n%s", job.name, job.pk, job.attempts, job.max_attempts, error)
+        job.save(update_fields=['attempts', 'last_error', 'failed_at', 'run_after'])
+
+    @staticmethod
+    def retry(queryset) -> int:
+        """
+        Devolve à fila jobs que esgotaram as tentativas, com as tentativas zeradas.
+        """
+        return queryset.filter(failed_at__isnull=False).update(
+            failed_at=None, attempts=0, run_after=Now()
+        )
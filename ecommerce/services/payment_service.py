@@ -1,11 +1,8 @@
-import uuid
-from ecommerce.models import Payment
+from ecommerce.services.identifier_service import IdentifierService
 
 class PaymentService:
 
     @staticmethod
     def generate_transaction_id() -> str:
-        while True:
-            transaction_id = str(uuid.uuid4()).replace('-', '')[:12].upper()
-            if not Payment.objects.filter(transaction_id=transaction_id).exists():
-                return transaction_id
+        # Sem consulta ao banco: a unicidade vem do gerador e da constraint UNIQUE
+        return IdentifierService.next_number()
@@ -0,0 +1,126 @@
+import datetime
+from decimal import Decimal
+
+from ecommerce.models import DailyProductSales, Product, ProductRanking
+from ecommerce.cache import catalog_cache
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Value, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+
+class RankingService:
+    """
+    Rankings da vitrine, gravados em product_rankings para que as páginas nunca
+    agreguem pedidos ou reviews no request. Cada lista existe no geral e por
+    categoria, com até SIZE posições:
+
+    - best_sellers: unidades vendidas nos últimos BEST_SELLERS_DAYS dias, lidas dos
+      agregados diários do analytics (DailyProductSales);
+    - top_rated: média bayesiana das notas, (média * n + média global * PRIOR) /
+      (n + PRIOR), para um produto com uma única review 5 estrelas não passar na
+      frente de um com centenas de reviews 4,8.
+    """
+
+    SIZE = 100
+    BEST_SELLERS_DAYS = 30
+    PRIOR = 10
+    NAMESPACES = {kind: f'rankings-{kind}' for kind, _ in ProductRanking.KIND_CHOICES}
+
+    @staticmethod
+    @transaction.atomic
+    def refresh() -> dict[str, int]:
+        """
+        Recalcula todos os rankings em uma transação: quem lê continua vendo os
+        rankings anteriores até o commit. Retorna o número de posições por lista.
+        """
+        rankings = [
+            *RankingService._best_sellers(),
+            *RankingService._top_rated(),
+        ]
+        ProductRanking.objects.all().delete()
+        ProductRanking.objects.bulk_create(rankings, batch_size=5000)
+
+        for namespace in RankingService.NAMESPACES.values():
+            catalog_cache.invalidate(namespace)
+
+        counts = {kind: 0 for kind in RankingService.NAMESPACES}
+        for ranking in rankings:
+            counts[ranking.kind] += 1
+        return counts
+
+    @staticmethod
+    def _best_sellers():
+        since = timezone.localdate() - datetime.timedelta(days=RankingService.BEST_SELLERS_DAYS - 1)
+        sales = DailyProductSales.objects.filter(day__gte=since).order_by()
+
+        overall = (
+            sales.values('product_id')
+            .annotate(score=Sum('units'))
+            .order_by('-score', 'product_id')[:RankingService.SIZE]
+        )
+        by_category = (
+            sales.filter(product__categories__isnull=False)
+            .values('product_id', category_id=F('product__categories'))
+            .annotate(score=Sum('units'))
+        )
+        return RankingService._build(ProductRanking.BEST_SELLERS, overall, by_category, ('-score', 'product_id'))
+
+    @staticmethod
+    def _top_rated():
+        totals = Product.objects.filter(rating_count__gt=0).aggregate(
+            ratings=Sum('rating_count'),
+            points=Sum(F('rating_avg') * F('rating_count'), output_field=DecimalField()),
+        )
+        if not totals['ratings']:
+            return []
+
+        prior = RankingService.PRIOR
+        mean = Decimal(totals['points']) / totals['ratings']
+        score = ExpressionWrapper(
+            (F('rating_avg') * F('rating_count') + Value(mean * prior))
+            / (F('rating_count') + Value(prior)),
+            output_field=DecimalField(max_digits=14, decimal_places=4),
+        )
+        rated = Product.objects.filter(rating_count__gt=0).annotate(score=score).order_by()
+
+        overall = (
+            rated.values('score', product_id=F('id'))
+            .order_by('-score', '-rating_count', 'id')[:RankingService.SIZE]
+        )
+        by_category = (
+            rated.filter(categories__isnull=False)
+            .values('score', 'rating_count', product_id=F('id'), category_id=F('categories'))
+        )
+        return RankingService._build(
+            ProductRanking.TOP_RATED, overall, by_category, ('-score', '-rating_count', 'product_id')
+        )
+
+    @staticmethod
+    def _build(kind, overall, by_category, ordering):
+        """
+        Posições do ranking geral (já ordenado e limitado) e dos rankings por
+        categoria, numerados no banco com ROW_NUMBER() OVER (PARTITION BY categoria).
+        """
+        rankings = [
+            ProductRanking(kind=kind, position=position, product_id=row['product_id'], score=row['score'])
+            for position, row in enumerate(overall, start=1)
+        ]
+        by_category = by_category.annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('category_id'),
+                order_by=[F(field[1:]).desc() if field.startswith('-') else F(field).asc() for field in ordering],
+            )
+        ).filter(position__lte=RankingService.SIZE)
+        rankings += [
+            ProductRanking(
+                kind=kind,
+                category_id=row['category_id'],
+                position=row['position'],
+                product_id=row['product_id'],
+                score=row['score'],
+            )
+            for row in by_category
+        ]
+        return rankings
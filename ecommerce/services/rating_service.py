@@ -0,0 +1,86 @@
+from ecommerce.models import Product
+from ecommerce.cache import catalog_cache
+from django.db import connection
+from django.db.models import F, Value, DecimalField
+from django.db.models.functions import Cast, Coalesce, NullIf, Now
+
+
+REBUILD_SQL = """
+UPDATE products AS p SET
+    rating_1 = agg.rating_1,
+    rating_2 = agg.rating_2,
+    rating_3 = agg.rating_3,
+    rating_4 = agg.rating_4,
+    rating_5 = agg.rating_5,
+    rating_count = agg.rating_count,
+    rating_avg = agg.rating_avg,
+    updated_at = NOW()
+FROM (
+    SELECT
+        products.id AS product_id,
+        COUNT(reviews.id) FILTER (WHERE reviews.rating = 1) AS rating_1,
+        COUNT(reviews.id) FILTER (WHERE reviews.rating = 2) AS rating_2,
+        COUNT(reviews.id) FILTER (WHERE reviews.rating = 3) AS rating_3,
+        COUNT(reviews.id) FILTER (WHERE reviews.rating = 4) AS rating_4,
+        COUNT(reviews.id) FILTER (WHERE reviews.rating = 5) AS rating_5,
+        COUNT(reviews.id) AS rating_count,
+        COALESCE(ROUND(AVG(reviews.rating), 2), 0) AS rating_avg
+    FROM products
+    LEFT JOIN reviews ON reviews.product_id = products.id
+    GROUP BY products.id
+) AS agg
+WHERE p.id = agg.product_id
+  AND (p.rating_1, p.rating_2, p.rating_3, p.rating_4, p.rating_5, p.rating_count, p.rating_avg)
+      IS DISTINCT FROM
+      (agg.rating_1, agg.rating_2, agg.rating_3, agg.rating_4, agg.rating_5, agg.rating_count, agg.rating_avg)
+"""
+
+
+class RatingService:
+
+    STARS = range(1, 6)
+
+    @staticmethod
+    def apply(product_id: int, added: int | None = None, removed: int | None = None) -> None:
+        """
+        Atualiza os agregados do produto com expressões F, sem reler as reviews.
+        `added`/`removed` são as notas que entraram/saíram (ambas em uma edição).
+        """
+        changes = {}
+        for rating, delta in ((added, 1), (removed, -1)):
+            if rating is not None:
+                changes[rating] = changes.get(rating, 0) + delta
+        changes = {rating: delta for rating, delta in changes.items() if delta}
+        if not changes:
+            return
+
+        count = F('rating_count') + sum(changes.values())
+        # Todas as F() enxergam os valores antigos da linha no mesmo UPDATE
+        total = sum(F(f'rating_{star}') * star for star in RatingService.STARS)
+        total += sum(rating * delta for rating, delta in changes.items())
+
+        Product.objects.filter(pk=product_id).update(
+            rating_count=count,
+            rating_avg=Coalesce(
+                Cast(total, DecimalField(max_digits=12, decimal_places=4)) / NullIf(count, 0),
+                Value(0),
+                output_field=DecimalField(max_digits=3, decimal_places=2),
+            ),
+            updated_at=Now(),
+            **{f'rating_{rating}': F(f'rating_{rating}') + delta for rating, delta in changes.items()},
+        )
+        catalog_cache.invalidate('products', [product_id])
+
+    @staticmethod
+    def rebuild() -> int:
+        """
+        Recalcula os agregados de todos os produtos em um único UPDATE ... FROM
+        agrupado. Só reescreve as linhas que estavam divergentes.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(REBUILD_SQL)
+            updated = cursor.rowcount
+
+        if updated:
+            catalog_cache.invalidate_all('products')
+        return updated
@@ -1,6 +1,4 @@
-import random
-import string
-from ecommerce.models import Shipping
+from ecommerce.services.identifier_service import IdentifierService
 
 class ShippingService:
 
@@ -9,8 +7,5 @@ class ShippingService:
 
     @staticmethod
     def generate_tracking_number() -> str:
-        while True:
-            num = ''.join(random.choices(string.digits, k=9))
-            tracking_number = f"{ShippingService.PREFIX}{num}{ShippingService.SUFFIX}"
-            if not Shipping.objects.filter(tracking_number=tracking_number).exists():
-                return tracking_number
+        # Sem consulta ao banco: a unicidade vem do gerador e da constraint UNIQUE
+        return f"{ShippingService.PREFIX}{IdentifierService.next_number()}{ShippingService.SUFFIX}"
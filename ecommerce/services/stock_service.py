@@ -0,0 +1,88 @@
+from ecommerce.models import Product
+from ecommerce.cache import catalog_cache
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import ValidationError
+from django.db.models import F, Case, When, PositiveIntegerField
+from django.db.models.functions import Now
+
+
+class StockService:
+
+    @staticmethod
+    def reserve(product_id: int, quantity: int) -> None:
+        """
+        Baixa o estoque com um UPDATE condicional (stock = stock - n WHERE stock >= n).
+        O próprio UPDATE trava a linha do produto até o fim da transação, então
+        checkouts concorrentes nunca vendem mais do que existe.
+        """
+        if quantity <= 0:
+            raise ValidationError("'quantity' must be greater than 0.")
+
+        updated = Product.objects.filter(pk=product_id, stock__gte=quantity).update(
+            stock=F('stock') - quantity, updated_at=Now()
+        )
+        if not updated:
+            product = get_object_or_404(Product.objects.only('stock'), pk=product_id)
+            raise ValidationError(f"Not enough stock. Available: {product.stock}")
+
+        # update() não dispara signals
+        StockService._invalidate([product_id])
+
+    @staticmethod
+    def release(product_id: int, quantity: int) -> None:
+        Product.objects.filter(pk=product_id).update(
+            stock=F('stock') + quantity, updated_at=Now()
+        )
+        StockService._invalidate([product_id])
+
+    @staticmethod
+    def reserve_many(quantities: dict[int, int]) -> dict[int, Product]:
+        """
+        Reserva o estoque de vários produtos de uma vez: trava todas as linhas
+        em uma única query, sempre na ordem do id (evita deadlock entre checkouts
+        que compartilham produtos), e baixa tudo em um único UPDATE.
+        Retorna os produtos travados, indexados pelo id.
+        """
+        if any(quantity <= 0 for quantity in quantities.values()):
+            raise ValidationError("'quantity' must be greater than 0.")
+
+        products = {
+            product.pk: product
+            for product in Product.objects.select_for_update()
+            .filter(pk__in=quantities)
+            .only('name', 'price', 'stock')
+            .order_by('pk')
+        }
+
+        missing = sorted(set(quantities) - set(products))
+        if missing:
+            raise ValidationError(f"Products not found: {missing}")
+
+        unavailable = [
+            f"{product.name} (available: {product.stock})"
+            for pk, product in products.items()
+            if product.stock < quantities[pk]
+        ]
+        if unavailable:
+            raise ValidationError(f"Not enough stock for: {', '.join(unavailable)}")
+
+        Product.objects.filter(pk__in=products).update(
+            stock=Case(
+                *[When(pk=pk, then=F('stock') - quantity) for pk, quantity in quantities.items()],
+                output_field=PositiveIntegerField(),
+            ),
+            updated_at=Now(),
+        )
+
+        StockService._invalidate(products)
+
+        for pk, product in products.items():
+            product.stock -= quantities[pk]
+
+        return products
+
+    @staticmethod
+    def _invalidate(product_ids) -> None:
+        # Só o detalhe dos produtos: cada checkout derrubaria todas as listagens
+        # em cache. O estoque nas listagens fica até CATALOG_CACHE_TIMEOUT atrasado.
+        catalog_cache.invalidate('products', product_ids, lists=False)
@@ -0,0 +1,124 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.db.models import QuerySet
+from django.db.models.functions import Now
+
+from .cache import catalog_cache
+from .metrics import record_query
+from .models import Product, Category, Review, CartProduct
+from .services.outbox_service import OutboxService
+from .services.ranking_service import RankingService
+from .services.cart_service import CartService
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    # Só edições (admin) pagam essa query; criações não têm pk ainda
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = (
+            Review.objects.filter(pk=instance.pk).values_list("product_id", "rating").first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def add_review_to_product_rating(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # Os agregados do produto são atualizados pelo worker (jobs.apply_rating)
+    if created:
+        OutboxService.enqueue("ratings.apply", product_id=instance.product_id, added=instance.rating)
+        return
+    if instance._previous_rating is None:
+        return
+
+    previous_product_id, previous_rating = instance._previous_rating
+    if previous_product_id != instance.product_id:
+        # Review movida para outro produto: sai de um e entra no outro
+        OutboxService.enqueue("ratings.apply", product_id=previous_product_id, removed=previous_rating)
+        OutboxService.enqueue("ratings.apply", product_id=instance.product_id, added=instance.rating)
+    elif previous_rating != instance.rating:
+        OutboxService.enqueue(
+            "ratings.apply",
+            product_id=instance.product_id,
+            added=instance.rating,
+            removed=previous_rating,
+        )
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_product_rating(sender, instance, origin=None, **kwargs):
+    # Reviews apagadas em cascata com o próprio produto: não há agregado a atualizar
+    if isinstance(origin, Product) or (isinstance(origin, QuerySet) and origin.model is Product):
+        return
+    OutboxService.enqueue("ratings.apply", product_id=instance.product_id, removed=instance.rating)
+
+
+# Cache do catálogo
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    catalog_cache.invalidate("products", [instance.pk])
+    # Os rankings expandem o produto (?expand=product)
+    for namespace in RankingService.NAMESPACES.values():
+        catalog_cache.invalidate(namespace)
+    # Nome e preço aparecem na visão dos carrinhos
+    catalog_cache.invalidate_all(CartService.CACHE_NAMESPACE)
+
+
+@receiver(post_save, sender=CartProduct)
+@receiver(post_delete, sender=CartProduct)
+def invalidate_cart_cache(sender, instance, origin=None, **kwargs):
+    # Um delete() em lote dispara um post_delete por linha: quem apaga em lote
+    # (checkout, admin) invalida cada carrinho uma vez só, depois do delete
+    if isinstance(origin, QuerySet) and origin.model is CartProduct:
+        return
+    CartService.invalidate([instance.cart_id])
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_products(sender, instance, **kwargs):
+    # As linhas de products_categories somem em cascata, sem m2m_changed
+    instance._product_ids = list(instance.products.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    catalog_cache.invalidate("categories", [instance.pk])
+    product_ids = getattr(instance, "_product_ids", None)
+    if product_ids:
+        touch_products(product_ids)
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def invalidate_product_categories_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._product_ids = list(instance.products.values_list("pk", flat=True))
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if reverse:
+        # category.products.add/remove/clear
+        product_ids = pk_set if action != "post_clear" else instance._product_ids
+    else:
+        product_ids = [instance.pk]
+    touch_products(product_ids)
+
+
+def touch_products(product_ids):
+    # Mudanças nas categorias alteram a representação do produto: atualiza o
+    # updated_at (usado nos ETags) e invalida o cache
+    Product.objects.filter(pk__in=product_ids).update(updated_at=Now())
+    catalog_cache.invalidate("products", product_ids)
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    # Na posição 0: connection.execute_wrapper() remove sempre o último da lista.
+    # O wrapper continua no objeto da conexão quando ela é reaberta
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
@@ -1,3 +1,2112 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import inspect
+import io
+import re
+import sys
+import threading
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import orjson
+from prometheus_client import REGISTRY
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.db.models import Sum
+from django.db.models.functions import Now
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import urls
+from .fast_serializers import ValuesSerializer
+from .pagination import KeysetPagination
+from .serializers import OrderProductSerializer, ProductSerializer, ReviewSerializer, ShippingSerializer
+from .models import (
+    Product,
+    Category,
+    Order,
+    OrderProduct,
+    Review,
+    Cart,
+    CartProduct,
+    Shipping,
+    Payment,
+    Address,
+    DailySales,
+    DailyProductSales,
+    DailyCategorySales,
+    ProductRanking,
+    OutboxJob,
+)
+from .services.analytics_service import AnalyticsService
+from .services.cart_service import CartService
+from .services.catalog_transfer_service import CatalogTransferService
+from .services.identifier_service import IdentifierService, SnowflakeGenerator
+from .services.orderproduct_service import OrderProductService
+from .services.outbox_service import OutboxService
+from .services.ranking_service import RankingService
+from .services.rating_service import RatingService
+from .services.shipping_service import ShippingService
+from .services.stock_service import StockService
+from .admin import ReviewAdmin
+from .cache import catalog_cache
+from .query_profiler import QueryProfile, caller_frame, fingerprint, query_profiler
+
+
+# O manifest do WhiteNoise só existe depois do collectstatic: os testes que
+# renderizam templates (admin) usam o storage simples
+PLAIN_STATIC_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class StockReservationConcurrencyTests(TransactionTestCase):
+    """
+    Dispara centenas de reservas em paralelo contra o mesmo produto.
+    Precisa de um banco com travas de linha (Postgres).
+    """
+
+    THREADS = 20
+    RESERVATIONS_PER_THREAD = 15  # 300 reservas no total
+    STOCK = 250
+    PRICE = Decimal("10.00")
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Hot SKU", description="Hot SKU", price=self.PRICE, stock=self.STOCK
+        )
+        self.user = User.objects.create_user(username="buyer", password="buyer")
+
+    def _run_in_parallel(self, reserve_once, repeat=RESERVATIONS_PER_THREAD, rejected=ValidationError):
+        barrier = threading.Barrier(self.THREADS)
+        results = {"ok": 0, "rejected": 0, "errors": []}
+        lock = threading.Lock()
+
+        def worker(index):
+            try:
+                barrier.wait()
+                for _ in range(repeat):
+                    try:
+                        reserve_once(index)
+                    except rejected:
+                        with lock:
+                            results["rejected"] += 1
+                    except Exception as exc:  # noqa: BLE001
+                        with lock:
+                            results["errors"].append(exc)
+                    else:
+                        with lock:
+                            results["ok"] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results["errors"], [])
+        return results
+
+    def test_parallel_stock_reservations_never_oversell(self):
+        results = self._run_in_parallel(lambda index: StockService.reserve(self.product.pk, 1))
+
+        total = self.THREADS * self.RESERVATIONS_PER_THREAD
+        self.product.refresh_from_db()
+        self.assertEqual(results["ok"], self.STOCK)
+        self.assertEqual(results["rejected"], total - self.STOCK)
+        self.assertEqual(self.product.stock, 0)
+
+    def test_parallel_order_products_keep_stock_lines_and_totals_consistent(self):
+        # quantity > 1: OrderProduct.price já inclui a quantidade, o total não pode multiplicá-la de novo
+        quantity = 3
+        orders = [Order.objects.create(user=self.user) for _ in range(self.THREADS)]
+
+        def reserve_once(index):
+            OrderProductService.create_order_product(
+                {"order": orders[index].pk, "product": self.product.pk, "quantity": quantity}
+            )
+
+        results = self._run_in_parallel(reserve_once)
+
+        self.product.refresh_from_db()
+        lines = OrderProduct.objects.filter(product=self.product)
+        self.assertEqual(results["ok"], self.STOCK // quantity)
+        self.assertEqual(self.product.stock, self.STOCK - results["ok"] * quantity)
+        self.assertEqual(lines.count(), results["ok"])
+        self.assertEqual(lines.aggregate(units=Sum("quantity"))["units"], results["ok"] * quantity)
+        for order in Order.objects.annotate(lines_total=Sum("items__price")):
+            self.assertEqual(order.total, order.lines_total or 0, order.pk)
+        self.assertEqual(
+            Order.objects.aggregate(total=Sum("total"))["total"],
+            self.PRICE * quantity * results["ok"],
+        )
+
+    def test_parallel_deletes_of_the_same_line_restore_stock_once(self):
+        order = Order.objects.create(user=self.user)
+        line = OrderProductService.create_order_product(
+            {"order": order.pk, "product": self.product.pk, "quantity": 4}
+        )
+
+        results = self._run_in_parallel(
+            lambda index: OrderProductService.remove_order_product(line.pk), repeat=1, rejected=ValueError
+        )
+
+        self.assertEqual((results["ok"], results["rejected"]), (1, self.THREADS - 1))
+        self.product.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(self.product.stock, self.STOCK)
+        self.assertEqual(order.total, 0)
+        self.assertFalse(OrderProduct.objects.exists())
+
+
+class QueryBudgetTests(APITestCase):
+    """
+    Garante um número máximo de queries e um tempo máximo para todas as rotas
+    GET de ecommerce/urls.py, com volumes realistas no banco. As listagens são
+    chamadas com dois tamanhos de página: se o número de queries mudar, há um N+1.
+    """
+
+    PRODUCTS = 2000
+    ORDERS = 2000
+    USERS = 50
+    REVIEWS_PER_USER = 40  # 2000 reviews
+
+    MAX_QUERIES = 4
+    LATENCY_BUDGET = 0.5  # segundos por request
+    SMALL_PAGE, LARGE_PAGE = 5, 100
+    LIST_ACTIONS = {"list", "search"}
+    QUERY_PARAMS = {"search": "q=product"}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        users = User.objects.bulk_create(
+            [User(username=f"user{i}", email=f"user{i}@example.com") for i in range(cls.USERS)]
+        )
+        categories = Category.objects.bulk_create([Category(name=f"Category {i}") for i in range(10)])
+        products = Product.objects.bulk_create(
+            [
+                Product(name=f"Product {i}", description=f"Description {i}", price=Decimal("9.90"), stock=100)
+                for i in range(cls.PRODUCTS)
+            ]
+        )
+        Product.categories.through.objects.bulk_create(
+            [
+                Product.categories.through(product_id=product.pk, category_id=categories[(i + j) % 10].pk)
+                for i, product in enumerate(products)
+                for j in range(2)
+            ]
+        )
+        orders = Order.objects.bulk_create(
+            [Order(user=users[i % cls.USERS], total=Decimal("19.80")) for i in range(cls.ORDERS)]
+        )
+        OrderProduct.objects.bulk_create(
+            [
+                OrderProduct(order=order, product=products[i], quantity=2, price=Decimal("19.80"))
+                for i, order in enumerate(orders)
+            ]
+        )
+        Review.objects.bulk_create(
+            [
+                Review(user=user, product=products[(u * cls.REVIEWS_PER_USER + j) % cls.PRODUCTS], rating=j % 5 + 1)
+                for u, user in enumerate(users)
+                for j in range(cls.REVIEWS_PER_USER)
+            ]
+        )
+        carts = Cart.objects.bulk_create([Cart(user=user) for user in users])
+        CartProduct.objects.bulk_create(
+            [CartProduct(cart=cart, product=products[i], quantity=1) for i, cart in enumerate(carts)]
+        )
+        addresses = Address.objects.bulk_create(
+            [
+                Address(user=user, recipient_name=user.username, street="Rua A", number="1", city="Fortaleza", state="CE")
+                for user in users
+            ]
+        )
+        Shipping.objects.bulk_create(
+            [
+                Shipping(order=order, address=addresses[i % cls.USERS], tracking_number=f"EC{i:09d}BR")
+                for i, order in enumerate(orders[:500])
+            ]
+        )
+        Payment.objects.bulk_create(
+            [
+                Payment(order=order, payment_method="Pix", status="Completed", transaction_id=f"TX{i:010d}")
+                for i, order in enumerate(orders[:500])
+            ]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+
+    def _get_routes(self):
+        """
+        Rotas GET de ecommerce/urls.py, com os parâmetros preenchidos por objetos existentes.
+        """
+        routes = []
+        for pattern in urls.urlpatterns:
+            actions = getattr(pattern.callback, "actions", {})
+            if "get" not in actions:
+                continue
+
+            queryset = getattr(pattern.callback.cls, "queryset", None)
+            values = {
+                "pk": queryset.order_by("pk").values_list("pk", flat=True).first()
+                if queryset is not None
+                else None,
+                "product_id": Review.objects.values_list("product_id", flat=True).first(),
+                "user_id": Review.objects.values_list("user_id", flat=True).first(),
+            }
+            path = re.sub(r"<int:(\w+)>", lambda match: str(values[match.group(1)]), str(pattern.pattern))
+            url = f"/api/v1/{path}?{self.QUERY_PARAMS.get(actions['get'], '')}"
+            routes.append((url, actions["get"]))
+        return routes
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = self.client.get(url)
+            elapsed = time.perf_counter() - start
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries), elapsed
+
+    def test_routes_stay_within_query_and_latency_budget(self):
+        for url, action in self._get_routes():
+            with self.subTest(url=url):
+                if action in self.LIST_ACTIONS:
+                    small, _ = self._get(f"{url}&page_size={self.SMALL_PAGE}")
+                    count, elapsed = self._get(f"{url}&page_size={self.LARGE_PAGE}")
+                    self.assertEqual(
+                        small, count, f"{url} runs a query per row (N+1): {small} != {count}"
+                    )
+                else:
+                    count, elapsed = self._get(url)
+
+                self.assertLessEqual(count, self.MAX_QUERIES, url)
+                self.assertLessEqual(elapsed, self.LATENCY_BUDGET, url)
+
+    def test_checkout_query_count_does_not_grow_with_cart(self):
+        def checkout(username, size):
+            user = User.objects.create_user(username)
+            Address.objects.create(
+                user=user, recipient_name=username, street="Rua A", number="1",
+                city="Fortaleza", state="CE", is_default=True,
+            )
+            cart = Cart.objects.create(user=user)
+            CartProduct.objects.bulk_create(
+                [CartProduct(cart=cart, product=product, quantity=1) for product in Product.objects.all()[:size]]
+            )
+            self.client.force_authenticate(user)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post("/api/v1/checkout/", {"payment_method": "Pix"}, format="json")
+            self.assertEqual(response.status_code, 201)
+            return len(queries)
+
+        self.assertEqual(checkout("small-cart", 2), checkout("large-cart", 50))
+
+
+class OrderProductBulkCreateTests(APITestCase):
+    """
+    POST /order-product/bulk-create/: todos os itens entram, ou nenhum.
+    """
+
+    URL = "/api/v1/order-product/bulk-create/"
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_authenticate(self.admin)
+        self.order = Order.objects.create(user=self.admin)
+        self.products = [
+            Product.objects.create(name=f"Product {i}", description="", price=Decimal("2.50"), stock=5)
+            for i in range(3)
+        ]
+
+    def _items(self, *quantities):
+        return [
+            {"product": product.pk, "quantity": quantity}
+            for product, quantity in zip(self.products, quantities)
+        ]
+
+    def _assert_nothing_changed(self):
+        self.assertFalse(OrderProduct.objects.exists())
+        self.assertEqual(
+            list(Product.objects.order_by("pk").values_list("stock", flat=True)), [5, 5, 5]
+        )
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total, 0)
+
+    def test_creates_all_lines_decrements_stock_and_updates_total(self):
+        response = self.client.post(
+            self.URL, {"order": self.order.pk, "items": self._items(1, 2, 5)}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(
+            list(Product.objects.order_by("pk").values_list("stock", flat=True)), [4, 3, 0]
+        )
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total, Decimal("20.00"))
+        self.assertEqual(
+            OrderProduct.objects.aggregate(total=Sum("price"))["total"], self.order.total
+        )
+
+    def test_rolls_back_everything_when_one_item_is_out_of_stock(self):
+        response = self.client.post(
+            self.URL, {"order": self.order.pk, "items": self._items(1, 2, 6)}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self._assert_nothing_changed()
+
+    def test_rolls_back_stock_when_the_order_does_not_exist(self):
+        response = self.client.post(
+            self.URL, {"order": self.order.pk + 1000, "items": self._items(1, 1, 1)}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self._assert_nothing_changed()
+
+    def test_rejects_unknown_products(self):
+        items = self._items(1) + [{"product": 999999, "quantity": 1}]
+        response = self.client.post(self.URL, {"order": self.order.pk, "items": items}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self._assert_nothing_changed()
+
+
+class OrderProductRouteTests(APITestCase):
+    """
+    order-product/product/<product_id>/ lista só as linhas do produto.
+    """
+
+    def setUp(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_authenticate(admin)
+        order = Order.objects.create(user=admin)
+        self.products = [
+            Product.objects.create(name=f"Product {i}", description="", price=Decimal("1.00"), stock=10)
+            for i in range(3)
+        ]
+        self.lines = {
+            product.pk: [
+                OrderProduct.objects.create(order=order, product=product, quantity=1, price=product.price).pk
+                for _ in range(i + 1)
+            ]
+            for i, product in enumerate(self.products)
+        }
+
+    def test_lists_only_the_lines_of_the_requested_product(self):
+        for product in self.products[:2]:
+            with self.subTest(product=product.pk):
+                response = self.client.get(f"/api/v1/order-product/product/{product.pk}/")
+                self.assertEqual(response.status_code, 200)
+                results = response.json()["results"]
+                self.assertEqual(sorted(row["id"] for row in results), sorted(self.lines[product.pk]))
+                self.assertEqual({row["product"] for row in results}, {product.pk})
+
+
+class RatingAggregateTests(APITestCase):
+    """
+    Agregados de reviews em Product: mantidos pelos jobs ratings.apply,
+    reconstruídos pelo rebuild e usados no filtro min_rating.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.users = [User.objects.create_user(f"user{i}") for i in range(3)]
+        self.category = Category.objects.create(name="Category")
+        self.product, self.other = [
+            Product.objects.create(name=name, description="", price=Decimal("1.00"), stock=10)
+            for name in ("Product", "Other")
+        ]
+
+    def _run_jobs(self):
+        while OutboxService.run_next():
+            pass
+
+    # No SQLite a média vira divisão inteira (CAST AS NUMERIC); só o Postgres a calcula como em produção
+    FIELDS = ("rating_count", "rating_1", "rating_2", "rating_3", "rating_4", "rating_5") + (
+        ("rating_avg",) if connection.vendor == "postgresql" else ()
+    )
+
+    def _aggregates(self, product):
+        return Product.objects.filter(pk=product.pk).values(*self.FIELDS).get()
+
+    def _expected(self, *ratings):
+        expected = {
+            "rating_count": len(ratings),
+            "rating_avg": (
+                (Decimal(sum(ratings)) / len(ratings)).quantize(Decimal("0.01")) if ratings else Decimal("0.00")
+            ),
+            **{f"rating_{star}": ratings.count(star) for star in range(1, 6)},
+        }
+        return {field: expected[field] for field in self.FIELDS}
+
+    def test_create_edit_and_delete_keep_aggregates_in_sync(self):
+        reviews = [
+            Review.objects.create(user=user, product=self.product, rating=rating)
+            for user, rating in zip(self.users, (5, 4, 2))
+        ]
+        self._run_jobs()
+        self.assertEqual(self._aggregates(self.product), self._expected(5, 4, 2))
+
+        reviews[2].rating = 3
+        reviews[2].save()
+        reviews[0].delete()
+        self._run_jobs()
+        self.assertEqual(self._aggregates(self.product), self._expected(4, 3))
+
+    def test_moving_a_review_updates_both_products(self):
+        review = Review.objects.create(user=self.users[0], product=self.product, rating=5)
+        Review.objects.create(user=self.users[1], product=self.other, rating=1)
+        self._run_jobs()
+
+        review.product = self.other
+        review.rating = 4
+        review.save()
+        self._run_jobs()
+
+        self.assertEqual(self._aggregates(self.product), self._expected())
+        self.assertEqual(self._aggregates(self.other), self._expected(1, 4))
+
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_rebuild_restores_drifted_aggregates(self):
+        # REBUILD_SQL usa UPDATE ... FROM e FILTER do Postgres
+        for user, rating in zip(self.users, (5, 3, 3)):
+            Review.objects.create(user=user, product=self.product, rating=rating)
+        self._run_jobs()
+        Product.objects.filter(pk=self.product.pk).update(rating_count=99, rating_avg=1, rating_5=0)
+        Product.objects.filter(pk=self.other.pk).update(rating_count=1, rating_avg=5, rating_5=1)
+
+        self.assertEqual(RatingService.rebuild(), 2)
+        self.assertEqual(self._aggregates(self.product), self._expected(5, 3, 3))
+        self.assertEqual(self._aggregates(self.other), self._expected())
+        self.assertEqual(RatingService.rebuild(), 0)
+
+    def test_min_rating_filter(self):
+        Review.objects.create(user=self.users[0], product=self.product, rating=5)
+        Review.objects.create(user=self.users[0], product=self.other, rating=2)
+        self._run_jobs()
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get("/api/v1/products/?min_rating=4")
+        self.assertEqual([row["id"] for row in response.json()["results"]], [self.product.pk])
+
+    def test_update_does_not_overwrite_concurrent_stock_and_rating_changes(self):
+        product = Product.objects.get(pk=self.product.pk)
+        # Mudanças por F() depois que a view carregou o produto
+        Product.objects.filter(pk=product.pk).update(stock=3, rating_count=7, rating_5=7, rating_avg=5)
+
+        serializer = ProductSerializer(
+            product, data={"name": "Renamed", "description": "New", "price": "2.00", "categories": [self.category.pk]}
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.price), ("Renamed", Decimal("2.00")))
+        self.assertEqual((product.stock, product.rating_count, product.rating_5), (3, 7, 7))
+
+
+class CatalogCacheTests(APITestCase):
+    """
+    Cache de leitura do catálogo: acertos, falhas e invalidação pelos signals.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.create_superuser("admin", "admin@example.com", "admin"))
+        self.category = Category.objects.create(name="Category")
+        self.product = Product.objects.create(name="Product", description="", price=Decimal("1.00"), stock=10)
+
+    def _get(self, url):
+        before = catalog_cache.stats()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        after = catalog_cache.stats()
+        namespace = url.split("/")[3]
+        hit = after[namespace]["hits"] - before[namespace]["hits"] == 1
+        return response.json(), hit, len(queries)
+
+    def test_second_read_is_a_hit_without_queries(self):
+        url = f"/api/v1/categories/{self.category.pk}/"
+        first, hit, _ = self._get(url)
+        self.assertFalse(hit)
+
+        second, hit, queries = self._get(url)
+        self.assertTrue(hit)
+        self.assertEqual(queries, 0)
+        self.assertEqual(first, second)
+
+    def test_query_params_are_part_of_the_key(self):
+        self._get("/api/v1/categories/?page_size=5")
+        _, hit, _ = self._get("/api/v1/categories/?page_size=6")
+        self.assertFalse(hit)
+        _, hit, _ = self._get("/api/v1/categories/?page_size=5")
+        self.assertTrue(hit)
+
+    def test_product_change_invalidates_detail_and_lists(self):
+        detail, listing = f"/api/v1/products/{self.product.pk}/", "/api/v1/products/"
+        self._get(detail)
+        self._get(listing)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "Renamed"
+            self.product.save()
+
+        for url in (detail, listing):
+            data, hit, _ = self._get(url)
+            self.assertFalse(hit, url)
+        self.assertEqual(data["results"][0]["name"], "Renamed")
+
+    def test_category_membership_change_invalidates_the_product(self):
+        url = f"/api/v1/products/{self.product.pk}/"
+        self._get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.categories.add(self.category)
+
+        data, hit, _ = self._get(url)
+        self.assertFalse(hit)
+        self.assertEqual(data["categories"], [self.category.pk])
+
+    def test_stock_moves_invalidate_only_the_product_detail(self):
+        detail, listing = f"/api/v1/products/{self.product.pk}/", "/api/v1/products/"
+        self._get(detail)
+        self._get(listing)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StockService.reserve(self.product.pk, 3)
+
+        data, hit, _ = self._get(detail)
+        self.assertFalse(hit)
+        self.assertEqual(data["stock"], 7)
+        _, hit, _ = self._get(listing)
+        self.assertTrue(hit)
+
+
+class ConditionalRequestTests(APITestCase):
+    """
+    ETag / Last-Modified: 304 nas leituras e 412 nas escritas com pré-condição.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_authenticate(self.admin)
+        self.product = Product.objects.create(name="Product", description="", price=Decimal("1.00"), stock=10)
+        self.detail = f"/api/v1/products/{self.product.pk}/"
+
+    def test_detail_revalidation_from_a_warm_cache_runs_no_queries(self):
+        response = self.client.get(self.detail)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertFalse(etag.startswith("W/"))
+
+        for headers in ({"If-None-Match": etag}, {"If-Modified-Since": last_modified}):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.detail, headers=headers)
+            self.assertEqual(response.status_code, 304, headers)
+            self.assertEqual(response["ETag"], etag)
+            self.assertEqual(len(queries), 0, headers)
+
+    def test_detail_revalidation_without_cache_skips_serialization(self):
+        etag = self.client.get(self.detail)["ETag"]
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.detail, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+
+    def test_changed_detail_is_sent_again(self):
+        etag = self.client.get(self.detail)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(self.detail, {"name": "Renamed"}, format="json")
+
+        response = self.client.get(self.detail, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_etag_is_weak_and_changes_when_a_row_leaves_the_page(self):
+        Order.objects.create(user=self.admin)
+        removed = Order.objects.create(user=self.admin)
+        response = self.client.get("/api/v1/orders/")
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith("W/"))
+        self.assertFalse(response.has_header("Last-Modified"))
+        self.assertEqual(self.client.get("/api/v1/orders/", headers={"If-None-Match": etag}).status_code, 304)
+
+        removed.delete()
+        response = self.client.get(
+            "/api/v1/orders/",
+            headers={"If-None-Match": etag, "If-Modified-Since": http_date(time.time() + 60)},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_write_with_a_stale_if_match_is_rejected(self):
+        etag = self.client.get(self.detail)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            StockService.reserve(self.product.pk, 1)  # escrita concorrente
+
+        response = self.client.patch(self.detail, {"name": "Lost update"}, format="json", headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 412)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.name, "Product")
+
+        etag = self.client.get(self.detail)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.detail, {"name": "Renamed"}, format="json", headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(self.detail, headers={"If-None-Match": etag}).status_code, 200)
+
+    def test_delete_with_if_unmodified_since_in_the_past_is_rejected(self):
+        url = f"/api/v1/products/{self.product.pk}/delete/"
+        response = self.client.delete(url, headers={"If-Unmodified-Since": http_date(time.time() - 3600)})
+        self.assertEqual(response.status_code, 412)
+        self.assertTrue(Product.objects.filter(pk=self.product.pk).exists())
+
+        response = self.client.delete(url, headers={"If-Match": self.client.get(self.detail)["ETag"]})
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Product.objects.filter(pk=self.product.pk).exists())
+
+
+class ValuesSerializerTests(APITestCase):
+    """
+    O caminho rápido das listagens devolve exatamente o mesmo que o
+    ModelSerializer da view.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_authenticate(self.admin)
+        categories = [Category.objects.create(name=f"Category {i}") for i in range(2)]
+        self.products = [
+            Product.objects.create(name=f"Product {i}", description="Text", price=Decimal("10.50") * (i + 1), stock=i)
+            for i in range(3)
+        ]
+        self.products[0].categories.set(categories)
+        self.products[1].categories.set(categories[:1])
+        order = Order.objects.create(user=self.admin)
+        for product in self.products:
+            OrderProduct.objects.create(order=order, product=product, quantity=2, price=product.price * 2)
+            Review.objects.create(product=product, user=self.admin, rating=4, review_text="")
+
+    def _assert_same_output(self, serializer_class, queryset, fields=()):
+        fast = ValuesSerializer.for_serializer(serializer_class, fields)
+        expected = serializer_class(queryset, many=True, fields=dict.fromkeys(fields, {}), expand={}).data
+        self.assertEqual(fast.to_representation(fast.values(queryset)), expected)
+
+    def test_matches_the_model_serializer(self):
+        for serializer_class, model in (
+            (ProductSerializer, Product),
+            (OrderProductSerializer, OrderProduct),
+            (ReviewSerializer, Review),
+        ):
+            with self.subTest(serializer_class.__name__):
+                self._assert_same_output(serializer_class, model.objects.order_by("pk"))
+
+    def test_matches_the_model_serializer_with_sparse_fields(self):
+        self._assert_same_output(
+            ProductSerializer, Product.objects.order_by("pk"), ("categories", "id", "price", "updated_at")
+        )
+
+    def test_list_route_matches_the_model_serializer(self):
+        response = self.client.get("/api/v1/products/")
+        expected = ProductSerializer(Product.objects.order_by("-created_at", "-id"), many=True, fields={}, expand={}).data
+        self.assertEqual(response.json()["results"], expected)
+
+
+class SparseFieldsetTests(APITestCase):
+    """
+    ?fields= / ?expand= nas leituras, e a senha nunca na saída.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_authenticate(self.admin)
+        self.category = Category.objects.create(name="Category")
+        self.product = Product.objects.create(name="Product", description="", price=Decimal("3.00"), stock=5)
+        self.product.categories.add(self.category)
+        self.order = Order.objects.create(user=self.admin)
+
+    def test_fields_limits_detail_and_list(self):
+        response = self.client.get(f"/api/v1/products/{self.product.pk}/?fields=id,name")
+        self.assertEqual(response.json(), {"id": self.product.pk, "name": "Product"})
+
+        response = self.client.get("/api/v1/products/?fields=price")
+        self.assertEqual(response.json()["results"], [{"price": "3.00"}])
+
+    def test_expand_nests_the_related_object(self):
+        response = self.client.get(f"/api/v1/products/{self.product.pk}/?fields=id&expand=categories")
+        self.assertEqual(
+            response.json(),
+            {"id": self.product.pk, "categories": [{"id": self.category.pk, "name": "Category"}]},
+        )
+
+        OrderProduct.objects.create(order=self.order, product=self.product, quantity=1, price=Decimal("3.00"))
+        response = self.client.get("/api/v1/order-product/?fields=quantity,product.name&expand=product")
+        self.assertEqual(response.json()["results"], [{"quantity": 1, "product": {"name": "Product"}}])
+
+    def test_expanded_responses_follow_related_edits(self):
+        detail = f"/api/v1/products/{self.product.pk}/?expand=categories"
+        urls = (detail, "/api/v1/products/?expand=categories", f"/api/v1/orders/{self.order.pk}/?expand=user")
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.has_header("ETag"))
+
+        # Nem a categoria nem o usuário mudam o updated_at do produto/pedido
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Renamed"
+            self.category.save()
+            User.objects.filter(pk=self.admin.pk).update(email="new@example.com")
+
+        response = self.client.get(detail, HTTP_IF_NONE_MATCH='"anything"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["categories"][0]["name"], "Renamed")
+        response = self.client.get(urls[1])
+        self.assertEqual(response.json()["results"][0]["categories"][0]["name"], "Renamed")
+        response = self.client.get(urls[2])
+        self.assertEqual(response.json()["user"]["email"], "new@example.com")
+
+    def test_expanded_list_does_not_query_per_row(self):
+        url = "/api/v1/order-product/?expand=order,product"
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            return len(queries)
+
+        OrderProduct.objects.create(order=self.order, product=self.product, quantity=1, price=Decimal("3.00"))
+        one_line = count_queries()
+        for _ in range(4):
+            OrderProduct.objects.create(order=self.order, product=self.product, quantity=1, price=Decimal("3.00"))
+        self.assertEqual(count_queries(), one_line)
+
+    def test_unknown_fields_and_expansions_are_rejected(self):
+        for query in ("fields=id,nope", "expand=nope", "expand=name"):
+            with self.subTest(query):
+                response = self.client.get(f"/api/v1/products/{self.product.pk}/?{query}")
+                self.assertEqual(response.status_code, 400)
+
+    def test_password_is_write_only(self):
+        response = self.client.post(
+            "/api/v1/users/register/",
+            {"username": "buyer", "email": "buyer@example.com", "password": "s3cret-pass"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertNotIn("password", response.json())
+        user = User.objects.get(username="buyer")
+        self.assertTrue(user.check_password("s3cret-pass"))
+
+        for url in (f"/api/v1/users/{user.pk}/", f"/api/v1/users/{user.pk}/?fields=id,password", "/api/v1/users/"):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn(user.password, response.content.decode())
+                self.assertNotIn('"password"', response.content.decode())
+
+
+class AsyncViewTests(APITestCase):
+    """
+    Views async: mesmas respostas, permissões e erros das views DRF.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.owner = User.objects.create_user("owner", "owner@example.com", "owner")
+        self.category = Category.objects.create(name="Category")
+        self.products = [
+            Product.objects.create(name=f"Product {i}", description="", price=Decimal("5.00"), stock=i)
+            for i in range(3)
+        ]
+        self.products[0].categories.add(self.category)
+        address = Address.objects.create(
+            user=self.owner, recipient_name="Owner", street="Rua A", number="1", city="Fortaleza", state="CE"
+        )
+        self.shipping = Shipping.objects.create(
+            order=Order.objects.create(user=self.owner), address=address, tracking_number="EC000000001BR"
+        )
+
+    def _authenticate(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_lists_match_the_sync_views(self):
+        self._authenticate(self.owner)
+        for path in (
+            "products/",
+            "products/?page_size=2",
+            "products/?in_stock=true&fields=id,stock",
+            f"products/?category={self.category.pk}",
+            "categories/",
+        ):
+            with self.subTest(path):
+                response = self.client.get(f"/api/v1/async/{path}")
+                self.assertEqual(response.status_code, 200)
+                expected = self.client.get(f"/api/v1/{path}").json()
+                self.assertEqual(response.json()["results"], expected["results"])
+                self.assertEqual(response.json()["next"] is None, expected["next"] is None)
+
+    def test_detail_matches_the_sync_view(self):
+        self._authenticate(self.owner)
+        product = self.products[0]
+        response = self.client.get(f"/api/v1/async/products/{product.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), self.client.get(f"/api/v1/products/{product.pk}/").json())
+        self.assertEqual(self.client.get("/api/v1/async/products/0/").status_code, 404)
+
+    def test_rejects_anonymous_users_writes_expand_and_invalid_filters(self):
+        self.assertEqual(self.client.get("/api/v1/async/products/").status_code, 401)
+
+        self._authenticate(self.admin)
+        self.assertEqual(self.client.post("/api/v1/async/products/", {}).status_code, 405)
+        self.assertEqual(self.client.get("/api/v1/async/products/?expand=categories").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/async/products/?min_rating=abc").status_code, 400)
+
+    def test_tracking_is_limited_to_the_order_owner(self):
+        url = "/api/v1/async/shippings/tracking/ec000000001br/"
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        self._authenticate(User.objects.create_user("other", "other@example.com", "other"))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        expected = ShippingSerializer(self.shipping, fields={}, expand={}).data
+        for user in (self.owner, self.admin):
+            with self.subTest(user=user.username):
+                self._authenticate(user)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected)
+
+
+@override_settings(QUERY_PROFILER_BUFFER_SIZE=40)
+class QueryProfilerBufferTests(APITestCase):
+    """
+    Buffer circular do query_profiler: reports concorrentes não se sobrescrevem.
+    """
+
+    def setUp(self):
+        query_profiler.clear()
+        self.addCleanup(query_profiler.clear)
+
+    def _report(self, path):
+        metrics = SimpleNamespace(
+            profile=None,
+            slow_queries=[{"fingerprint": "SELECT ?", "duration_ms": 250.0, "frame": None}],
+            db_time=0.25,
+            queries=1,
+        )
+        query_profiler.report(RequestFactory().get(path), path, 200, 0.3, metrics)
+
+    def test_concurrent_reports_are_all_kept(self):
+        # Troca de thread a cada poucas instruções, para intercalar os reports
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+        threads = [
+            threading.Thread(target=lambda i=i: [self._report(f"/t{i}/{j}/") for j in range(5)])
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        paths = {entry["path"] for entry in query_profiler.worst()}
+        self.assertEqual(paths, {f"/t{i}/{j}/" for i in range(8) for j in range(5)})
+
+    def test_keeps_only_the_latest_entries(self):
+        for i in range(45):
+            self._report(f"/r/{i}/")
+        paths = {entry["path"] for entry in query_profiler.worst()}
+        self.assertEqual(paths, {f"/r/{i}/" for i in range(5, 45)})
+
+
+class QueryProfilerDetectorTests(APITestCase):
+    """
+    Detector de N+1: fingerprints, limite de repetições e o frame sinalizado.
+    """
+
+    def setUp(self):
+        query_profiler.clear()
+        self.addCleanup(query_profiler.clear)
+
+    def test_fingerprint_collapses_values_and_lists(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 'it''s' AND b = 10 AND c IN (%s, %s, %s)"),
+            "SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...)",
+        )
+        self.assertEqual(
+            fingerprint('SELECT "x" FROM t WHERE id IN (1, 2)'),
+            fingerprint('SELECT "x" FROM t WHERE id IN (3,4,5,6)'),
+        )
+        self.assertEqual(
+            fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)"),
+            fingerprint("INSERT INTO t (a, b) VALUES (?, ?)"),
+        )
+        self.assertEqual(fingerprint("SELECT  1\n  FROM t1"), "SELECT ? FROM t1")
+
+    def test_repeated_honours_the_threshold(self):
+        profile = QueryProfile()
+        for i in range(4):
+            profile.add(f"SELECT * FROM a WHERE id = {i}", 0.001)
+        for i in range(2):
+            profile.add(f"SELECT * FROM b WHERE id = {i}", 0.001)
+        profile.add("SELECT * FROM c", 0.001)
+
+        self.assertEqual([group["count"] for group in profile.repeated(2)], [4, 2])
+        self.assertEqual(
+            [group["fingerprint"] for group in profile.repeated(4)], ["SELECT * FROM a WHERE id = ?"]
+        )
+        self.assertEqual(profile.repeated(5), [])
+
+    def test_caller_frame_is_the_project_frame(self):
+        line = inspect.currentframe().f_lineno + 1
+        frame = caller_frame()
+        self.assertEqual(frame, f"ecommerce/tests.py:{line} in test_caller_frame_is_the_project_frame")
+
+    @override_settings(
+        STORAGES=PLAIN_STATIC_STORAGES, QUERY_PROFILER_SAMPLE_RATE=1, QUERY_PROFILER_REPEAT_THRESHOLD=5
+    )
+    def test_flags_a_real_n_plus_one(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        product = Product.objects.create(name="Product", description="Text", price=Decimal("1.00"), stock=1)
+        for i in range(6):
+            Review.objects.create(user=User.objects.create_user(f"user{i}"), product=product, rating=5)
+        self.client.force_login(admin)
+
+        # Sem list_select_related, o __str__ de cada review busca o usuário e o produto
+        with mock.patch.object(ReviewAdmin, "list_select_related", False):
+            self.assertEqual(self.client.get("/admin/ecommerce/review/").status_code, 200)
+
+        [entry] = query_profiler.worst()
+        self.assertEqual(entry["route"], "ecommerce_review_changelist")
+        line = inspect.getsourcelines(Review.__str__)[1] + 1
+        groups = {group["fingerprint"].split(" FROM ")[1].split()[0]: group for group in entry["repeated_queries"]}
+        self.assertEqual(set(groups), {'"auth_user"', '"products"'})
+        for group in groups.values():
+            self.assertGreaterEqual(group["count"], 6)
+            self.assertEqual(group["frame"], f"ecommerce/models.py:{line} in __str__")
+
+        # Com o select_related, nada é sinalizado
+        query_profiler.clear()
+        self.client.get("/admin/ecommerce/review/")
+        self.assertEqual(query_profiler.worst(), [])
+
+
+class IdentifierServiceTests(SimpleTestCase):
+    """
+    IDs gerados em memória: formato, dígito verificador e ordem.
+    """
+
+    class ManualClockGenerator(SnowflakeGenerator):
+        def __init__(self, *times):
+            super().__init__()
+            self.times = list(times)
+
+        def _now(self):
+            # Repete o último valor quando a lista acaba
+            return self.times.pop(0) if len(self.times) > 1 else self.times[0]
+
+    def test_numbers_are_unique_and_valid(self):
+        numbers = [IdentifierService.next_number() for _ in range(20000)]
+        self.assertEqual(len(set(numbers)), len(numbers))
+        for number in numbers[:100]:
+            self.assertRegex(number, r"^\d{20}$")
+            self.assertTrue(IdentifierService.is_valid(number))
+
+    def test_numbers_are_unique_across_threads(self):
+        numbers = []
+        threads = [
+            threading.Thread(target=lambda: numbers.extend(IdentifierService.next_number() for _ in range(2000)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(numbers)), 16000)
+
+    def test_check_digit(self):
+        self.assertEqual(IdentifierService.check_digit("7992739871"), "3")
+        self.assertTrue(IdentifierService.is_valid("79927398713"))
+
+        number = IdentifierService.next_number()
+        for position in range(len(number)):
+            digit = str((int(number[position]) + 1) % 10)
+            with self.subTest(position=position):
+                self.assertFalse(IdentifierService.is_valid(number[:position] + digit + number[position + 1:]))
+        for invalid in ("", "7", "7992739871a", "79927398710"):
+            self.assertFalse(IdentifierService.is_valid(invalid), invalid)
+
+    def test_clock_going_back_reuses_the_last_millisecond(self):
+        start = SnowflakeGenerator.EPOCH + 10_000
+        generator = self.ManualClockGenerator(start, start - 5000, start + 1)
+        ids = [generator.next_id() for _ in range(3)]
+        self.assertEqual(len(set(ids)), 3)
+        shift = SnowflakeGenerator.NODE_BITS + SnowflakeGenerator.SEQUENCE_BITS
+        self.assertEqual([id_ >> shift for id_ in ids], [10_000, 10_000, 10_001])
+
+    def test_waits_for_the_next_millisecond_when_the_sequence_is_exhausted(self):
+        start = SnowflakeGenerator.EPOCH + 10_000
+        generator = self.ManualClockGenerator(*[start] * (SnowflakeGenerator.MAX_SEQUENCE + 2), start + 1)
+        ids = [generator.next_id() for _ in range(SnowflakeGenerator.MAX_SEQUENCE + 2)]
+        self.assertEqual(len(set(ids)), len(ids))
+        shift = SnowflakeGenerator.NODE_BITS + SnowflakeGenerator.SEQUENCE_BITS
+        self.assertEqual(ids[-1] >> shift, 10_001)
+
+    def test_retry_on_collision(self):
+        calls = []
+
+        def create(errors):
+            calls.append(None)
+            if errors:
+                raise errors.pop(0)
+            return "created"
+
+        collisions = [IntegrityError("UNIQUE constraint failed: shipping.tracking_number")]
+        result = IdentifierService.retry_on_collision(lambda: create(collisions), "tracking_number")
+        self.assertEqual((result, len(calls)), ("created", 2))
+
+        calls.clear()
+        collisions = [IntegrityError("tracking_number") for _ in range(IdentifierService.MAX_ATTEMPTS)]
+        with self.assertRaises(IntegrityError):
+            IdentifierService.retry_on_collision(lambda: create(collisions), "tracking_number")
+        self.assertEqual(len(calls), IdentifierService.MAX_ATTEMPTS)
+
+        calls.clear()
+        errors = [IntegrityError("NOT NULL constraint failed: shipping.order_id")]
+        with self.assertRaises(IntegrityError):
+            IdentifierService.retry_on_collision(lambda: create(errors), "tracking_number")
+        self.assertEqual(len(calls), 1)
+
+
+class IdentifierCollisionTests(TransactionTestCase):
+    """
+    Um ID repetido esbarra na constraint UNIQUE e o request gera outro.
+    """
+
+    def test_shipping_creation_retries_a_colliding_tracking_number(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        address = Address.objects.create(
+            user=admin, recipient_name="Admin", street="Rua A", number="1", city="Fortaleza", state="CE"
+        )
+        taken = ShippingService.generate_tracking_number()
+        Shipping.objects.create(order=Order.objects.create(user=admin), address=address, tracking_number=taken)
+
+        # O próximo número sorteado colide com o existente
+        numbers = iter([taken[2:-2]])
+        original = IdentifierService.next_number
+        patcher = mock.patch.object(
+            IdentifierService, "next_number", staticmethod(lambda: next(numbers, None) or original())
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.post(
+            "/api/v1/shippings/create/",
+            {"order": Order.objects.create(user=admin).pk, "address": address.pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        tracking_number = response.json()["tracking_number"]
+        self.assertNotEqual(tracking_number, taken)
+        self.assertTrue(IdentifierService.is_valid(tracking_number[2:-2]))
+
+
+class CatalogTransferTests(APITestCase):
+    """
+    Importação/exportação do catálogo em CSV e JSONL.
+    """
+
+    IMPORT_URL = "/api/v1/products/import/"
+    EXPORT_URL = "/api/v1/products/export/"
+    CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_superuser("admin", "admin@example.com", "admin"))
+        self.categories = [Category.objects.create(name=name) for name in ("Books", "Games")]
+        for i in range(5):
+            product = Product.objects.create(
+                name=f"Product {i}", description=f'Line "{i}", with comma', price=Decimal("1.25") * (i + 1), stock=i
+            )
+            product.categories.set(self.categories[: i % 3])
+
+    def _export(self, fmt):
+        response = self.client.get(f"{self.EXPORT_URL}?output={fmt}")
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def _import(self, fmt, body):
+        response = self.client.post(self.IMPORT_URL, data=body, content_type=self.CONTENT_TYPES[fmt])
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_round_trip(self):
+        for fmt in CatalogTransferService.FORMATS:
+            with self.subTest(fmt):
+                exported = self._export(fmt)
+                Product.objects.all().delete()
+
+                report = self._import(fmt, exported)
+                self.assertEqual((report["processed"], report["imported"], report["failed"]), (5, 5, 0))
+                self.assertEqual(self._export(fmt), exported)
+
+    def test_round_trip_across_chunks(self):
+        exported = "".join(CatalogTransferService.export_products("jsonl", chunk_size=2))
+        Product.objects.all().delete()
+        report = CatalogTransferService.import_products(exported.splitlines(keepends=True), "jsonl", chunk_size=2)
+        self.assertEqual(report["imported"], 5)
+        self.assertEqual("".join(CatalogTransferService.export_products("jsonl", chunk_size=3)), exported)
+
+    def test_upserts_by_name_and_reports_invalid_rows(self):
+        body = (
+            "name,description,price,stock\n"
+            "Product 0,Updated,9.99,7\n"
+            "New product,New,1.00,\n"
+            "Bad price,Bad,abc,1\n"
+            "Too,many,columns,1,x,y\n"
+        )
+        report = self._import("csv", body)
+        self.assertEqual((report["processed"], report["imported"], report["failed"]), (4, 2, 2))
+        self.assertEqual([error["line"] for error in report["errors"]], [4, 5])
+
+        updated = Product.objects.get(name="Product 0")
+        self.assertEqual((updated.description, updated.price, updated.stock), ("Updated", Decimal("9.99"), 7))
+        self.assertEqual(Product.objects.get(name="New product").stock, 0)
+        # Sem a coluna categories, as categorias não mudam
+        self.assertEqual(Product.objects.get(name="Product 1").categories.count(), 1)
+
+    def test_categories_are_replaced_and_validated(self):
+        body = (
+            '{"name": "Product 2", "description": "Two", "price": "2.00", "stock": 1, "categories": []}\n'
+            '{"name": "Product 1", "description": "One", "price": "2.00", "stock": 1, "categories": ["Games"]}\n'
+            '{"name": "Product 3", "description": "Three", "price": "2.00", "stock": 1, "categories": ["Nope"]}\n'
+            "not json\n"
+        )
+        report = self._import("jsonl", body)
+        self.assertEqual((report["imported"], report["failed"]), (2, 2))
+        self.assertFalse(Product.objects.get(name="Product 2").categories.exists())
+        self.assertEqual(
+            list(Product.objects.get(name="Product 1").categories.values_list("name", flat=True)), ["Games"]
+        )
+
+    def test_rejects_unsupported_formats(self):
+        response = self.client.post(self.IMPORT_URL, data="{}", content_type="application/json")
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(self.client.get(f"{self.EXPORT_URL}?output=xml").status_code, 400)
+
+
+class FinanceExportTests(APITestCase):
+    """
+    GET /orders/export/: filtros e formatos da exportação de pedidos.
+    """
+
+    URL = "/api/v1/orders/export/"
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_authenticate(self.admin)
+        product = Product.objects.create(name="Product", description="", price=Decimal("2.00"), stock=10)
+        address = Address.objects.create(
+            user=self.admin, recipient_name="Admin", street="Rua A", number="1", city="Fortaleza", state="CE"
+        )
+
+        self.delivered, self.pending, self.canceled = orders = [
+            Order.objects.create(user=self.admin, status=status, total=total)
+            for status, total in (("D", Decimal("6.00")), ("P", Decimal("2.00")), ("C", Decimal("0.00")))
+        ]
+        for order, created_at in zip(orders, ("2026-01-10T12:00:00Z", "2026-01-20T12:00:00Z", "2026-02-01T00:00:00Z")):
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+
+        for quantity in (1, 2):
+            OrderProduct.objects.create(order=self.delivered, product=product, quantity=quantity, price=2 * quantity)
+        OrderProduct.objects.create(order=self.pending, product=product, quantity=1, price=Decimal("2.00"))
+        Payment.objects.create(order=self.delivered, payment_method="Pix", status="Completed", transaction_id="TX1")
+        Payment.objects.create(order=self.pending, payment_method="Pix", status="Pending", transaction_id="TX2")
+        Shipping.objects.create(order=self.delivered, address=address, tracking_number="EC1BR", status="Delivered")
+
+    def _export(self, query):
+        response = self.client.get(f"{self.URL}?{query}")
+        self.assertEqual(response.status_code, 200, query)
+        return b"".join(response.streaming_content).decode()
+
+    def _ndjson(self, query):
+        return [orjson.loads(line) for line in self._export(f"output=ndjson&{query}").splitlines()]
+
+    def test_csv_has_one_row_per_item(self):
+        rows = list(csv.DictReader(io.StringIO(self._export(""))))
+        self.assertEqual(
+            [(int(row["order_id"]), row["item_id"] != "") for row in rows],
+            [(self.delivered.pk, True), (self.delivered.pk, True), (self.pending.pk, True), (self.canceled.pk, False)],
+        )
+        first = rows[0]
+        self.assertEqual(
+            (first["payment_status"], first["transaction_id"], first["tracking_number"], first["total"]),
+            ("Completed", "TX1", "EC1BR", "6.00"),
+        )
+        self.assertEqual(rows[-1]["payment_status"], "")
+
+    def test_ndjson_nests_the_items(self):
+        orders = self._ndjson("")
+        self.assertEqual([order["order_id"] for order in orders], [self.delivered.pk, self.pending.pk, self.canceled.pk])
+        self.assertEqual([item["quantity"] for item in orders[0]["items"]], [1, 2])
+        self.assertEqual(orders[0]["items"][1]["price"], "4.00")
+        self.assertEqual(orders[2]["items"], [])
+
+    def test_filters(self):
+        for query, expected in (
+            ("created_after=2026-01-15T00:00:00Z&created_before=2026-02-01T00:00:00Z", [self.pending]),
+            ("created_after=2026-02-01T00:00:00Z", [self.canceled]),
+            ("payment_status=completed", [self.delivered]),
+            ("payment_status=pending&status=P", [self.pending]),
+            ("status=c", [self.canceled]),
+        ):
+            with self.subTest(query):
+                self.assertEqual([order["order_id"] for order in self._ndjson(query)], [order.pk for order in expected])
+
+    def test_rejects_invalid_parameters(self):
+        self.assertEqual(self.client.get(f"{self.URL}?output=xlsx").status_code, 400)
+        self.assertEqual(self.client.get(f"{self.URL}?created_after=yesterday").status_code, 400)
+
+
+class AnalyticsRefreshTests(APITestCase):
+    """
+    Agregados diários: contagens, pedidos cancelados, refresh incremental e
+    reprocessamento sem duplicar valores.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user("buyer", "buyer@example.com", "buyer")
+        self.books, self.games = Category.objects.create(name="Books"), Category.objects.create(name="Games")
+        self.both = Product.objects.create(name="Both", description="", price=Decimal("10.00"), stock=100)
+        self.both.categories.set([self.books, self.games])
+        self.book = Product.objects.create(name="Book", description="", price=Decimal("5.00"), stock=100)
+        self.book.categories.set([self.books])
+
+        # Pedidos antigos, alterados pela última vez há 3h e 1h
+        self.first = self._order("2026-03-01T15:00:00Z", "D", [(self.both, 2), (self.book, 1)], hours_ago=3)
+        self._order("2026-03-01T16:00:00Z", "C", [(self.both, 5)], hours_ago=3)
+        self._order("2026-03-02T15:00:00Z", "P", [(self.book, 3)], hours_ago=1)
+
+    def _order(self, created_at, status, lines, hours_ago):
+        order = Order.objects.create(user=self.user, status=status)
+        for product, quantity in lines:
+            OrderProductService.create_order_product({"order": order.pk, "product": product.pk, "quantity": quantity})
+        Order.objects.filter(pk=order.pk).update(
+            created_at=created_at, updated_at=timezone.now() - datetime.timedelta(hours=hours_ago)
+        )
+        return order
+
+    def _snapshot(self):
+        return (
+            sorted(DailySales.objects.values_list("day", "status", "orders", "revenue")),
+            sorted(DailyProductSales.objects.values_list("day", "product_id", "units", "revenue")),
+            sorted(DailyCategorySales.objects.values_list("day", "category_id", "units", "revenue")),
+        )
+
+    def test_counts(self):
+        self.assertEqual(AnalyticsService.refresh(), 2)
+        march_1, march_2 = datetime.date(2026, 3, 1), datetime.date(2026, 3, 2)
+        sales, products, categories = self._snapshot()
+
+        # Pedidos cancelados entram no DailySales (por status), mas não nas vendas
+        self.assertEqual(
+            sales,
+            [(march_1, "C", 1, Decimal("50.00")), (march_1, "D", 1, Decimal("25.00")), (march_2, "P", 1, Decimal("15.00"))],
+        )
+        self.assertEqual(
+            products,
+            sorted(
+                [
+                    (march_1, self.both.pk, 2, Decimal("20.00")),
+                    (march_1, self.book.pk, 1, Decimal("5.00")),
+                    (march_2, self.book.pk, 3, Decimal("15.00")),
+                ]
+            ),
+        )
+        # Um produto em duas categorias conta nas duas
+        self.assertEqual(
+            categories,
+            sorted(
+                [
+                    (march_1, self.books.pk, 3, Decimal("25.00")),
+                    (march_1, self.games.pk, 2, Decimal("20.00")),
+                    (march_2, self.books.pk, 3, Decimal("15.00")),
+                ]
+            ),
+        )
+
+    def test_refresh_is_incremental_and_idempotent(self):
+        AnalyticsService.refresh()
+        snapshot = self._snapshot()
+
+        # Só o dia do pedido dentro da sobreposição com a marca d'água é
+        # recalculado de novo, sem duplicar valores
+        self.assertEqual(AnalyticsService.refresh(), 1)
+        self.assertEqual(self._snapshot(), snapshot)
+        self.assertEqual(AnalyticsService.refresh(full=True), 2)
+        self.assertEqual(self._snapshot(), snapshot)
+
+        # O dia do pedido alterado (e o da sobreposição com a marca anterior);
+        # depois, a marca avança até ele
+        Order.objects.filter(pk=self.first.pk).update(status="C", updated_at=timezone.now())
+        self.assertEqual(AnalyticsService.refresh(), 2)
+        self.assertEqual(AnalyticsService.refresh(), 1)
+        sales, products, _ = self._snapshot()
+        self.assertIn((datetime.date(2026, 3, 1), "C", 2, Decimal("75.00")), sales)
+        self.assertEqual(products, [(datetime.date(2026, 3, 2), self.book.pk, 3, Decimal("15.00"))])
+
+    def test_failed_full_refresh_keeps_the_previous_aggregates(self):
+        AnalyticsService.refresh()
+        snapshot = self._snapshot()
+        rebuild_days = AnalyticsService._rebuild_days
+
+        def fail_on_the_second_batch(days):
+            if days[0] != datetime.date(2026, 3, 1):
+                raise RuntimeError("boom")
+            rebuild_days(days)
+
+        with (
+            mock.patch.object(AnalyticsService, "DAYS_PER_BATCH", 1),
+            mock.patch.object(AnalyticsService, "_rebuild_days", staticmethod(fail_on_the_second_batch)),
+            self.assertRaises(RuntimeError),
+        ):
+            AnalyticsService.refresh(full=True)
+        self.assertEqual(self._snapshot(), snapshot)
+
+    def test_full_refresh_drops_days_of_deleted_orders(self):
+        AnalyticsService.refresh()
+        Order.objects.filter(created_at__date=datetime.date(2026, 3, 2)).delete()
+
+        self.assertEqual(AnalyticsService.refresh(full=True), 1)
+        self.assertEqual({day for day, *_ in self._snapshot()[0]}, {datetime.date(2026, 3, 1)})
+
+
+class ProductRankingTests(APITestCase):
+    """
+    Rankings da vitrine: posições geral e por categoria, média bayesiana e cache.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.create_superuser("admin", "admin@example.com", "admin"))
+        self.a, self.b = Category.objects.create(name="A"), Category.objects.create(name="B")
+        self.p1, self.p2, self.p3, self.p4 = [
+            Product.objects.create(name=f"P{i}", description="Text", price=Decimal("1.00"), stock=1)
+            for i in range(1, 5)
+        ]
+        self.p1.categories.set([self.a])
+        self.p2.categories.set([self.a, self.b])
+        self.p3.categories.set([self.b])
+
+        today = timezone.localdate()
+        DailyProductSales.objects.bulk_create(
+            [
+                DailyProductSales(day=today, product=self.p1, units=10, revenue=10),
+                DailyProductSales(day=today - datetime.timedelta(days=3), product=self.p2, units=30, revenue=30),
+                DailyProductSales(day=today, product=self.p3, units=20, revenue=20),
+                DailyProductSales(day=today, product=self.p4, units=5, revenue=5),
+                # Fora da janela de BEST_SELLERS_DAYS
+                DailyProductSales(day=today - datetime.timedelta(days=40), product=self.p4, units=1000, revenue=1000),
+            ]
+        )
+        # Uma única review 5 estrelas não passa na frente de 200 reviews 4,8
+        for product, avg, count in ((self.p1, "5.00", 1), (self.p2, "4.80", 200), (self.p3, "4.00", 50)):
+            Product.objects.filter(pk=product.pk).update(rating_avg=Decimal(avg), rating_count=count)
+
+    def _positions(self, kind, category=None):
+        rankings = ProductRanking.objects.filter(kind=kind, category=category).order_by("position")
+        return list(rankings.values_list("position", "product_id"))
+
+    def _get(self, route, query=""):
+        response = self.client.get(f"/api/v1/products/{route}/{query}")
+        self.assertEqual(response.status_code, 200)
+        return [(row["position"], row["product"]) for row in response.json()["results"]]
+
+    def test_best_sellers_overall_and_per_category(self):
+        RankingService.refresh()
+        kind = ProductRanking.BEST_SELLERS
+        self.assertEqual(
+            self._positions(kind), [(1, self.p2.pk), (2, self.p3.pk), (3, self.p1.pk), (4, self.p4.pk)]
+        )
+        self.assertEqual(self._positions(kind, self.a), [(1, self.p2.pk), (2, self.p1.pk)])
+        self.assertEqual(self._positions(kind, self.b), [(1, self.p2.pk), (2, self.p3.pk)])
+
+    def test_top_rated_uses_the_bayesian_average(self):
+        RankingService.refresh()
+        kind = ProductRanking.TOP_RATED
+        self.assertEqual(self._positions(kind), [(1, self.p2.pk), (2, self.p1.pk), (3, self.p3.pk)])
+        self.assertEqual(self._positions(kind, self.a), [(1, self.p2.pk), (2, self.p1.pk)])
+        self.assertEqual(self._positions(kind, self.b), [(1, self.p2.pk), (2, self.p3.pk)])
+
+        # (média * n + média global * PRIOR) / (n + PRIOR)
+        mean = (Decimal("5.00") + Decimal("4.80") * 200 + Decimal("4.00") * 50) / 251
+        expected = (Decimal("5.00") + mean * RankingService.PRIOR) / (1 + RankingService.PRIOR)
+        score = ProductRanking.objects.get(kind=kind, category=None, product=self.p1).score
+        self.assertAlmostEqual(score, expected, places=3)
+
+    def test_routes_filter_by_category(self):
+        RankingService.refresh()
+        self.assertEqual(self._get("best-sellers", f"?category={self.a.pk}"), [(1, self.p2.pk), (2, self.p1.pk)])
+        self.assertEqual(self._get("top-rated", f"?category={self.b.pk}"), [(1, self.p2.pk), (2, self.p3.pk)])
+        for category in ("abc", "-1", "1.5"):
+            with self.subTest(category):
+                response = self.client.get(f"/api/v1/products/best-sellers/?category={category}")
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"category": ["A valid integer is required."]})
+
+    def test_refresh_invalidates_the_cached_rankings(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RankingService.refresh()
+        self.assertEqual(self._get("best-sellers")[0], (1, self.p2.pk))
+
+        DailyProductSales.objects.filter(day=timezone.localdate(), product=self.p4).update(units=100)
+        self.assertEqual(self._get("best-sellers")[0], (1, self.p2.pk))  # cache
+        with self.captureOnCommitCallbacks(execute=True):
+            RankingService.refresh()
+        self.assertEqual(self._get("best-sellers")[0], (1, self.p4.pk))
+
+    def test_catalog_import_invalidates_the_cached_rankings(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RankingService.refresh()
+        url = "/api/v1/products/top-rated/?expand=product&fields=position,product.description"
+        self.assertEqual(self.client.get(url).json()["results"][0]["product"]["description"], "Text")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CatalogTransferService.import_products(["name,description,price,stock\n", "P2,Imported,1.00,1\n"], "csv")
+        self.assertEqual(self.client.get(url).json()["results"][0]["product"]["description"], "Imported")
+
+
+class OutboxTests(TransactionTestCase):
+    """
+    Outbox: execução, retentativas com backoff, falha definitiva e retry no admin.
+    Sem o atomic() do TestCase, como o worker roda.
+    """
+
+    def setUp(self):
+        self.calls = []
+        jobs = dict(OutboxService.JOBS)
+        self.addCleanup(lambda: (OutboxService.JOBS.clear(), OutboxService.JOBS.update(jobs)))
+
+        @OutboxService.register("tests.record")
+        def record(**payload):
+            self.calls.append(payload)
+
+        @OutboxService.register("tests.fail", max_attempts=2)
+        def fail(category):
+            Category.objects.create(name=category)  # desfeito junto com o job
+            raise RuntimeError("job failed")
+
+    def _make_due(self):
+        OutboxJob.objects.update(run_after=Now())
+
+    def test_successful_job_runs_once_and_is_deleted(self):
+        OutboxService.enqueue("tests.record", value=1)
+
+        self.assertTrue(OutboxService.run_next())
+        self.assertEqual(self.calls, [{"value": 1}])
+        self.assertFalse(OutboxJob.objects.exists())
+        self.assertFalse(OutboxService.run_next())
+
+    def test_delayed_job_waits(self):
+        OutboxService.enqueue("tests.record", delay=datetime.timedelta(minutes=5))
+        self.assertFalse(OutboxService.run_next())
+        self._make_due()
+        self.assertTrue(OutboxService.run_next())
+
+    def test_failure_is_rolled_back_and_retried_with_backoff(self):
+        job = OutboxService.enqueue("tests.fail", category="Rolled back")
+
+        with self.assertLogs("ecommerce.jobs", "WARNING"):
+            self.assertTrue(OutboxService.run_next())
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("RuntimeError: job failed", job.last_error)
+        self.assertIsNone(job.failed_at)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertFalse(Category.objects.exists())
+        # Ainda no backoff
+        self.assertFalse(OutboxService.run_next())
+
+    def test_job_fails_permanently_after_max_attempts(self):
+        job = OutboxService.enqueue("tests.fail", category="Failing")
+        for level in ("WARNING", "ERROR"):
+            self._make_due()
+            with self.assertLogs("ecommerce.jobs", level):
+                self.assertTrue(OutboxService.run_next())
+
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.failed_at)
+        self._make_due()
+        self.assertFalse(OutboxService.run_next())
+
+    def test_admin_retry_queues_failed_jobs_again(self):
+        failed = OutboxService.enqueue("tests.record")
+        pending = OutboxService.enqueue("tests.record", delay=datetime.timedelta(hours=1))
+        OutboxJob.objects.filter(pk=failed.pk).update(attempts=5, failed_at=Now())
+
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "admin"))
+        response = self.client.post(
+            "/admin/ecommerce/outboxjob/",
+            {"action": "retry", "_selected_action": [failed.pk, pending.pk]},
+        )
+        self.assertEqual(response.status_code, 302)
+
+        failed.refresh_from_db()
+        self.assertEqual((failed.attempts, failed.failed_at), (0, None))
+        self.assertTrue(OutboxService.run_next())
+        self.assertEqual(OutboxJob.objects.get().pk, pending.pk)
+
+    def test_deleting_a_product_does_not_enqueue_rating_jobs(self):
+        user = User.objects.create_user("buyer", "buyer@example.com", "buyer")
+        products = [
+            Product.objects.create(name=f"Product {i}", description="", price=Decimal("1.00"), stock=1)
+            for i in range(3)
+        ]
+        for product in products:
+            Review.objects.create(product=product, user=user, rating=5)
+        OutboxJob.objects.all().delete()
+
+        products[0].delete()
+        Product.objects.filter(pk=products[1].pk).delete()
+        self.assertFalse(OutboxJob.objects.exists())
+
+        # Apagar a review (ou o usuário) ainda atualiza o produto
+        user.delete()
+        self.assertEqual(list(OutboxJob.objects.values_list("payload", flat=True)), [
+            {"product_id": products[2].pk, "removed": 5}
+        ])
+
+    @skipUnlessDBFeature("has_select_for_update_skip_locked")
+    def test_workers_never_claim_the_same_job(self):
+        started, release = threading.Event(), threading.Event()
+
+        @OutboxService.register("tests.block")
+        def block():
+            started.set()
+            release.wait(10)
+
+        OutboxService.enqueue("tests.block")
+        OutboxService.enqueue("tests.record", value=2)
+
+        def worker():
+            try:
+                OutboxService.run_next()
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=worker)
+        first.start()
+        self.assertTrue(started.wait(10))
+        try:
+            # O job travado pelo primeiro worker é pulado, não esperado
+            self.assertTrue(OutboxService.run_next())
+            self.assertEqual(self.calls, [{"value": 2}])
+            self.assertFalse(OutboxService.run_next())
+        finally:
+            release.set()
+            first.join()
+        self.assertFalse(OutboxJob.objects.exists())
+
+
+class CartSummaryTests(APITestCase):
+    """
+    Resumo do carrinho: uma query, totais calculados no banco e invalidação do cache.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.create_superuser("admin", "admin@example.com", "admin"))
+        self.owner = User.objects.create_user("owner", "owner@example.com", "owner")
+        self.p1 = Product.objects.create(name="P1", description="Text", price=Decimal("2.50"), stock=10)
+        self.p2 = Product.objects.create(name="P2", description="Text", price=Decimal("0.10"), stock=10)
+        self.cart = Cart.objects.create(user=self.owner)
+        self.item1 = CartProduct.objects.create(cart=self.cart, product=self.p1, quantity=3)
+        self.item2 = CartProduct.objects.create(cart=self.cart, product=self.p2, quantity=7)
+        self.url = f"/api/v1/carts/{self.cart.pk}/summary/"
+
+    def _summary(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_summary_is_built_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            CartService.build_summary(self.cart.pk)
+        self.assertEqual(len(queries), 1)
+
+        self._summary()
+        with CaptureQueriesContext(connection) as queries:
+            self._summary()
+        # Só as queries da autenticação, nenhuma do carrinho
+        self.assertFalse([q for q in queries if "cart" in q["sql"].lower()])
+
+    def test_totals(self):
+        summary = self._summary()
+        self.assertEqual(summary["id"], self.cart.pk)
+        self.assertEqual(summary["user"], self.owner.pk)
+        self.assertEqual(
+            [(item["product"]["id"], item["product"]["price"], item["quantity"], item["line_total"]) for item in summary["items"]],
+            [(self.p1.pk, "2.50", 3, "7.50"), (self.p2.pk, "0.10", 7, "0.70")],
+        )
+        self.assertEqual((summary["total_quantity"], summary["total"]), (10, "8.20"))
+        # O estoque muda a cada checkout e não vai para o cache
+        self.assertNotIn("stock", summary["items"][0]["product"])
+
+    def test_empty_and_missing_carts(self):
+        CartProduct.objects.filter(cart=self.cart).delete()
+        summary = self._summary()
+        self.assertEqual((summary["items"], summary["total_quantity"], summary["total"]), ([], 0, "0.00"))
+        self.assertEqual(self.client.get("/api/v1/carts/0/summary/").status_code, 404)
+
+        self.client.force_authenticate(User.objects.create_user("new", "new@example.com", "new"))
+        response = self.client.get("/api/v1/carts/me/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], None)
+
+    def test_me_returns_the_users_cart(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get("/api/v1/carts/me/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], "8.20")
+
+    def test_cart_product_changes_invalidate(self):
+        self._summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item1.quantity = 1
+            self.item1.save()
+        self.assertEqual(self._summary()["total"], "3.20")
+
+        p3 = Product.objects.create(name="P3", description="Text", price=Decimal("1.00"), stock=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            CartProduct.objects.create(cart=self.cart, product=p3, quantity=2)
+        self.assertEqual(self._summary()["total"], "5.20")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item2.delete()
+        summary = self._summary()
+        self.assertEqual((summary["total_quantity"], summary["total"]), (3, "4.50"))
+
+    def test_product_changes_invalidate(self):
+        self._summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.p1.price = Decimal("3.00")
+            self.p1.name = "Renamed"
+            self.p1.save()
+        summary = self._summary()
+        self.assertEqual(summary["items"][0]["product"]["name"], "Renamed")
+        self.assertEqual(summary["total"], "9.70")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.p2.delete()
+        self.assertEqual(self._summary()["total"], "9.00")
+
+    def test_catalog_import_invalidates(self):
+        self._summary()
+        exported = "".join(CatalogTransferService.export_products("jsonl"))
+        with self.captureOnCommitCallbacks(execute=True):
+            CatalogTransferService.import_products(
+                [line.replace('"2.50"', '"4.00"') for line in exported.splitlines(keepends=True)], "jsonl"
+            )
+        self.assertEqual(Product.objects.get(pk=self.p1.pk).price, Decimal("4.00"))
+        self.assertEqual(self._summary()["total"], "12.70")
+
+
+class KeysetPaginationTests(APITestCase):
+    """
+    Paginação por keyset: navegação nos dois sentidos, empates, limites e cursores inválidos.
+    """
+
+    ORDERING = ("-created_at", "-id")
+
+    def setUp(self):
+        cache.clear()
+        self.products = [
+            Product.objects.create(name=f"Product {i}", description="Text", price=Decimal("1.00"), stock=1)
+            for i in range(7)
+        ]
+        # Empates em created_at: a ordem entre eles sai do id
+        moment = timezone.now()
+        Product.objects.filter(pk__in=[p.pk for p in self.products[2:5]]).update(created_at=moment)
+        self.expected = list(Product.objects.order_by(*self.ORDERING).values_list("pk", flat=True))
+
+    def _page(self, url="/api/v1/products/", ordering=ORDERING, max_page_size=None):
+        paginator = KeysetPagination()
+        if max_page_size:
+            paginator.max_page_size = max_page_size
+        request = Request(APIRequestFactory().get(url))
+        page = paginator.paginate_queryset(Product.objects.all(), request, view=SimpleNamespace(ordering=ordering))
+        return [product.pk for product in page], paginator.get_next_link(), paginator.get_previous_link()
+
+    def test_forward_and_backward_traversal(self):
+        pages, url = [], "/api/v1/products/?page_size=3"
+        while url:
+            ids, url, previous = self._page(url)
+            pages.append((ids, previous))
+        self.assertEqual([pk for ids, _ in pages for pk in ids], self.expected)
+        self.assertIsNone(pages[0][1])
+
+        # Voltando a partir da última página, as mesmas páginas em ordem inversa
+        back, url = [], pages[-1][1]
+        while url:
+            ids, _, url = self._page(url)
+            back.append(ids)
+        self.assertEqual(back, [ids for ids, _ in reversed(pages[:-1])])
+
+    def test_ties_are_broken_by_id(self):
+        tied = sorted((p.pk for p in self.products[2:5]), reverse=True)
+        self.assertEqual([pk for pk in self.expected if pk in tied], tied)
+
+        seen, url = [], "/api/v1/products/?page_size=1"
+        while url:
+            ids, url, _ = self._page(url)
+            seen += ids
+        self.assertEqual(seen, self.expected)
+
+    def test_page_size_is_capped(self):
+        ids, _, _ = self._page("/api/v1/products/?page_size=5", max_page_size=3)
+        self.assertEqual(ids, self.expected[:3])
+        ids, _, _ = self._page("/api/v1/products/?page_size=0")
+        self.assertEqual(ids, self.expected)
+
+    def test_keyset_filter_bounds_the_leading_column(self):
+        queryset = Product.objects.filter(
+            KeysetPagination._keyset_filter(self.ORDERING, [timezone.now(), 10])
+        )
+        self.assertIn('WHERE ("products"."created_at" <= ', str(queryset.query))
+
+    def test_malformed_cursors_return_404(self):
+        self.client.force_authenticate(User.objects.create_user("user", "user@example.com", "user"))
+        encode = lambda data: base64.urlsafe_b64encode(orjson.dumps(data)).decode()
+        for cursor in (
+            "not-base64!",
+            encode([1, 2]),
+            encode({"p": [1]}),
+            encode({"p": ["abc", 1]}),
+            encode({"p": [None, "x"]}),
+            encode({"p": [{"a": 1}, 2]}),
+            encode({"p": ["2024-01-01T00:00:00+00:00", "x"]}),
+        ):
+            with self.subTest(cursor):
+                response = self.client.get("/api/v1/products/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_ordering_must_end_with_id(self):
+        with self.assertRaises(AssertionError):
+            self._page(ordering=("-created_at",))
+
+
+class CheckoutTests(APITestCase):
+    """
+    POST /checkout/: pedido, pagamento, envio e estoque em uma transação.
+    """
+
+    URL = "/api/v1/checkout/"
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("buyer", "buyer@example.com", "buyer")
+        self.address = Address.objects.create(
+            user=self.user, recipient_name="Buyer", street="Rua A", number="1",
+            city="Fortaleza", state="CE", is_default=True,
+        )
+        self.p1 = Product.objects.create(name="P1", description="Text", price=Decimal("2.50"), stock=10)
+        self.p2 = Product.objects.create(name="P2", description="Text", price=Decimal("0.10"), stock=5)
+        self.cart = Cart.objects.create(user=self.user)
+        CartProduct.objects.create(cart=self.cart, product=self.p1, quantity=3)
+        CartProduct.objects.create(cart=self.cart, product=self.p2, quantity=5)
+        self.client.force_authenticate(self.user)
+
+    def _checkout(self, **data):
+        return self.client.post(self.URL, {"payment_method": "Pix", **data}, format="json")
+
+    def test_creates_the_order(self):
+        response = self._checkout()
+        self.assertEqual(response.status_code, 201, response.content)
+
+        order = Order.objects.get(pk=response.json()["id"])
+        self.assertEqual((order.user, order.total), (self.user, Decimal("8.00")))
+        self.assertEqual(
+            sorted(order.items.values_list("product_id", "quantity", "price")),
+            sorted([(self.p1.pk, 3, Decimal("7.50")), (self.p2.pk, 5, Decimal("0.50"))]),
+        )
+
+        payment = Payment.objects.get(order=order)
+        self.assertEqual((payment.payment_method, payment.status), ("Pix", "Pending"))
+        self.assertTrue(payment.transaction_id)
+        shipping = Shipping.objects.get(order=order)
+        self.assertEqual(shipping.address, self.address)
+        self.assertTrue(shipping.tracking_number)
+
+        self.assertFalse(CartProduct.objects.filter(cart=self.cart).exists())
+        self.p1.refresh_from_db()
+        self.p2.refresh_from_db()
+        self.assertEqual((self.p1.stock, self.p2.stock), (7, 0))
+
+    def test_uses_the_given_address(self):
+        other = Address.objects.create(
+            user=self.user, recipient_name="Buyer", street="Rua B", number="2", city="Recife", state="PE"
+        )
+        response = self._checkout(address=other.pk)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Shipping.objects.get(order_id=response.json()["id"]).address, other)
+
+    def test_out_of_stock_rolls_everything_back(self):
+        Product.objects.filter(pk=self.p2.pk).update(stock=4)
+        response = self._checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("P2 (available: 4)", str(response.json()))
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(Shipping.objects.exists())
+        self.assertEqual(CartProduct.objects.filter(cart=self.cart).count(), 2)
+        self.p1.refresh_from_db()
+        self.assertEqual(self.p1.stock, 10)
+
+    def test_empty_cart(self):
+        CartProduct.objects.filter(cart=self.cart).delete()
+        response = self._checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Cart is empty.", str(response.json()))
+
+    def test_missing_or_foreign_address(self):
+        stranger = User.objects.create_user("stranger")
+        foreign = Address.objects.create(
+            user=stranger, recipient_name="Stranger", street="Rua C", number="3", city="Natal", state="RN"
+        )
+        response = self._checkout(address=foreign.pk)
+        self.assertEqual(response.status_code, 400)
+
+        self.address.delete()
+        response = self._checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("A valid shipping address is required.", str(response.json()))
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=self.p1.pk).stock, 10)
+
+    def test_clearing_the_cart_invalidates_its_summary_once(self):
+        with mock.patch.object(CartService, "invalidate", wraps=CartService.invalidate) as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self._checkout().status_code, 201)
+        invalidate.assert_called_once_with([self.cart.pk])
+
+        response = self.client.get("/api/v1/carts/me/")
+        self.assertEqual((response.json()["items"], response.json()["total"]), ([], "0.00"))
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class AdminQueryTests(APITestCase):
+    """
+    As listagens e os formulários do admin rodam o mesmo número de queries com N e 2N linhas.
+    """
+
+    ROWS = 5
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.admin)
+        self.created = 0
+
+    def _add_rows(self, count):
+        for _ in range(count):
+            i = self.created = self.created + 1
+            user = User.objects.create_user(f"user{i}")
+            product = Product.objects.create(name=f"Product {i}", description="Text", price=Decimal("1.00"), stock=1)
+            Review.objects.create(user=user, product=product, rating=5)
+            address = Address.objects.create(
+                user=user, recipient_name=f"User {i}", street="Rua A", number="1", city="Fortaleza", state="CE"
+            )
+            Shipping.objects.create(order=Order.objects.create(user=user), address=address, tracking_number=f"EC{i:09d}BR")
+
+    def _count(self, url):
+        self.client.get(url)  # aquece os caches por processo (ex.: ContentType)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_run_a_fixed_number_of_queries(self):
+        urls = ["/admin/ecommerce/review/", "/admin/ecommerce/order/", "/admin/ecommerce/shipping/"]
+        self._add_rows(self.ROWS)
+        counts = {url: self._count(url) for url in urls}
+        self._add_rows(self.ROWS)
+        for url in urls:
+            with self.subTest(url), self.assertNumQueries(counts[url]):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_product_form_does_not_load_every_category(self):
+        product = Product.objects.create(name="Product", description="Text", price=Decimal("1.00"), stock=1)
+        url = f"/admin/ecommerce/product/{product.pk}/change/"
+        Category.objects.bulk_create([Category(name=f"Category {i}") for i in range(self.ROWS)])
+        count = self._count(url)
+        Category.objects.bulk_create([Category(name=f"More {i}") for i in range(self.ROWS)])
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+        self.assertNotContains(response, "More 0")
+
+
+class ProductSearchTests(APITestCase):
+    """
+    GET /products/search/: busca em português, ordenada por relevância e paginada pelo rank.
+    """
+
+    URL = "/api/v1/products/search/"
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.create_user("user", "user@example.com", "user"))
+
+    def _create(self, name, description):
+        return Product.objects.create(name=name, description=description, price=Decimal("1.00"), stock=1)
+
+    def _search(self, q, **params):
+        response = self.client.get(self.URL, {"q": q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_q_is_required(self):
+        for params in ({}, {"q": ""}, {"q": "   "}):
+            with self.subTest(params):
+                response = self.client.get(self.URL, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("q", response.json())
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search needs PostgreSQL")
+    def test_stemming_and_accents(self):
+        book = self._create("Livro de programação", "Capa dura")
+        shirt = self._create("Camisetas básicas", "Algodão")
+        self._create("Caneca", "Cerâmica")
+
+        # O trigger da migration indexa nome e descrição com o dicionário portuguese
+        for q, expected in (
+            ("programações", [book.pk]),
+            ("Programação", [book.pk]),
+            ("camiseta", [shirt.pk]),
+            ("algodão", [shirt.pk]),
+            ("bicicleta", []),
+        ):
+            with self.subTest(q):
+                self.assertEqual([item["id"] for item in self._search(q)["results"]], expected)
+
+        # Editar o produto reindexa a linha
+        book.name = "Livro de culinária"
+        book.save()
+        self.assertEqual(self._search("programação")["results"], [])
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search needs PostgreSQL")
+    def test_ordered_by_relevance_then_id(self):
+        in_description = self._create("Caneca", "Caneca com estampa de café")
+        first_tie = self._create("Café especial", "Torrado")
+        second_tie = self._create("Café tradicional", "Torrado")
+
+        # O nome tem peso A e a descrição peso B; empates saem pelo id decrescente
+        ids = [item["id"] for item in self._search("café")["results"]]
+        self.assertEqual(ids, [second_tie.pk, first_tie.pk, in_description.pk])
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search needs PostgreSQL")
+    def test_cursor_pages_over_the_rank(self):
+        for i in range(4):
+            self._create(f"Café {i}", "Torrado")
+        for i in range(3):
+            self._create(f"Caneca {i}", "Estampa de café")
+        expected = [item["id"] for item in self._search("café", page_size=100)["results"]]
+        self.assertEqual(len(expected), 7)
+
+        seen, url = [], f"{self.URL}?q=caf%C3%A9&page_size=2"
+        while url:
+            page = self.client.get(url).json()
+            seen += [item["id"] for item in page["results"]]
+            url = page["next"]
+        self.assertEqual(seen, expected)
+
+        bad = base64.urlsafe_b64encode(orjson.dumps({"p": ["high", 1]})).decode()
+        response = self.client.get(self.URL, {"q": "café", "cursor": bad})
+        self.assertEqual(response.status_code, 404)
+
+
+class PerformanceMetricsTests(APITestCase):
+    """
+    PerformanceMiddleware (Server-Timing, métricas por rota) e /metrics.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.create_user("user", "user@example.com", "user"))
+        self.product = Product.objects.create(name="Product", description="Text", price=Decimal("1.00"), stock=1)
+
+    def test_server_timing_header(self):
+        response = self.client.get(f"/api/v1/products/{self.product.pk}/")
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^total;dur=\d+\.\d, db;dur=\d+\.\d;desc="[1-9]\d* queries", serialize;dur=\d+\.\d$',
+        )
+
+    def test_metrics_are_labelled_by_route(self):
+        route = "api/v1/products/<int:pk>/"
+        labels = {"route": route, "method": "GET"}
+        sample = lambda name, **extra: REGISTRY.get_sample_value(name, {**labels, **extra}) or 0
+        before = sample("ecommerce_http_requests_total", status="200")
+        queries_before = sample("ecommerce_http_db_queries_count")
+
+        for _ in range(2):
+            self.client.get(f"/api/v1/products/{self.product.pk}/")
+        self.client.get("/api/v1/products/0/")
+
+        # O path em si nunca vira label: /products/1/ e /products/0/ caem na mesma rota
+        self.assertEqual(sample("ecommerce_http_requests_total", status="200") - before, 2)
+        self.assertGreaterEqual(sample("ecommerce_http_requests_total", status="404"), 1)
+        self.assertEqual(sample("ecommerce_http_db_queries_count") - queries_before, 3)
+
+    def test_metrics_exposition(self):
+        self.client.get(f"/api/v1/products/{self.product.pk}/")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        for name in (
+            "ecommerce_http_requests_total",
+            "ecommerce_http_request_duration_seconds_bucket",
+            "ecommerce_http_db_duration_seconds_sum",
+            "ecommerce_http_db_queries_count",
+            "ecommerce_http_serialization_duration_seconds_sum",
+        ):
+            self.assertIn(name, body)
+        self.assertIn('route="api/v1/products/<int:pk>/"', body)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_metrics_token(self):
+        for headers, expected in (
+            ({}, 403),
+            ({"HTTP_AUTHORIZATION": "Bearer wrong"}, 403),
+            ({"HTTP_AUTHORIZATION": "s3cret"}, 403),
+            ({"HTTP_AUTHORIZATION": "Bearer s3cret"}, 200),
+        ):
+            with self.subTest(headers):
+                self.assertEqual(self.client.get("/metrics", **headers).status_code, expected)
@@ -1,17 +1,26 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from . import async_views
+from .models import ProductRanking
 from .views import (
     UserViewSet,
     ProductViewSet,
     CategoryViewSet,
     OrderViewSet,
+    CheckoutViewSet,
     OrderProductViewSet,
     ReviewViewSet,
     CartViewSet,
+    CartSummaryViewSet,
     CartProductViewSet,
     ShippingViewSet,
     PaymentViewSet,
     AddressViewSet,
+    CacheStatsViewSet,
+    QueryProfileViewSet,
+    ProductTransferViewSet,
+    ProductRankingViewSet,
+    AnalyticsViewSet,
 )
 
 urlpatterns = [
@@ -31,6 +40,23 @@ urlpatterns = [
     ),  # DELETE
     # Products
     path("products/register/", ProductViewSet.as_view({"post": "create"})),  # POST
+    path(
+        "products/search/", ProductViewSet.as_view({"get": "search"})
+    ),  # GET, busca textual ordenada por relevancia (?q=)
+    path(
+        "products/import/", ProductTransferViewSet.as_view({"post": "create"})
+    ),  # POST, carga em massa (CSV/JSONL, upsert pelo nome)
+    path(
+        "products/export/", ProductTransferViewSet.as_view({"get": "list"})
+    ),  # GET, catálogo inteiro em streaming (?output=csv|jsonl)
+    path(
+        "products/best-sellers/",
+        ProductRankingViewSet.as_view({"get": "list"}, kind=ProductRanking.BEST_SELLERS),
+    ),  # GET, mais vendidos dos últimos 30 dias (?category= para o ranking da categoria)
+    path(
+        "products/top-rated/",
+        ProductRankingViewSet.as_view({"get": "list"}, kind=ProductRanking.TOP_RATED),
+    ),  # GET, melhor avaliados (média bayesiana), também com ?category=
     path(
         "products/<int:pk>/",
         ProductViewSet.as_view(
@@ -59,6 +85,9 @@ urlpatterns = [
     ),  # DELETE
     # Order
     path("orders/create/", OrderViewSet.as_view({"post": "create"})),  # POST
+    path(
+        "orders/export/", OrderViewSet.as_view({"get": "export"})
+    ),  # GET, exportação em streaming para o financeiro (?output=csv|ndjson)
     path(
         "orders/<int:pk>/", OrderViewSet.as_view({"get": "retrieve"})
     ),  # GET, por enquanto pedidos nao poderao ser alterados
@@ -68,16 +97,24 @@ urlpatterns = [
     path(
         "orders/<int:pk>/delete/", OrderViewSet.as_view({"delete": "destroy"})
     ),  # DELETE
+    # Checkout
+    path(
+        "checkout/", CheckoutViewSet.as_view({"post": "create"})
+    ),  # POST, transforma o carrinho do usuario em um pedido
     # OrderProduct
     path(
         "order-product/create/", OrderProductViewSet.as_view({"post": "create"})
     ),  # POST
+    path(
+        "order-product/bulk-create/",
+        OrderProductViewSet.as_view({"post": "bulk_create"}),
+    ),  # POST, varios itens do mesmo pedido de uma vez
     path(
         "order-product/<int:pk>/", OrderProductViewSet.as_view({"get": "retrieve"})
     ),  # GET
     path(
         "order-product/product/<int:product_id>/",
-        OrderProductViewSet.as_view({"get": "retrieve"}),
+        OrderProductViewSet.as_view({"get": "list"}),
     ),  # GET tambem, mas pra obter o conjunto de pedidos que possuem determinado produto
     path(
         "order-product/", OrderProductViewSet.as_view({"get": "list"})
@@ -90,17 +127,23 @@ urlpatterns = [
     path("reviews/create/", ReviewViewSet.as_view({"post": "create"})),  # POST
     path("reviews/<int:pk>/", ReviewViewSet.as_view({"get": "retrieve"})),  # GET
     path(
-        "reviews/user/<int:user_id>/", ReviewViewSet.as_view({"get": "retrieve"})
+        "reviews/user/<int:user_id>/", ReviewViewSet.as_view({"get": "list"})
     ),  # GET tambem, mas pra obter o conjunto de reviews de um determinado usuario
     path(
-        "reviews/product/<int:product_id>/", ReviewViewSet.as_view({"get": "retrieve"})
+        "reviews/product/<int:product_id>/", ReviewViewSet.as_view({"get": "list"})
     ),  # GET tambem, mas pra obter o conjunto de reviews de um determinado produto
     path(
         "reviews/<int:pk>/delete/", ReviewViewSet.as_view({"delete": "destroy"})
     ),  # DELETE
     # Cart
     path("carts/create/", CartViewSet.as_view({"post": "create"})),  # POST
+    path(
+        "carts/me/", CartSummaryViewSet.as_view({"get": "me"})
+    ),  # GET, carrinho do usuario autenticado com itens e totais
     path("carts/<int:pk>/", CartViewSet.as_view({"get": "retrieve"})),
+    path(
+        "carts/<int:pk>/summary/", CartSummaryViewSet.as_view({"get": "retrieve"})
+    ),  # GET, carrinho com itens, produtos e totais em uma query
     path("carts/", CartViewSet.as_view({"get": "list"})),
     path("carts/<int:pk>/delete/", CartViewSet.as_view({"delete": "destroy"})),
     # CartProduct
@@ -141,6 +184,30 @@ urlpatterns = [
     ),
     path("addresses/", AddressViewSet.as_view({"get": "list"})),
     path("addresses/<int:pk>/delete/", AddressViewSet.as_view({"delete": "destroy"})),
+    # Leituras async (ASGI): mesmas respostas, pelo async ORM
+    path("async/products/", async_views.product_list),  # GET
+    path("async/products/<int:pk>/", async_views.product_detail),  # GET
+    path("async/categories/", async_views.category_list),  # GET
+    path(
+        "async/shippings/tracking/<str:tracking_number>/", async_views.shipping_tracking
+    ),  # GET
+    # Analytics (agregados diários, atualizados pelo refresh_analytics)
+    path(
+        "analytics/sales/daily/", AnalyticsViewSet.as_view({"get": "daily_sales"})
+    ),  # GET
+    path(
+        "analytics/products/", AnalyticsViewSet.as_view({"get": "products"})
+    ),  # GET
+    path(
+        "analytics/categories/", AnalyticsViewSet.as_view({"get": "categories"})
+    ),  # GET
+    # Cache
+    path("cache/stats/", CacheStatsViewSet.as_view({"get": "list"})),  # GET
+    # Query profiler (N+1 e queries lentas)
+    path(
+        "query-profiles/",
+        QueryProfileViewSet.as_view({"get": "list", "delete": "destroy"}),
+    ),  # GET, DELETE
     # JWT
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
@@ -1,6 +1,9 @@
+import codecs
+
 from rest_framework.response import Response
 from django.contrib.auth.models import User
 from rest_framework import viewsets, status
+from rest_framework.exceptions import ValidationError
 from .models import (
     Product,
     Category,
@@ -12,13 +15,18 @@ from .models import (
     Shipping,
     Payment,
     Address,
+    ProductRanking,
 )
 from .serializers import (
     UserSerializer,
     ProductSerializer,
+    ProductRankingSerializer,
     CategorySerializer,
     OrderSerializer,
     OrderProductSerializer,
+    OrderProductBulkSerializer,
+    CheckoutSerializer,
+    AnalyticsQuerySerializer,
     ReviewSerializer,
     CartSerializer,
     CartProductSerializer,
@@ -26,8 +34,13 @@ from .serializers import (
     PaymentSerializer,
     AddressSerializer,
 )
-from drf_spectacular.utils import extend_schema_view, extend_schema
+from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.http import StreamingHttpResponse
+from django.db.models.functions import Cast
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
 from .filters import (
     UserFilter,
     ProductFilter,
@@ -41,11 +54,25 @@ from .filters import (
     PaymentFilter,
     AddressFilter,
 )
-from rest_framework.permissions import IsAdminUser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from .permissions import IsAdminOrReadOnly
 from .services.payment_service import PaymentService
 from .services.shipping_service import ShippingService
 from .services.orderproduct_service import OrderProductService
+from .services.checkout_service import CheckoutService
+from .services.identifier_service import IdentifierService
+from .services.catalog_transfer_service import CatalogTransferService
+from .services.finance_export_service import FinanceExportService
+from .services.analytics_service import AnalyticsService
+from .services.cart_service import CartService
+from .mixins import (
+    CachedReadMixin,
+    ConditionalGetMixin,
+    FastListMixin,
+    SparseFieldsetMixin,
+)
+from .cache import catalog_cache
+from .query_profiler import query_profiler
 
 
 @extend_schema_view(
@@ -70,8 +97,8 @@ from .services.orderproduct_service import OrderProductService
         summary="Delete an user", description="Deletes an user by its ID."
     ),
 )
-class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+class UserViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
+    queryset = User.objects.prefetch_related("groups", "user_permissions")
     serializer_class = UserSerializer
     http_method_names = ["get", "post", "put", "patch", "delete"]
     filter_backends = [DjangoFilterBackend]
@@ -103,15 +130,149 @@ class UserViewSet(viewsets.ModelViewSet):
     destroy=extend_schema(
         summary="Delete a product", description="Deletes a product by its ID."
     ),
+    search=extend_schema(
+        summary="Search products",
+        description="Full-text search over product name and description, ordered by relevance.",
+        parameters=[
+            OpenApiParameter("q", str, required=True, description="Search terms (websearch syntax)."),
+        ],
+    ),
 )
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+class ProductViewSet(
+    CachedReadMixin,
+    ConditionalGetMixin,
+    FastListMixin,
+    SparseFieldsetMixin,
+    viewsets.ModelViewSet,
+):
+    cache_namespace = "products"
+    queryset = Product.objects.prefetch_related("categories")
     serializer_class = ProductSerializer
+    ordering = ("-created_at", "-id")
     http_method_names = ["get", "post", "put", "patch", "delete"]
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProductFilter
     permission_classes = [IsAdminOrReadOnly]
 
+    def search(self, request, *args, **kwargs):
+        terms = request.query_params.get("q", "").strip()
+        if not terms:
+            return Response(
+                {"q": ["This query parameter is required."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        query = SearchQuery(terms, config="portuguese", search_type="websearch")
+        # double precision, para o rank voltar idêntico no cursor da paginação
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .filter(search_vector=query)
+            .annotate(rank=Cast(SearchRank(F("search_vector"), query), FloatField()))
+        )
+        self.ordering = ("-rank", "-id")
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+@extend_schema_view(
+    create=extend_schema(
+        summary="Import products",
+        description=(
+            "Upserts products by name from a CSV (Content-Type: text/csv) or JSONL "
+            "(Content-Type: application/x-ndjson) body, streamed in chunks. Columns: name, "
+            "description, price, stock and optionally categories (names separated by '|' "
+            "in CSV, a list in JSONL). Invalid rows are skipped and reported."
+        ),
+        request={"text/csv": str, "application/x-ndjson": str},
+    ),
+    list=extend_schema(
+        summary="Export products",
+        description="Streams the whole catalog in the import format.",
+        parameters=[
+            OpenApiParameter("output", str, enum=CatalogTransferService.FORMATS, description="Defaults to csv."),
+        ],
+    ),
+)
+class ProductTransferViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
+
+    CONTENT_TYPES = {
+        "text/csv": "csv",
+        "application/x-ndjson": "jsonl",
+        "application/jsonl": "jsonl",
+        "application/x-jsonlines": "jsonl",
+    }
+
+    def create(self, request, *args, **kwargs):
+        fmt = self.CONTENT_TYPES.get(request.content_type.split(";")[0].strip())
+        if fmt is None:
+            return Response(
+                {"error": f"Unsupported Content-Type. Use one of: {', '.join(self.CONTENT_TYPES)}."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        if request.stream is None:
+            return Response({"error": "Empty body."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Lê o corpo linha a linha, sem carregá-lo inteiro na memória
+        lines = codecs.iterdecode(request.stream, "utf-8-sig")
+        try:
+            report = CatalogTransferService.import_products(lines, fmt)
+        except UnicodeDecodeError:
+            return Response(
+                {"error": "Body must be UTF-8 encoded."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(report)
+
+    def list(self, request, *args, **kwargs):
+        fmt = request.query_params.get("output", "csv")
+        if fmt not in CatalogTransferService.FORMATS:
+            return Response(
+                {"output": [f"Must be one of: {', '.join(CatalogTransferService.FORMATS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        response = StreamingHttpResponse(
+            CatalogTransferService.export_products(fmt),
+            content_type="text/csv" if fmt == "csv" else "application/x-ndjson",
+        )
+        response["Content-Disposition"] = f'attachment; filename="products.{fmt}"'
+        return response
+
+
+@extend_schema_view(
+    list=extend_schema(
+        summary="List a product ranking",
+        description=(
+            "Best-selling (units sold in the last 30 days) or top-rated (Bayesian average "
+            "rating) products, precomputed by refresh_rankings. Without category, returns "
+            "the overall ranking."
+        ),
+        parameters=[
+            OpenApiParameter("category", int, description="Ranking within this category."),
+        ],
+    ),
+)
+class ProductRankingViewSet(CachedReadMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ProductRanking.objects.all()
+    serializer_class = ProductRankingSerializer
+    ordering = ("position", "id")
+    permission_classes = [IsAdminOrReadOnly]
+    kind = None  # definido no as_view(kind=...)
+
+    @property
+    def cache_namespace(self):
+        return f"rankings-{self.kind}"
+
+    def get_queryset(self):
+        queryset = super().get_queryset().filter(kind=self.kind)
+        category = self.request.query_params.get("category")
+        if category is None:
+            return queryset.filter(category__isnull=True)
+        if not category.isdigit():
+            raise ValidationError({"category": ["A valid integer is required."]})
+        return queryset.filter(category_id=int(category))
+
 
 @extend_schema_view(
     create=extend_schema(
@@ -138,7 +299,8 @@ class ProductViewSet(viewsets.ModelViewSet):
         summary="Delete a category", description="Deletes a category by its ID."
     ),
 )
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedReadMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
+    cache_namespace = "categories"
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     http_method_names = ["get", "post", "put", "patch", "delete"]
@@ -147,6 +309,39 @@ class CategoryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminOrReadOnly]
 
 
+@extend_schema_view(
+    list=extend_schema(
+        summary="Catalog cache statistics",
+        description="Returns the hit and miss counters of the catalog cache.",
+    ),
+)
+class CacheStatsViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
+
+    def list(self, request, *args, **kwargs):
+        return Response(catalog_cache.stats())
+
+
+@extend_schema_view(
+    list=extend_schema(
+        summary="List flagged requests",
+        description="Returns the sampled requests flagged for repeated (N+1) or slow queries, worst first.",
+    ),
+    destroy=extend_schema(
+        summary="Clear flagged requests", description="Empties the flagged requests buffer."
+    ),
+)
+class QueryProfileViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
+
+    def list(self, request, *args, **kwargs):
+        return Response(query_profiler.worst())
+
+    def destroy(self, request, *args, **kwargs):
+        query_profiler.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 @extend_schema_view(
     create=extend_schema(
         summary="Creates an order.",
@@ -163,15 +358,126 @@ class CategoryViewSet(viewsets.ModelViewSet):
     destroy=extend_schema(
         summary="Delete an order", description="Deletes an order by its ID."
     ),
+    export=extend_schema(
+        summary="Export orders for finance",
+        description=(
+            "Streams orders with payment, shipping and line items as CSV (one row per item) "
+            "or NDJSON (one object per order). Accepts the same filters as the order list, "
+            "including created_after/created_before."
+        ),
+        parameters=[
+            OpenApiParameter("output", str, enum=FinanceExportService.FORMATS, description="Defaults to csv."),
+        ],
+    ),
 )
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    ordering = ("-created_at", "-id")
     http_method_names = ["get", "post", "delete"]
     filter_backends = [DjangoFilterBackend]
     filterset_class = OrderFilter
     permission_classes = [IsAdminUser]
 
+    def export(self, request, *args, **kwargs):
+        fmt = request.query_params.get("output", "csv")
+        if fmt not in FinanceExportService.FORMATS:
+            return Response(
+                {"output": [f"Must be one of: {', '.join(FinanceExportService.FORMATS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        filterset = self.filterset_class(
+            request.query_params, queryset=Order.objects.all(), request=request
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+
+        response = StreamingHttpResponse(
+            FinanceExportService.export_orders(filterset.qs, fmt),
+            content_type="text/csv" if fmt == "csv" else "application/x-ndjson",
+        )
+        response["Content-Disposition"] = f'attachment; filename="orders.{fmt}"'
+        return response
+
+
+@extend_schema_view(
+    create=extend_schema(
+        summary="Checks out the cart",
+        description="Turns the authenticated user's cart into an order, with its items, payment and shipping.",
+        request=CheckoutSerializer,
+        responses={201: OrderSerializer},
+    ),
+)
+class CheckoutViewSet(viewsets.GenericViewSet):
+    serializer_class = CheckoutSerializer
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order = CheckoutService.checkout(
+            request.user,
+            serializer.validated_data["payment_method"],
+            serializer.validated_data.get("address"),
+        )
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+
+
+@extend_schema_view(
+    daily_sales=extend_schema(
+        summary="Daily sales",
+        description="Orders and revenue per day and status, from the precomputed rollups.",
+        parameters=[AnalyticsQuerySerializer],
+    ),
+    products=extend_schema(
+        summary="Top products",
+        description="Units sold and revenue per product over the range (canceled orders excluded).",
+        parameters=[AnalyticsQuerySerializer],
+    ),
+    categories=extend_schema(
+        summary="Top categories",
+        description="Units sold and revenue per category over the range (canceled orders excluded).",
+        parameters=[AnalyticsQuerySerializer],
+    ),
+)
+class AnalyticsViewSet(viewsets.GenericViewSet):
+    serializer_class = AnalyticsQuerySerializer
+    permission_classes = [IsAdminUser]
+
+    def daily_sales(self, request, *args, **kwargs):
+        query = self._get_query(request)
+        return self._respond(
+            query, AnalyticsService.daily_sales(query["start"], query["end"], query.get("status"))
+        )
+
+    def products(self, request, *args, **kwargs):
+        query = self._get_query(request)
+        return self._respond(
+            query, AnalyticsService.top_products(query["start"], query["end"], query["limit"])
+        )
+
+    def categories(self, request, *args, **kwargs):
+        query = self._get_query(request)
+        return self._respond(
+            query, AnalyticsService.top_categories(query["start"], query["end"], query["limit"])
+        )
+
+    def _get_query(self, request):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    @staticmethod
+    def _respond(query, results):
+        return Response(
+            {
+                "start": query["start"],
+                "end": query["end"],
+                "refreshed_at": AnalyticsService.last_refresh(),
+                "results": results,
+            }
+        )
+
 
 @extend_schema_view(
     create=extend_schema(
@@ -190,8 +496,14 @@ class OrderViewSet(viewsets.ModelViewSet):
         summary="Delete an OrderProduct",
         description="Deletes an OrderProduct by its ID.",
     ),
+    bulk_create=extend_schema(
+        summary="Creates several OrderProducts",
+        description="Creates all the items of an order at once, reserving their stock in a single transaction.",
+        request=OrderProductBulkSerializer,
+        responses={201: OrderProductSerializer(many=True)},
+    ),
 )
-class OrderProductViewSet(viewsets.ModelViewSet):
+class OrderProductViewSet(FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = OrderProduct.objects.all()
     serializer_class = OrderProductSerializer
     http_method_names = ["get", "post", "delete"]
@@ -199,11 +511,27 @@ class OrderProductViewSet(viewsets.ModelViewSet):
     filterset_class = OrderProductFilter
     permission_classes = [IsAdminUser]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # order-product/product/<product_id>/
+        if "product_id" in self.kwargs:
+            queryset = queryset.filter(product_id=self.kwargs["product_id"])
+        return queryset
+
     def create(self, request, *args, **kwargs):
         order_product = OrderProductService.create_order_product(request.data)
         serializer = self.get_serializer(order_product)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def bulk_create(self, request, *args, **kwargs):
+        payload = OrderProductBulkSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        order_products = OrderProductService.create_order_products(
+            payload.validated_data["order"], payload.validated_data["items"]
+        )
+        serializer = self.get_serializer(order_products, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     def destroy(self, request, *args, **kwargs):
         order_product_id = kwargs.get("pk")
         try:
@@ -230,14 +558,24 @@ class OrderProductViewSet(viewsets.ModelViewSet):
         summary="Delete a category", description="Deletes a category by its ID."
     ),
 )
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    ordering = ("-created_at", "-id")
     http_method_names = ["get", "post", "delete"]
     filter_backends = [DjangoFilterBackend]
     filterset_class = ReviewFilter
     permission_classes = [IsAdminUser]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # reviews/user/<user_id>/ e reviews/product/<product_id>/
+        if "user_id" in self.kwargs:
+            queryset = queryset.filter(user_id=self.kwargs["user_id"])
+        if "product_id" in self.kwargs:
+            queryset = queryset.filter(product_id=self.kwargs["product_id"])
+        return queryset
+
 
 @extend_schema_view(
     create=extend_schema(
@@ -264,15 +602,49 @@ class ReviewViewSet(viewsets.ModelViewSet):
         summary="Delete a cart", description="Deletes a cart by its ID."
     ),
 )
-class CartViewSet(viewsets.ModelViewSet):
+class CartViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Cart.objects.all()
     serializer_class = CartSerializer
+    ordering = ("-created_at", "-id")
     http_method_names = ["get", "post", "put", "patch", "delete"]
     filter_backends = [DjangoFilterBackend]
     filterset_class = CartFilter
     permission_classes = [IsAdminUser]
 
 
+@extend_schema_view(
+    retrieve=extend_schema(
+        summary="Cart summary",
+        description=(
+            "Returns a cart with its items, each with the product name and price and the "
+            "line total, plus the cart total, in a single query. Stock is not included: "
+            "read it from the product."
+        ),
+    ),
+    me=extend_schema(
+        summary="Authenticated user's cart summary",
+        description="Same as the cart summary, for the authenticated user's cart.",
+    ),
+)
+class CartSummaryViewSet(viewsets.ViewSet):
+    queryset = Cart.objects.all()
+
+    def get_permissions(self):
+        if self.action == "me":
+            return [IsAuthenticated()]
+        return [IsAdminUser()]
+
+    def retrieve(self, request, pk=None, *args, **kwargs):
+        return Response(CartService.summary(int(pk), request))
+
+    def me(self, request, *args, **kwargs):
+        cart_id = Cart.objects.filter(user=request.user).values_list("pk", flat=True).first()
+        if cart_id is None:
+            # Usuário que ainda não tem carrinho: mesmo formato, vazio
+            return Response(CartService.empty_summary(request.user.pk))
+        return Response(CartService.summary(cart_id, request))
+
+
 @extend_schema_view(
     create=extend_schema(
         summary="Creates a CartProduct.",
@@ -290,7 +662,7 @@ class CartViewSet(viewsets.ModelViewSet):
         summary="Delete a CartProduct", description="Deletes a CartProduct by its ID."
     ),
 )
-class CartProductViewSet(viewsets.ModelViewSet):
+class CartProductViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = CartProduct.objects.all()
     serializer_class = CartProductSerializer
     http_method_names = ["get", "post", "delete"]
@@ -324,17 +696,22 @@ class CartProductViewSet(viewsets.ModelViewSet):
         summary="Delete a shipping", description="Deletes a shipping by its ID."
     ),
 )
-class ShippingViewSet(viewsets.ModelViewSet):
+class ShippingViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Shipping.objects.all()
     serializer_class = ShippingSerializer
+    ordering = ("-created_at", "-id")
     http_method_names = ["get", "post", "put", "patch", "delete"]
     filter_backends = [DjangoFilterBackend]
     filterset_class = ShippingFilter
     permission_classes = [IsAdminUser]
 
     def perform_create(self, serializer):
-        tracking_number = ShippingService.generate_tracking_number()
-        serializer.save(tracking_number=tracking_number)
+        IdentifierService.retry_on_collision(
+            lambda: serializer.save(
+                tracking_number=ShippingService.generate_tracking_number()
+            ),
+            "tracking_number",
+        )
 
 
 @extend_schema_view(
@@ -362,7 +739,7 @@ class ShippingViewSet(viewsets.ModelViewSet):
         summary="Delete a payment", description="Deletes a payment by its ID."
     ),
 )
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     http_method_names = ["get", "post", "put", "patch", "delete"]
@@ -371,8 +748,12 @@ class PaymentViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminUser]
 
     def perform_create(self, serializer):
-        transaction_id = PaymentService.generate_transaction_id()
-        serializer.save(transaction_id=transaction_id)
+        IdentifierService.retry_on_collision(
+            lambda: serializer.save(
+                transaction_id=PaymentService.generate_transaction_id()
+            ),
+            "transaction_id",
+        )
 
 
 @extend_schema_view(
@@ -400,9 +781,10 @@ class PaymentViewSet(viewsets.ModelViewSet):
         summary="Delete a address", description="Deletes a address by its ID."
     ),
 )
-class AddressViewSet(viewsets.ModelViewSet):
+class AddressViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Address.objects.all()
     serializer_class = AddressSerializer
+    ordering = ("-created_at", "-id")
     http_method_names = ["get", "post", "put", "patch", "delete"]
     filter_backends = [DjangoFilterBackend]
     filterset_class = AddressFilter
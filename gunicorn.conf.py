@@ -0,0 +1,45 @@
+# Configuração do gunicorn para produção (lida automaticamente a partir da raiz do projeto):
+#   uv run gunicorn core.wsgi:application
+import multiprocessing
+import os
+import shutil
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8002")
+
+# Processos: 2 x CPUs + 1 (a regra do gunicorn). Cada processo tem WEB_THREADS
+# threads, e cada thread mantém sua própria conexão persistente com o Postgres
+# (CONN_MAX_AGE): workers x threads precisa caber no max_connections do banco.
+workers = int(os.environ.get("WEB_CONCURRENCY") or multiprocessing.cpu_count() * 2 + 1)
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS") or 4)
+
+# Carrega a aplicação uma vez, antes do fork (menos memória e boot mais rápido)
+preload_app = True
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recicla os workers de tempos em tempos, para conter vazamentos de memória
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+errorlog = "-"
+
+# Métricas do Prometheus (/metrics) somadas entre todos os workers; precisa
+# estar definido antes de o prometheus_client ser importado pela aplicação
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/ecommerce-prometheus")
+
+
+def on_starting(server):
+    # Descarta as métricas de execuções anteriores
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)